@@ -1,17 +1,123 @@
 from django.contrib import admin
-from .models import Ticket, FollowUp, Attachment
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
 
+from .models import ID_MAX_DIGITS, Ticket, FollowUp, Attachment, QueuedTask
 
-class TicketAdmin(admin.ModelAdmin):
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that takes the number of rows of an unfiltered table from the
+    PostgreSQL statistics instead of running COUNT(*) over all of it.
+    Filtered querysets are still counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            # reltuples is -1 (or 0) before the table has been analyzed
+            if row and row[0] > 0:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Admin defaults for tables with millions of rows: estimated counts and
+    search by id or by the indexed prefix lookups in search_fields.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Numeric search terms (also "#123") are looked up in this field
+    id_search_field = 'pk'
+    # Search terms starting with "text:" are looked up in this field; there
+    # is no index for it, so only on request
+    text_search_field = None
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip().lstrip('#')
+        if term.isascii() and term.isdigit():
+            if len(term) > ID_MAX_DIGITS:
+                return queryset.none(), False
+            return queryset.filter(**{self.id_search_field: int(term)}), False
+        if self.text_search_field and term.startswith('text:'):
+            text = term[len('text:'):].strip()
+            # A lookup across a relation can match a row more than once
+            return queryset.filter(**{f'{self.text_search_field}__icontains': text}), '__' in self.text_search_field
+        return super().get_search_results(request, queryset, search_term)
+
+
+class TicketAdmin(LargeTableAdmin):
     list_display = ('id',
                     'title',
-                    'description',
+                    'short_description',
+                    'status',
                     'assigned_to',
                     'created',
                     'updated',)
+    list_select_related = ('assigned_to',)
+    ordering = ('-id',)
+    list_filter = ('status',)
+    date_hierarchy = 'created'
+    search_fields = ('owner__username__startswith', 'assigned_to__username__startswith')
+    search_help_text = ('Ticket id, beginning of the username of the owner or assignee, '
+                        'or "text:" and words in the text of an attachment')
+    text_search_field = 'attachments__text'
+    raw_id_fields = ('owner', 'waiting_for', 'assigned_to')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            # The list shows the stored summary instead of the description
+            queryset = queryset.defer('description')
+        return queryset
+
+    @admin.display(description='Description')
+    def short_description(self, ticket):
+        return ticket.summary
+
+
+class FollowUpAdmin(LargeTableAdmin):
+    list_display = ('id', 'ticket', 'title', 'user', 'modified')
+    list_select_related = ('ticket', 'user')
+    search_fields = ('user__username__startswith',)
+    search_help_text = 'Ticket id, or beginning of the username'
+    id_search_field = 'ticket'
+    autocomplete_fields = ('ticket',)
+    raw_id_fields = ('user',)
+
+
+class AttachmentAdmin(LargeTableAdmin):
+    list_display = ('id', 'ticket', 'filename', 'user', 'created')
+    list_select_related = ('ticket', 'user')
+    search_fields = ('user__username__startswith',)
+    search_help_text = 'Ticket id, beginning of the username, or "text:" and words in the text of the file'
+    text_search_field = 'text'
+    id_search_field = 'ticket'
+    autocomplete_fields = ('ticket',)
+    raw_id_fields = ('user',)
+
+
+class QueuedTaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'run_at', 'attempts', 'failed', 'last_error')
+    list_filter = ('name', ('failed', admin.EmptyFieldListFilter))
+    ordering = ('run_at', 'id')
+    actions = ('retry',)
+
+    @admin.action(description='Retry the selected tasks now')
+    def retry(self, request, queryset):
+        queryset.update(failed=None, attempts=0, run_at=timezone.now())
 
 
 # Register Models
 admin.site.register(Ticket, TicketAdmin)
-admin.site.register(FollowUp)
-admin.site.register(Attachment)
+admin.site.register(FollowUp, FollowUpAdmin)
+admin.site.register(Attachment, AttachmentAdmin)
+admin.site.register(QueuedTask, QueuedTaskAdmin)
@@ -0,0 +1,108 @@
+"""
+Vectorized ticket lifecycle metrics for ad-hoc analysis.
+
+The ticket columns are fetched in chunks with values_list() into NumPy
+arrays, and all metrics are computed on the arrays. NumPy is an optional
+dependency, only needed by the management command "ticket_stats".
+Archived tickets are included.
+"""
+
+from django.utils import timezone
+
+from .models import Ticket, ArchivedTicket
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+FETCH_CHUNK_SIZE = 50000
+
+TICKET_MODELS = (Ticket, ArchivedTicket)
+
+RESOLUTION_PERCENTILES = (50, 75, 90, 95, 99)
+
+# Bin edges of the aging histogram of open tickets, in days
+AGE_BINS_DAYS = (0, 1, 2, 7, 14, 30, 90, 180, 365, float('inf'))
+
+
+def load_columns(created_from=None, created_to=None):
+    """
+    Return the ticket columns as a dict of NumPy arrays. Times are seconds
+    since the epoch; tickets without closed date have -1, unassigned
+    tickets have assignee 0.
+    """
+    chunks = {name: [] for name in ('id', 'created', 'closed', 'status', 'assignee')}
+    buffer = []
+
+    def flush():
+        if not buffer:
+            return
+        ids, created, closed, status, assignee = zip(*buffer)
+        chunks['id'].append(np.array(ids, dtype=np.int64))
+        chunks['created'].append(np.array([value.timestamp() for value in created], dtype=np.int64))
+        chunks['closed'].append(np.array([value.timestamp() if value else -1 for value in closed], dtype=np.int64))
+        chunks['status'].append(np.array(status, dtype=np.int8))
+        chunks['assignee'].append(np.array([value or 0 for value in assignee], dtype=np.int64))
+        buffer.clear()
+
+    for model in TICKET_MODELS:
+        tickets = model.objects.order_by()
+        if created_from:
+            tickets = tickets.filter(created__gte=created_from)
+        if created_to:
+            tickets = tickets.filter(created__lt=created_to)
+        rows = tickets.values_list('id', 'created', 'closed_date', 'status', 'assigned_to_id')
+
+        for row in rows.iterator(chunk_size=FETCH_CHUNK_SIZE):
+            buffer.append(row)
+            if len(buffer) >= FETCH_CHUNK_SIZE:
+                flush()
+    flush()
+
+    empty = {'id': np.int64, 'created': np.int64, 'closed': np.int64, 'status': np.int8, 'assignee': np.int64}
+    return {
+        name: np.concatenate(arrays) if arrays else np.empty(0, dtype=empty[name])
+        for name, arrays in chunks.items()
+    }
+
+
+def compute_stats(columns, now=None):
+    """
+    Compute resolution time percentiles, per-assignee load and the aging
+    histogram of open tickets.
+    """
+    now = int((now or timezone.now()).timestamp())
+    created, closed, status, assignee = columns['created'], columns['closed'], columns['status'], columns['assignee']
+
+    is_closed = (closed >= 0) & (status == Ticket.Status.DONE)
+    is_open = status != Ticket.Status.DONE
+
+    resolution_hours = (closed[is_closed] - created[is_closed]) / 3600
+    if resolution_hours.size:
+        resolution = np.percentile(resolution_hours, RESOLUTION_PERCENTILES)
+    else:
+        resolution = np.full(len(RESOLUTION_PERCENTILES), np.nan)
+
+    assignee_ids, assignee_index = np.unique(assignee, return_inverse=True)
+    assignee_open = np.bincount(assignee_index, weights=is_open, minlength=assignee_ids.size).astype(np.int64)
+    assignee_closed = np.bincount(assignee_index, weights=is_closed, minlength=assignee_ids.size).astype(np.int64)
+
+    age_days = (now - created[is_open]) / 86400
+    age_counts, age_bins = np.histogram(age_days, bins=np.array(AGE_BINS_DAYS, dtype=np.float64))
+
+    status_codes = np.array(Ticket.Status.values)
+    status_counts = np.bincount(status, minlength=status_codes.max() + 1)[status_codes]
+
+    return {
+        'resolution_percentiles': np.array(RESOLUTION_PERCENTILES),
+        'resolution_hours': resolution,
+        'assignee_ids': assignee_ids,
+        'assignee_open': assignee_open,
+        'assignee_closed': assignee_closed,
+        'age_bins_days': age_bins,
+        'age_counts': age_counts,
+        'status_codes': status_codes,
+        'status_counts': status_counts,
+    }
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class MainConfig(AppConfig):
+    name = 'main'
+
+    def ready(self):
+        # Connect the signal receivers that maintain the ticket counters and rollups
+        from . import counters, reports  # noqa: F401
+        # Register the system checks
+        from . import checks  # noqa: F401
@@ -0,0 +1,78 @@
+"""
+Moving closed tickets into the archive tables.
+
+Closed tickets are copied together with their followups and attachment
+metadata into ArchivedTicket, ArchivedFollowUp and ArchivedAttachment
+(keeping their ids) and removed from the operational tables, one batch
+per transaction. Attachment files are not touched. restore_ticket() moves
+an archived ticket back, e.g. when a reply to it arrives by email.
+"""
+
+from django.db import transaction
+
+from .models import Ticket, FollowUp, Attachment, ArchivedTicket, ArchivedFollowUp, ArchivedAttachment
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 1000
+
+# (source model, archive model) in the order they are copied
+ARCHIVED_MODELS = (
+    (Ticket, ArchivedTicket),
+    (FollowUp, ArchivedFollowUp),
+    (Attachment, ArchivedAttachment),
+)
+
+
+def _copied_fields(archive_model):
+    return [field.attname for field in archive_model._meta.concrete_fields if field.name != 'archived']
+
+
+def archive_batch(closed_before, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Archive up to batch_size tickets closed before the given time and return
+    the number of archived tickets.
+    """
+    with transaction.atomic():
+        ids = list(
+            Ticket.objects.select_for_update()
+            .filter(status=Ticket.CLOSED_STATUS, closed_date__lt=closed_before)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        for model, archive_model in ARCHIVED_MODELS:
+            rows = model.objects.filter(**{'id__in' if model is Ticket else 'ticket_id__in': ids}).order_by()
+            archive_model.objects.bulk_create(
+                archive_model(**row) for row in rows.values(*_copied_fields(archive_model))
+            )
+
+        # Children first, so deleting the tickets has nothing left to cascade
+        for model, _ in reversed(ARCHIVED_MODELS):
+            model.objects.filter(**{'id__in' if model is Ticket else 'ticket_id__in': ids}).delete()
+
+    logger.info(f"Archived {len(ids)} tickets")
+    return len(ids)
+
+
+def restore_ticket(ticket_id):
+    """
+    Move an archived ticket with its followups and attachments back into the
+    operational tables and return it, or None if it is not archived.
+    """
+    with transaction.atomic():
+        if not ArchivedTicket.objects.select_for_update().filter(id=ticket_id).exists():
+            return None
+
+        for model, archive_model in ARCHIVED_MODELS:
+            rows = archive_model.objects.filter(**{'id' if model is Ticket else 'ticket_id': ticket_id}).order_by()
+            model.objects.bulk_create(model(**row) for row in rows.values(*_copied_fields(archive_model)))
+
+        for model, archive_model in reversed(ARCHIVED_MODELS):
+            archive_model.objects.filter(**{'id' if model is Ticket else 'ticket_id': ticket_id}).delete()
+
+    logger.info(f"Restored ticket {ticket_id} from the archive")
+    return Ticket.objects.get(id=ticket_id)
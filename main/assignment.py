@@ -0,0 +1,163 @@
+"""
+Automatic assignment of tickets.
+
+A ticket goes to the target of the first rule in TICKET_ASSIGNMENT_RULES
+that matches it, else to the "assign_to" user or "group" of the mailbox it
+came from, else to TICKET_ASSIGNMENT_GROUP. Of a group, the active member
+with the fewest open tickets gets the ticket. The loads come from the
+ticket counters in main.counters, so choosing an assignee does not count
+tickets in the database.
+
+New tickets are assigned before they are first saved (ticket_create_view,
+get_email); assign_unassigned() is the periodic sweep of the management
+command "assign_tickets", which assigns a batch of tickets with a single
+UPDATE.
+"""
+
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import counters
+from .models import Ticket
+from .notifications import notify_batched
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+ASSIGNMENT_BATCH_SIZE = 100
+
+
+def _matches(rule, title, sender, mailbox_name):
+    if 'mailbox' in rule and rule['mailbox'] != mailbox_name:
+        return False
+    if 'title' in rule and not re.search(rule['title'], title or '', re.IGNORECASE):
+        return False
+    if 'sender' in rule and not re.search(rule['sender'], sender or '', re.IGNORECASE):
+        return False
+    return True
+
+
+def target(title, sender='', mailbox=None):
+    """
+    Return the target for a ticket as ('user', username) or ('group', name),
+    or None if it is not assigned automatically.
+    """
+    mailbox_name = mailbox['name'] if mailbox else None
+    candidates = list(settings.TICKET_ASSIGNMENT_RULES) if settings.TICKET_AUTO_ASSIGNMENT else []
+    if mailbox:
+        candidates.append(mailbox)
+    if settings.TICKET_AUTO_ASSIGNMENT and settings.TICKET_ASSIGNMENT_GROUP:
+        candidates.append({'group': settings.TICKET_ASSIGNMENT_GROUP})
+
+    for candidate in candidates:
+        if candidate is mailbox or _matches(candidate, title, sender, mailbox_name):
+            if candidate.get('assign_to'):
+                return 'user', candidate['assign_to']
+            if candidate.get('group'):
+                return 'group', candidate['group']
+    return None
+
+
+class _Loads:
+    """
+    Open tickets per candidate assignee, for the assignments of one batch.
+    """
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.loads = {}
+
+    def user(self, username):
+        if username not in self.users:
+            self.users[username] = User.objects.filter(username=username, is_active=True).values_list(
+                'id', flat=True).first()
+        return self.users[username]
+
+    def members(self, group):
+        if group not in self.groups:
+            self.groups[group] = list(User.objects.filter(groups__name=group, is_active=True).values_list(
+                'id', flat=True))
+            self.loads.update(counters.open_counts(
+                [user_id for user_id in self.groups[group] if user_id not in self.loads]))
+        return self.groups[group]
+
+    def choose(self, kind, name):
+        """
+        Return the user id for a target and count the ticket towards its load.
+        """
+        if kind == 'user':
+            user_id = self.user(name)
+        else:
+            members = self.members(name)
+            user_id = min(members, key=lambda member: (self.loads[member], member)) if members else None
+        if user_id is not None:
+            self.loads[user_id] = self.loads.get(user_id, 0) + 1
+        return user_id
+
+
+def choose_assignee(title, sender='', mailbox=None):
+    """
+    Return the id of the user a new ticket should be assigned to, or None.
+    """
+    ticket_target = target(title, sender, mailbox)
+    return _Loads().choose(*ticket_target) if ticket_target else None
+
+
+def notify_assignees(tickets):
+    """
+    Tell the assignees of automatically assigned tickets about them, one
+    notification per assignee.
+    """
+    emails = dict(User.objects.filter(id__in={ticket.assigned_to_id for ticket in tickets})
+                  .exclude(email='').values_list('id', 'email'))
+    tickets_by_recipient = defaultdict(list)
+    for ticket in tickets:
+        if ticket.assigned_to_id in emails:
+            tickets_by_recipient[emails[ticket.assigned_to_id]].append((ticket.id, ticket.title))
+    notify_batched(tickets_by_recipient, "Tickets assigned to you", "the following tickets were assigned to you:")
+
+
+def assign_unassigned(batch_size=ASSIGNMENT_BATCH_SIZE, after_id=0):
+    """
+    Assign the next batch of unassigned open tickets with an id above
+    after_id in one transaction and one UPDATE. Return the number of
+    assigned tickets and the highest id looked at, or None if there were no
+    tickets left.
+    """
+    with transaction.atomic():
+        # A concurrent sweep skips the tickets of this one
+        tickets = list(
+            Ticket.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(assigned_to__isnull=True, id__gt=after_id).exclude(status=Ticket.CLOSED_STATUS)
+            .select_related('owner').only('id', 'title', 'owner__email').order_by('id')[:batch_size]
+        )
+        if not tickets:
+            return 0, None
+
+        loads = _Loads()
+        assigned = []
+        for ticket in tickets:
+            ticket_target = target(ticket.title, ticket.owner.email if ticket.owner else '')
+            ticket.assigned_to_id = loads.choose(*ticket_target) if ticket_target else None
+            if ticket.assigned_to_id is not None:
+                assigned.append(ticket)
+
+        if assigned:
+            Ticket.objects.filter(id__in=[ticket.id for ticket in assigned]).update(
+                assigned_to=Case(*(When(id=ticket.id, then=Value(ticket.assigned_to_id)) for ticket in assigned)),
+                updated=timezone.now(),
+            )
+            counters.assigned([ticket.assigned_to_id for ticket in assigned])
+            notify_assignees(assigned)
+
+    logger.info(f"Assigned {len(assigned)} of {len(tickets)} unassigned tickets")
+    return len(assigned), tickets[-1].id
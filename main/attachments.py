@@ -0,0 +1,155 @@
+"""
+Post-processing of attachments: a scan by the scanner configured in
+TICKET_ATTACHMENT_SCANNER, a thumbnail of images and the text of PDFs and
+text files, stored on the Attachment for the "text:" search in the admin.
+Files that fail the scan are moved out of MEDIA_ROOT into
+TICKET_ATTACHMENT_QUARANTINE_ROOT, so the web server no longer serves them;
+the ticket page only links attachments whose scan found them clean.
+
+process_after_commit() queues the processing as a task (see main/tasks.py),
+which a worker runs once the transaction that saved the attachment
+commits, so the request returns right away. Thumbnails need Pillow
+("pip install Pillow") and PDF text pypdf ("pip install pypdf"); without
+them these steps are skipped.
+"""
+
+import mimetypes
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Attachment, ScanStatus
+from .tasks import task
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (200, 200)
+
+# Extracted text beyond this many characters is dropped
+TEXT_MAX_LENGTH = 100_000
+
+# Bytes of a text file read for the extraction
+TEXT_MAX_BYTES = 4 * TEXT_MAX_LENGTH
+
+
+def accept_all(fp, filename):
+    """
+    Scanner that accepts every file, for setups without a virus scanner.
+    """
+    return True, ''
+
+
+def _thumbnail(fp, name):
+    """
+    Save a PNG thumbnail of the image in fp next to the attachment and
+    return its name.
+    """
+    with Image.open(fp) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+        content = BytesIO()
+        image.save(content, 'PNG')
+    directory, filename = os.path.split(name)
+    thumbnail_name = os.path.join(directory, 'thumbnails', os.path.splitext(filename)[0] + '.png')
+    return default_storage.save(thumbnail_name, ContentFile(content.getvalue()))
+
+
+def _quarantine(name):
+    """
+    Move the stored file name out of the media storage into the quarantine
+    directory.
+    """
+    quarantine = FileSystemStorage(location=settings.TICKET_ATTACHMENT_QUARANTINE_ROOT)
+    with default_storage.open(name) as fp:
+        quarantine_name = quarantine.save(name, fp)
+    default_storage.delete(name)
+    logger.warning(f"Quarantined attachment {name} as {quarantine.path(quarantine_name)}")
+
+
+def _pdf_text(fp):
+    parts, length = [], 0
+    for page in pypdf.PdfReader(fp).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= TEXT_MAX_LENGTH:
+            break
+    return '\n'.join(parts)
+
+
+def process_file(name, filename):
+    """
+    Scan the stored file name and extract its thumbnail and text. Return the
+    fields to update on the Attachment.
+    """
+    result = {'thumbnail': '', 'text': ''}
+    content_type = mimetypes.guess_type(filename)[0] or ''
+    scanner = import_string(settings.TICKET_ATTACHMENT_SCANNER)
+
+    with default_storage.open(name) as fp:
+        clean, detail = scanner(fp, filename)
+        result['scan_status'] = ScanStatus.CLEAN if clean else ScanStatus.INFECTED
+        result['scan_detail'] = (detail or '')[:255]
+        # Infected files are not opened by any parser
+        if clean:
+            fp.seek(0)
+            if content_type.startswith('image/') and Image is not None:
+                result['thumbnail'] = _thumbnail(fp, name)
+            elif content_type == 'application/pdf' and pypdf is not None:
+                result['text'] = _pdf_text(fp)
+            elif content_type.startswith('text/'):
+                result['text'] = fp.read(TEXT_MAX_BYTES).decode('utf-8', 'replace')
+
+    if not clean:
+        _quarantine(name)
+
+    # PostgreSQL text cannot contain NUL characters
+    result['text'] = result['text'].replace('\x00', '')[:TEXT_MAX_LENGTH]
+    return result
+
+
+def _mark_failed(error, attachment_id):
+    logger.error(f"Failed to process attachment {attachment_id}: {error}")
+    Attachment.objects.filter(id=attachment_id).update(
+        processed=timezone.now(), scan_status=ScanStatus.FAILED, scan_detail=str(error)[:255])
+
+
+@task(on_failure=_mark_failed)
+def process_attachment(attachment_id):
+    """
+    Process the attachment and store the results on it. Runs in the task
+    queue, which retries it when it raises, e.g. on a scanner timeout; the
+    attachment is marked as failed after the last attempt.
+    """
+    attachment = Attachment.objects.filter(id=attachment_id).only('file', 'filename').first()
+    if attachment is None:
+        # Deleted or archived in the meantime
+        return
+    result = process_file(attachment.file.name, attachment.filename)
+    Attachment.objects.filter(id=attachment_id).update(processed=timezone.now(), **result)
+
+
+def process_after_commit(attachment):
+    """
+    Queue the processing of the attachment, which runs once the current
+    transaction commits.
+    """
+    process_attachment.enqueue(attachment.id)
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .counters import cache_is_shared
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The ticket counters need a cache shared by all processes in production.
+    """
+    if settings.DEBUG or cache_is_shared():
+        return []
+    return [Warning(
+        "The default cache is local to each process, so the navbar ticket counters are "
+        "counted from the database on every request.",
+        hint="Set DJANGO_CACHE_URL to a shared cache, e.g. redis://127.0.0.1:6379/1.",
+        id='main.W001',
+    )]
@@ -0,0 +1,10 @@
+from .counters import get_counters
+
+
+def ticket_counters(request):
+    """
+    Add the navbar counters of the logged in user as "ticket_counters".
+    """
+    if not request.user.is_authenticated:
+        return {}
+    return {'ticket_counters': get_counters(request.user)}
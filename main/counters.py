@@ -0,0 +1,206 @@
+"""
+Ticket counters shown as badges in the navbar: the open tickets assigned to
+a user, the tickets waiting for a user and the unassigned tickets.
+
+The counters live in the cache. Ticket save/delete signals adjust them by
+deltas after the transaction commits, a missing counter is counted from
+the database on first use, and the management command
+"reconcile_counters" periodically recounts all of them, which also
+repairs drift from concurrent updates. Code that changes tickets without
+signals (QuerySet.update, bulk_create) calls invalidate().
+
+The counters are only cached in a cache shared by all processes (Redis,
+Memcached). A local-memory cache is only used with DEBUG (a single
+runserver process); otherwise the counters are counted from the database
+on every request, three COUNT queries per page, and the system check
+main.W001 asks for a shared cache. It is a warning, not an error, so tests
+and single-process installations still run.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Ticket
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Counters are recounted when they were not touched for this long
+COUNTER_TIMEOUT = 24 * 60 * 60
+
+UNASSIGNED_KEY = 'ticket-counters:unassigned'
+
+# Cache backends private to each process
+LOCAL_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def cache_is_shared():
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def _use_cache():
+    return settings.DEBUG or cache_is_shared()
+
+
+def open_key(user_id):
+    return f'ticket-counters:open:{user_id}'
+
+
+def waiting_key(user_id):
+    return f'ticket-counters:waiting:{user_id}'
+
+
+def _counter_keys(assigned_to_id, waiting_for_id, status):
+    """
+    Return the keys of the counters a ticket in this state counts towards.
+    """
+    keys = []
+    if assigned_to_id is None:
+        keys.append(UNASSIGNED_KEY)
+    elif status != Ticket.CLOSED_STATUS:
+        keys.append(open_key(assigned_to_id))
+    if waiting_for_id is not None and status == Ticket.Status.WAITING:
+        keys.append(waiting_key(waiting_for_id))
+    return keys
+
+
+def _count(key):
+    """
+    Count the tickets of a counter in the database.
+    """
+    if key == UNASSIGNED_KEY:
+        return Ticket.objects.filter(assigned_to__isnull=True).count()
+    kind, user_id = key.rsplit(':', 2)[1:]
+    if kind == 'open':
+        return Ticket.objects.filter(assigned_to=user_id).exclude(status=Ticket.CLOSED_STATUS).count()
+    return Ticket.objects.filter(waiting_for=user_id, status=Ticket.Status.WAITING).count()
+
+
+def get_counters(user):
+    """
+    Return the counters of a user as a dict with the keys "open", "waiting"
+    and "unassigned", with one cache round trip if they are cached.
+    """
+    keys = {'open': open_key(user.pk), 'waiting': waiting_key(user.pk), 'unassigned': UNASSIGNED_KEY}
+    if not _use_cache():
+        return {name: _count(key) for name, key in keys.items()}
+    values = cache.get_many(keys.values())
+    missing = {key: _count(key) for key in keys.values() if key not in values}
+    if missing:
+        cache.set_many(missing, COUNTER_TIMEOUT)
+        values.update(missing)
+    return {name: values[key] for name, key in keys.items()}
+
+
+def open_counts(user_ids):
+    """
+    Return the number of open tickets assigned to each of the users, from
+    the cache. Counters that are not cached are counted in one query.
+    """
+    keys = {user_id: open_key(user_id) for user_id in user_ids}
+    values = cache.get_many(keys.values()) if _use_cache() else {}
+    missing = [user_id for user_id, key in keys.items() if key not in values]
+    if missing:
+        counted = dict.fromkeys(missing, 0)
+        counted.update(Ticket.objects.filter(assigned_to__in=missing).exclude(status=Ticket.CLOSED_STATUS)
+                       .values_list('assigned_to').annotate(count=Count('id')).order_by())
+        counted = {open_key(user_id): count for user_id, count in counted.items()}
+        if _use_cache():
+            cache.set_many(counted, COUNTER_TIMEOUT)
+        values.update(counted)
+    return {user_id: values[key] for user_id, key in keys.items()}
+
+
+def _apply(deltas):
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Not cached; counted from the database when needed
+            pass
+
+
+def _on_commit_apply(old_keys, new_keys):
+    deltas = {}
+    for key in old_keys:
+        deltas[key] = deltas.get(key, 0) - 1
+    for key in new_keys:
+        deltas[key] = deltas.get(key, 0) + 1
+    transaction.on_commit(lambda: _apply(deltas))
+
+
+def invalidate(user_ids=()):
+    """
+    Drop the unassigned counter and the counters of the given users, after
+    changes made without signals.
+    """
+    keys = [UNASSIGNED_KEY]
+    for user_id in set(user_ids):
+        if user_id is not None:
+            keys += [open_key(user_id), waiting_key(user_id)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def assigned(user_ids):
+    """
+    Update the counters after unassigned open tickets were assigned with
+    QuerySet.update(), given the new assignee of each ticket.
+    """
+    _on_commit_apply([UNASSIGNED_KEY] * len(user_ids), [open_key(user_id) for user_id in user_ids])
+
+
+@receiver(post_save, sender=Ticket, dispatch_uid='ticket_counters_save')
+def ticket_saved(sender, instance, created, **kwargs):
+    new_keys = _counter_keys(instance.assigned_to_id, instance.waiting_for_id, instance.status)
+    if created:
+        _on_commit_apply([], new_keys)
+        return
+
+    assigned_to_id, waiting_for_id = getattr(instance, '_loaded_assignment', (models.DEFERRED, models.DEFERRED))
+    status = getattr(instance, '_loaded_status', None)
+    if models.DEFERRED in (assigned_to_id, waiting_for_id) or status is None:
+        # Previous state unknown
+        invalidate([instance.assigned_to_id, instance.waiting_for_id])
+        return
+    _on_commit_apply(_counter_keys(assigned_to_id, waiting_for_id, status), new_keys)
+
+
+@receiver(post_delete, sender=Ticket, dispatch_uid='ticket_counters_delete')
+def ticket_deleted(sender, instance, **kwargs):
+    _on_commit_apply(_counter_keys(instance.assigned_to_id, instance.waiting_for_id, instance.status), [])
+
+
+def reconcile():
+    """
+    Recount all counters from the database and store them in the cache.
+    Return the number of counters written.
+    """
+    if not _use_cache():
+        logger.warning("Ticket counters are not cached, the cache is local to each process")
+        return 0
+
+    counters = {}
+    for user_id in User.objects.values_list('id', flat=True):
+        counters[open_key(user_id)] = counters[waiting_key(user_id)] = 0
+
+    open_tickets = Ticket.objects.filter(assigned_to__isnull=False).exclude(status=Ticket.CLOSED_STATUS)
+    for user_id, count in open_tickets.values_list('assigned_to').annotate(count=Count('id')).order_by():
+        counters[open_key(user_id)] = count
+    waiting = Ticket.objects.filter(waiting_for__isnull=False, status=Ticket.Status.WAITING)
+    for user_id, count in waiting.values_list('waiting_for').annotate(count=Count('id')).order_by():
+        counters[waiting_key(user_id)] = count
+    counters[UNASSIGNED_KEY] = Ticket.objects.filter(assigned_to__isnull=True).count()
+
+    cache.set_many(counters, COUNTER_TIMEOUT)
+    logger.info(f"Reconciled {len(counters)} ticket counters")
+    return len(counters)
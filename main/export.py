@@ -0,0 +1,176 @@
+"""
+Streaming export of tickets with their followups and attachment metadata.
+
+The tickets are read with .iterator(chunk_size=...), and the followups and
+attachments are prefetched per chunk, so memory usage does not depend on
+the number of exported tickets. Archived tickets are exported as well; the
+live and the archived tickets are merged by id.
+"""
+
+import csv
+import heapq
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Ticket, FollowUp, Attachment, ArchivedTicket, ArchivedFollowUp, ArchivedAttachment
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Output is handed to the client in pieces of at least this size
+STREAM_BUFFER_SIZE = 64 * 1024
+
+CSV_HEADER = ('record', 'ticket_id', 'id', 'title', 'status', 'user', 'assigned_to',
+              'created', 'closed_date', 'text', 'file')
+
+# (ticket, followup, attachment) models of the live and the archived tickets
+EXPORT_SOURCES = (
+    (Ticket, FollowUp, Attachment),
+    (ArchivedTicket, ArchivedFollowUp, ArchivedAttachment),
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def export_querysets(status=None, created_from=None, created_to=None, assigned_to=None):
+    """
+    Return the live and the archived tickets to export, filtered by status,
+    creation date range (inclusive) and assignee.
+    """
+    querysets = []
+    for ticket_model, followup_model, attachment_model in EXPORT_SOURCES:
+        tickets = ticket_model.objects.select_related('owner', 'assigned_to').prefetch_related(
+            Prefetch('followups', queryset=followup_model.objects.select_related('user').order_by('date', 'id')),
+            Prefetch('attachments', queryset=attachment_model.objects.select_related('user').order_by('id')),
+        ).order_by('id')
+
+        if status:
+            tickets = tickets.filter(status=status)
+        if created_from:
+            tickets = tickets.filter(created__gte=timezone.make_aware(datetime.combine(created_from, time.min)))
+        if created_to:
+            tickets = tickets.filter(created__lt=timezone.make_aware(datetime.combine(created_to + timedelta(days=1), time.min)))
+        if assigned_to:
+            tickets = tickets.filter(assigned_to=assigned_to)
+        querysets.append(tickets)
+    return querysets
+
+
+def iter_tickets(querysets):
+    """
+    Iterate over the tickets of all querysets, ordered by id.
+    """
+    return heapq.merge(*(tickets.iterator(chunk_size=EXPORT_CHUNK_SIZE) for tickets in querysets),
+                       key=lambda ticket: ticket.id)
+
+
+def _username(user):
+    return user.username if user else ''
+
+
+def _isoformat(value):
+    return value.isoformat() if value else ''
+
+
+def csv_rows(querysets):
+    """
+    Yield one CSV line per ticket, followup and attachment. Followups and
+    attachments follow the ticket they belong to.
+    """
+    class Echo:
+        def write(self, value):
+            return value
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+
+    for ticket in iter_tickets(querysets):
+        yield writer.writerow((
+            'ticket', ticket.id, ticket.id, ticket.title, ticket.get_status_display(), _username(ticket.owner),
+            _username(ticket.assigned_to), _isoformat(ticket.created), _isoformat(ticket.closed_date),
+            ticket.description or '', '',
+        ))
+        for followup in ticket.followups.all():
+            yield writer.writerow((
+                'followup', ticket.id, followup.id, followup.title, '', _username(followup.user),
+                '', _isoformat(followup.date), '', followup.text or '', '',
+            ))
+        for attachment in ticket.attachments.all():
+            yield writer.writerow((
+                'attachment', ticket.id, attachment.id, attachment.filename, '', _username(attachment.user),
+                '', _isoformat(attachment.created), '', '', attachment.file.name,
+            ))
+
+
+def jsonl_rows(querysets):
+    """
+    Yield one JSON object per ticket, with its followups and attachments nested.
+    """
+    for ticket in iter_tickets(querysets):
+        record = {
+            'id': ticket.id,
+            'title': ticket.title,
+            'status': ticket.get_status_display(),
+            'owner': _username(ticket.owner),
+            'assigned_to': _username(ticket.assigned_to),
+            'description': ticket.description,
+            'created': _isoformat(ticket.created),
+            'updated': _isoformat(ticket.updated),
+            'closed_date': _isoformat(ticket.closed_date),
+            'followups': [{
+                'id': followup.id,
+                'title': followup.title,
+                'text': followup.text,
+                'user': _username(followup.user),
+                'date': _isoformat(followup.date),
+            } for followup in ticket.followups.all()],
+            'attachments': [{
+                'id': attachment.id,
+                'filename': attachment.filename,
+                'file': attachment.file.name,
+                'user': _username(attachment.user),
+                'created': _isoformat(attachment.created),
+            } for attachment in ticket.attachments.all()],
+        }
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def encode(rows, compress=False):
+    """
+    Encode the text rows to UTF-8, optionally gzip them on the fly, and
+    yield the result in buffered pieces.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+
+    for row in rows:
+        data = row.encode('utf-8')
+        if compressor:
+            data = compressor.compress(data)
+        buffer.append(data)
+        size += len(data)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+
+    if compressor:
+        buffer.append(compressor.flush())
+    if buffer:
+        yield b''.join(buffer)
+
+
+def export_tickets(export_format, compress=False, **filters):
+    """
+    Return an iterator of bytes with the export of the filtered tickets.
+    """
+    querysets = export_querysets(**filters)
+    rows = csv_rows(querysets) if export_format == 'csv' else jsonl_rows(querysets)
+    return encode(rows, compress=compress)
@@ -2,8 +2,10 @@
 
 from django import forms
 from django.contrib.auth.models import User
+from django.db.models import Q
 
-from .models import Ticket, FollowUp, Attachment
+from .models import Ticket, FollowUp, Attachment, NotificationPreference, assignable_users
+from .widgets import AutocompleteSelect
 
 
 class UserSettingsForm(forms.ModelForm):
@@ -13,6 +15,13 @@ class UserSettingsForm(forms.ModelForm):
         fields = ('first_name', 'last_name', 'email',)
 
 
+class NotificationPreferenceForm(forms.ModelForm):
+
+    class Meta:
+        model = NotificationPreference
+        fields = ('delivery',)
+
+
 class TicketCreateForm(forms.ModelForm):
     class Meta:
         model = Ticket
@@ -24,6 +33,17 @@ class TicketEditForm(forms.ModelForm):
         model = Ticket
         fields = ('title', 'owner', 'description',
                   'status', 'waiting_for', 'assigned_to')
+        widgets = {
+            'owner': AutocompleteSelect('autocomplete_users'),
+            'waiting_for': AutocompleteSelect('autocomplete_users'),
+            'assigned_to': AutocompleteSelect('autocomplete_users', query={'role': 'agents'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The same users the autocomplete offers; the current assignee stays valid
+        self.fields['assigned_to'].queryset = User.objects.filter(
+            Q(id__in=assignable_users().values('id')) | Q(id=self.instance.assigned_to_id))
 
 
 class FollowupForm(forms.ModelForm):
@@ -31,9 +51,76 @@ class FollowupForm(forms.ModelForm):
     class Meta:
         model = FollowUp
         fields = ('ticket', 'title', 'text', 'user')
+        widgets = {
+            'ticket': AutocompleteSelect('autocomplete_tickets'),
+            'user': AutocompleteSelect('autocomplete_users'),
+        }
 
 
 class AttachmentForm(forms.ModelForm):
     class Meta:
         model = Attachment
         fields = ('file',)
+
+
+class TicketBulkActionForm(forms.Form):
+    ACTION_CHOICES = (
+        ('assign', 'Assign to'),
+        ('status', 'Change status to'),
+        ('close', 'Close'),
+    )
+
+    tickets = forms.Field(widget=forms.MultipleHiddenInput,
+                          error_messages={'required': "Please select at least one ticket."})
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    assigned_to = forms.ModelChoiceField(
+        queryset=assignable_users(),
+        required=False,
+    )
+    status = forms.TypedChoiceField(choices=[('', '---------')] + Ticket.Status.choices,
+                                    coerce=lambda value: Ticket.Status(int(value)), required=False)
+
+    def clean_tickets(self):
+        try:
+            ids = {int(ticket_id) for ticket_id in self.cleaned_data['tickets']}
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Invalid ticket selection.")
+        if not ids:
+            raise forms.ValidationError("Please select at least one ticket.")
+        return sorted(ids)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == 'assign' and not cleaned_data.get('assigned_to'):
+            self.add_error('assigned_to', "Please select a user.")
+        if action == 'status' and not cleaned_data.get('status'):
+            self.add_error('status', "Please select a status.")
+        return cleaned_data
+
+
+class TicketExportForm(forms.Form):
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    )
+
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    # Filtered by status name, e.g. "DONE"
+    status = forms.TypedChoiceField(
+        choices=[('', '---------')] + [(label, label) for label in Ticket.Status.labels],
+        coerce=Ticket.status_from_label,
+        empty_value=None,
+        required=False,
+    )
+    created_from = forms.DateField(required=False)
+    created_to = forms.DateField(required=False)
+    assigned_to = forms.ModelChoiceField(
+        queryset=User.objects.all(),
+        to_field_name='username',
+        required=False,
+    )
+    gzip = forms.BooleanField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'csv'
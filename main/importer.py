@@ -0,0 +1,311 @@
+"""
+Bulk import of tickets from CSV, JSON Lines and mbox archives.
+
+Input files are read one record at a time. The records are written in
+batches with bulk_create, one transaction per batch. Attachment files are
+only written to the storage after their batch has been committed.
+
+All readers yield records of this form:
+
+    {
+        'title': str, 'description': str, 'status': Ticket.Status or None,
+        'owner': email, 'assigned_to': email,
+        'created': datetime, 'closed_date': datetime,
+        'followups': [{'title', 'text', 'user': email, 'date': datetime}],
+        'attachments': [{'filename': str, 'content': bytes}],
+    }
+
+A record that cannot be imported, e.g. with an unknown status or date, is
+yielded as an InvalidRecord instead; it is skipped and reported, and still
+counts for the checkpoint. A file that cannot be read at all, e.g. a CSV
+file without a title column, raises ImportFormatError.
+"""
+
+import csv
+import email
+import email.policy
+import json
+import mailbox
+import os
+import re
+from contextlib import contextmanager
+from email.utils import parseaddr, parsedate_to_datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters
+from .models import Ticket, FollowUp, Attachment, attachment_path, summarize
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+IMPORT_BATCH_SIZE = 1000
+
+CSV_COLUMNS = ('title', 'description', 'status', 'owner_email', 'assigned_to_email', 'created', 'closed_date')
+REQUIRED_COLUMNS = ('title',)
+
+
+class ImportFormatError(Exception):
+    """
+    The file cannot be imported, e.g. a required column is missing.
+    """
+
+
+class InvalidRecord(ValueError):
+    """
+    A record that cannot be imported. Readers yield it in place of the record.
+    """
+
+
+def _datetime(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value) if isinstance(value, str) else value
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _status(label):
+    return Ticket.status_from_label(label.strip().upper()) if label else None
+
+
+def _record(data, position):
+    """
+    Build a record from a CSV row or a JSON object, or an InvalidRecord if a
+    value is missing or cannot be parsed.
+    """
+    try:
+        if not isinstance(data, dict):
+            raise ValueError("Not an object")
+        if not data.get('title'):
+            raise ValueError("Missing title")
+        return {
+            'title': data['title'],
+            'description': data.get('description'),
+            'status': _status(data.get('status')),
+            'owner': data.get('owner_email'),
+            'assigned_to': data.get('assigned_to_email'),
+            'created': _datetime(data.get('created')),
+            'closed_date': _datetime(data.get('closed_date')),
+            'followups': [{
+                'title': followup.get('title') or '',
+                'text': followup.get('text'),
+                'user': followup.get('user_email'),
+                'date': _datetime(followup.get('date')),
+            } for followup in data.get('followups') or []],
+            'attachments': [],
+        }
+    except (AttributeError, TypeError, ValueError) as e:
+        return InvalidRecord(f"{position}: {e}")
+
+
+def read_csv(path, skip=0):
+    """
+    One ticket per row, with the columns in CSV_COLUMNS.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ImportFormatError(f"Missing columns: {', '.join(missing)}")
+        for row in islice(reader, skip, None):
+            yield _record(row, f"Line {reader.line_num}")
+
+
+def read_jsonl(path, skip=0):
+    """
+    One ticket per line, with the CSV_COLUMNS keys and an optional list of
+    followups ({title, text, user_email, date}).
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = ((number, line) for number, line in enumerate(f, 1) if line.strip())
+        for number, line in islice(lines, skip, None):
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield InvalidRecord(f"Line {number}: {e}")
+                continue
+            yield _record(data, f"Line {number}")
+
+
+def read_mbox(path, skip=0):
+    """
+    One ticket per mail. The plain text body becomes the description, all
+    other parts become attachments.
+    """
+    archive = mailbox.mbox(path, create=False)
+    try:
+        for key in islice(archive.iterkeys(), skip, None):
+            message = email.message_from_bytes(archive.get_bytes(key), policy=email.policy.default)
+
+            body = message.get_body(preferencelist=('plain',))
+            try:
+                created = _datetime(parsedate_to_datetime(message['date'])) if message['date'] else None
+            except (TypeError, ValueError):
+                created = None
+
+            attachments = []
+            for part in message.iter_attachments():
+                content = part.get_payload(decode=True)
+                if content:
+                    attachments.append({'filename': part.get_filename() or 'attachment', 'content': content})
+
+            yield {
+                'title': str(message.get('subject', 'Created from e-mail'))[:255],
+                'description': body.get_content() if body else '',
+                'status': None,
+                'owner': parseaddr(str(message.get('from', '')))[1],
+                'assigned_to': None,
+                'created': created,
+                'closed_date': None,
+                'followups': [],
+                'attachments': attachments,
+            }
+    finally:
+        archive.close()
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'mbox': read_mbox,
+}
+
+
+@contextmanager
+def historical_timestamps():
+    """
+    Disable auto_now/auto_now_add on the imported models, so the dates of the
+    source records are kept.
+    """
+    fields = [field for model in (Ticket, FollowUp, Attachment) for field in model._meta.fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def safe_filename(filename):
+    filename = filename.replace(' ', '_')
+    return re.sub('[^a-zA-Z0-9._-]+', '', filename) or 'attachment'
+
+
+class TicketImporter:
+    """
+    Write records in batches. Users are resolved by email through a lookup
+    map that is loaded once.
+    """
+
+    def __init__(self, default_status=Ticket.Status.TODO, batch_size=IMPORT_BATCH_SIZE):
+        self.default_status = default_status
+        self.batch_size = batch_size
+        self.users = {
+            address.lower(): user_id
+            for address, user_id in User.objects.exclude(email='').values_list('email', 'id')
+        }
+
+    def user_id(self, address):
+        return self.users.get(address.lower()) if address else None
+
+    def batches(self, records):
+        iterator = iter(records)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def import_batch(self, records):
+        """
+        Write one batch of records in a single transaction and schedule the
+        attachment file writes for after the commit. Invalid records are
+        skipped.
+        """
+        records = [record for record in records if not isinstance(record, InvalidRecord)]
+        now = timezone.now()
+        files = []
+
+        with historical_timestamps(), transaction.atomic():
+            tickets = []
+            for record in records:
+                created = record['created'] or now
+                status = record['status'] or self.default_status
+                closed_date = record['closed_date']
+                if status == Ticket.CLOSED_STATUS and not closed_date:
+                    closed_date = created
+                tickets.append(Ticket(
+                    title=record['title'][:255],
+                    description=record['description'],
+                    summary=summarize(record['description']),
+                    status=status,
+                    owner_id=self.user_id(record['owner']),
+                    assigned_to_id=self.user_id(record['assigned_to']),
+                    created=created,
+                    updated=closed_date or created,
+                    closed_date=closed_date,
+                ))
+            # Primary keys are returned on PostgreSQL and SQLite 3.35+
+            Ticket.objects.bulk_create(tickets)
+            counters.invalidate(ticket.assigned_to_id for ticket in tickets)
+
+            followups = []
+            attachments = []
+            for ticket, record in zip(tickets, records):
+                for followup in record['followups']:
+                    date = followup['date'] or ticket.created
+                    followups.append(FollowUp(
+                        ticket=ticket,
+                        title=followup['title'][:200],
+                        text=followup['text'],
+                        user_id=self.user_id(followup['user']),
+                        date=date,
+                        created=date,
+                        modified=date,
+                    ))
+
+                used_names = set()
+                for file in record['attachments']:
+                    attachment = Attachment(ticket=ticket, user_id=ticket.owner_id, created=ticket.created)
+                    filename = safe_filename(file['filename'])
+                    name = default_storage.get_available_name(attachment_path(attachment, filename))
+                    root, ext = os.path.splitext(name)
+                    counter = 1
+                    while name in used_names:
+                        name = f"{root}_{counter}{ext}"
+                        counter += 1
+                    used_names.add(name)
+
+                    attachment.filename = filename
+                    attachment.file.name = name
+                    attachments.append(attachment)
+                    files.append((attachment, file['content']))
+
+            FollowUp.objects.bulk_create(followups)
+            Attachment.objects.bulk_create(attachments)
+            transaction.on_commit(lambda: self.write_files(files))
+
+        return len(tickets)
+
+    def write_files(self, files):
+        for attachment, content in files:
+            name = default_storage.save(attachment.file.name, ContentFile(content))
+            if name != attachment.file.name:
+                # The reserved name was taken in the meantime
+                Attachment.objects.filter(id=attachment.id).update(file=name)
@@ -0,0 +1,177 @@
+"""
+Reading inbound e-mails without holding them in memory.
+
+A message is spooled to a temporary file, and iter_parts() walks its MIME
+structure line by line: the headers of each part are parsed with a
+BytesFeedParser, and its body is decoded chunk by chunk (base64,
+quoted-printable or as is) into another spooled temporary file. Only
+small messages and parts ever stay in RAM, whatever the size of the
+attachments.
+"""
+
+import binascii
+import hashlib
+from email.parser import BytesFeedParser
+from tempfile import SpooledTemporaryFile
+
+# Spooled files move from memory to disk beyond this size
+SPOOL_MAX_SIZE = 512 * 1024
+
+# Size of the pieces read from (and fetched into) spooled files
+CHUNK_SIZE = 64 * 1024
+
+
+def spooled_file():
+    return SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+
+def _read_headers(fp):
+    """
+    Parse the header lines at the current position of fp, up to and
+    including the empty line that ends them.
+    """
+    parser = BytesFeedParser()
+    for line in iter(lambda: fp.readline(CHUNK_SIZE), b''):
+        if line in (b'\r\n', b'\n'):
+            break
+        parser.feed(line)
+    parser.feed(b'\r\n')
+    return parser.close()
+
+
+def message_headers(fp):
+    """
+    Return the top-level headers of the message in fp as an email.message.Message.
+    """
+    fp.seek(0)
+    return _read_headers(fp)
+
+
+def message_key(fp):
+    """
+    Return the Message-ID and the SHA-256 of the body of the message in fp.
+    """
+    headers = message_headers(fp)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return (headers.get('message-id') or '').strip()[:255], digest.hexdigest()
+
+
+class _Base64Decoder:
+    def __init__(self):
+        self.pending = b''
+
+    def decode(self, data):
+        data = self.pending + data.translate(None, b' \t\r\n')
+        complete = len(data) // 4 * 4
+        self.pending = data[complete:]
+        return binascii.a2b_base64(data[:complete]) if complete else b''
+
+    def flush(self):
+        return b''
+
+
+class _QuotedPrintableDecoder:
+    # Only complete lines are decoded, so soft line breaks are seen as a whole
+    def __init__(self):
+        self.pending = b''
+
+    def decode(self, data):
+        data = self.pending + data
+        complete = data.rfind(b'\n') + 1
+        self.pending = data[complete:]
+        return binascii.a2b_qp(data[:complete])
+
+    def flush(self):
+        return binascii.a2b_qp(self.pending)
+
+
+class _IdentityDecoder:
+    def decode(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+DECODERS = {
+    'base64': _Base64Decoder,
+    'quoted-printable': _QuotedPrintableDecoder,
+}
+
+
+def _boundary(line, boundaries):
+    """
+    Return (index of the boundary in boundaries, whether it is the closing
+    delimiter) if line is a delimiter line of an enclosing multipart, else None.
+    """
+    if not line.startswith(b'--'):
+        return None
+    line = line.rstrip()
+    for index in range(len(boundaries) - 1, -1, -1):
+        if line == b'--' + boundaries[index]:
+            return index, False
+        if line == b'--' + boundaries[index] + b'--':
+            return index, True
+    return None
+
+
+def _copy_part(fp, boundaries, out=None, decoder=None):
+    """
+    Read the body of a part up to the next delimiter line and write it
+    decoded to out (or skip it). Return the delimiter match, or None at the
+    end of the message.
+    """
+    line_start = True
+    eol = b''
+    for line in iter(lambda: fp.readline(CHUNK_SIZE), b''):
+        if line_start:
+            match = _boundary(line, boundaries)
+            if match:
+                break
+        line_start = line.endswith(b'\n')
+        if out is not None:
+            # The line break before a delimiter belongs to the delimiter
+            content = line.rstrip(b'\r\n') if line_start else line
+            out.write(decoder.decode(eol + content))
+            eol = line[len(content):]
+    else:
+        match = None
+    if out is not None:
+        out.write(decoder.flush())
+    return match
+
+
+def iter_parts(fp):
+    """
+    Yield (headers, body) for every non-multipart part of the message in fp,
+    in document order. body is a spooled temporary file with the decoded
+    content, positioned at its start.
+    """
+    fp.seek(0)
+    boundaries = []
+    headers = _read_headers(fp)
+    while headers is not None:
+        boundary = headers.get_boundary() if headers.get_content_maintype() == 'multipart' else None
+        if boundary:
+            # Skip the preamble
+            boundaries.append(boundary.encode('ascii', 'replace'))
+            match = _copy_part(fp, boundaries)
+        else:
+            body = spooled_file()
+            decoder = DECODERS.get(headers.get('content-transfer-encoding', '').strip().lower(), _IdentityDecoder)()
+            match = _copy_part(fp, boundaries, body, decoder)
+            body.seek(0)
+            yield headers, body
+
+        headers = None
+        while match:
+            index, closing = match
+            del boundaries[index + 1:]
+            if not closing:
+                headers = _read_headers(fp)
+                break
+            boundaries.pop()
+            # Skip the epilogue up to a delimiter of an outer multipart
+            match = _copy_part(fp, boundaries) if boundaries else None
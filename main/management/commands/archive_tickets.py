@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main.archive import ARCHIVE_BATCH_SIZE, archive_batch
+
+
+class Command(BaseCommand):
+    help = 'Move closed tickets with their followups and attachments into the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help='Archive tickets closed more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        closed_before = timezone.now() - timedelta(days=options['older_than'])
+
+        total = 0
+        while True:
+            archived = archive_batch(closed_before, options['batch_size'])
+            if not archived:
+                break
+            total += archived
+            self.stdout.write(f'{total} tickets archived')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} tickets closed before {closed_before:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from main.assignment import ASSIGNMENT_BATCH_SIZE, assign_unassigned
+
+
+class Command(BaseCommand):
+    help = 'Assign the unassigned open tickets according to the assignment rules, one batch per transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ASSIGNMENT_BATCH_SIZE,
+                            help='Tickets assigned per transaction.')
+
+    def handle(self, *args, **options):
+        total, after_id = 0, 0
+        while after_id is not None:
+            assigned, after_id = assign_unassigned(options['batch_size'], after_id)
+            total += assigned
+        self.stdout.write(self.style.SUCCESS(f'Assigned {total} tickets'))
@@ -0,0 +1,80 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.signed_cookies',
+)
+
+
+def view(request):
+    return HttpResponse(request.user.username)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the database queries and time per authenticated request of the session engines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Requests per session engine.')
+        parser.add_argument('--username', help='User the session belongs to (default: the first active user).')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(is_active=True).order_by('pk')
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No such active user')
+
+        self.stdout.write(f'{"Engine":<20}{"Session queries":>16}{"All queries":>13}{"ms/request":>12}')
+        for engine in ENGINES:
+            with override_settings(SESSION_ENGINE=engine):
+                session_queries, queries, ms = self.run(user, options['iterations'])
+            name = engine.rsplit('.', 1)[1] + (' *' if engine == settings.SESSION_ENGINE else '')
+            self.stdout.write(f'{name:<20}{session_queries:>16.2f}{queries:>13.2f}{ms:>12.3f}')
+        self.stdout.write('* configured in SESSION_ENGINE')
+
+    def run(self, user, iterations):
+        """
+        Return the session table queries, all queries and the median time in
+        milliseconds of an authenticated request through the session and
+        authentication middleware.
+        """
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+
+        handler = SessionMiddleware(AuthenticationMiddleware(view))
+        factory = RequestFactory()
+        samples, session_queries, queries = [], 0, 0
+        for _ in range(iterations):
+            request = factory.get('/')
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = store.session_key
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = handler(request)
+                samples.append((time.perf_counter() - start) * 1000)
+            if response.content.decode() != user.username:
+                raise CommandError(f'The session was not loaded with {settings.SESSION_ENGINE}')
+            queries += len(captured)
+            session_queries += sum('django_session' in query['sql'] for query in captured.captured_queries)
+
+        store.delete()
+        return session_queries / iterations, queries / iterations, statistics.median(samples)
@@ -0,0 +1,104 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine
+from django.template.backends.django import get_installed_libraries
+from django.test import RequestFactory
+from django.utils import timezone
+
+from main.forms import TicketCreateForm, UserSettingsForm
+from main.models import Ticket, summarize
+
+
+# Templates rendered by the benchmark. None of them need the database, so the
+# numbers only reflect template loading and rendering.
+TEMPLATES = (
+    'main/base.html',
+    'main/inbox.html',
+    'main/my-tickets.html',
+    'main/all-tickets.html',
+    'main/archive.html',
+    'main/includes/all_tickets_rows.html',
+    'main/includes/archive_rows.html',
+    'main/ticket_detail.html',
+    'main/ticket_edit.html',
+    'main/attachment_add.html',
+    'main/settings.html',
+)
+
+CACHED_LOADERS = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark render time of main/base.html and its child templates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Number of renders per template and profile.')
+        parser.add_argument('--rows', type=int, default=50,
+                            help='Number of tickets in the list pages.')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        engine_options = {
+            'dirs': settings.TEMPLATES[0]['DIRS'],
+            'libraries': get_installed_libraries(),
+        }
+        # Both profiles use the cached loader, the default of Django without
+        # an explicit "loaders" option; they differ in template debug tracing.
+        profiles = (
+            # Development profile (DEBUG=True)
+            Engine(loaders=CACHED_LOADERS, debug=True, **engine_options),
+            # Production profile (DJANGO_DEBUG=False)
+            Engine(loaders=CACHED_LOADERS, debug=False, **engine_options),
+        )
+        context = self.get_context(options['rows'])
+
+        self.stdout.write(f"{'template':<28}{'debug (ms)':>14}{'production (ms)':>17}{'ratio':>8}")
+        for name in TEMPLATES:
+            debug, production = [self.time_render(engine, name, context, iterations) for engine in profiles]
+            self.stdout.write(f'{name:<28}{debug:>14.3f}{production:>17.3f}{debug / production:>7.2f}x')
+
+    def time_render(self, engine, name, context, iterations):
+        """
+        Return the median time in milliseconds of loading and rendering a template,
+        the way render() does it on every request.
+        """
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            engine.get_template(name).render(Context(context))
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def get_context(self, rows):
+        request = RequestFactory().get('/inbox/')
+        user = User(id=1, username='bench', first_name='Bench', last_name='Mark')
+        now = timezone.now()
+        description = 'Lorem ipsum dolor sit amet. ' * 10
+        tickets = [
+            Ticket(id=i, title=f'Ticket {i}', description=description, summary=summarize(description),
+                   status=Ticket.Status.TODO, created=now, updated=now, closed_date=now)
+            for i in range(1, rows + 1)
+        ]
+        return {
+            'request': request,
+            'csrf_token': 'benchmark',
+            'user': user,
+            'ticket': tickets[0],
+            'tickets': tickets,
+            'tickets_unassigned': tickets,
+            'tickets_waiting': tickets[:5],
+            'attachments': [],
+            'followups': [],
+            'form': TicketCreateForm(),
+            'form_user': UserSettingsForm(instance=user),
+        }
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.export import export_tickets
+from main.forms import TicketExportForm
+
+
+class Command(BaseCommand):
+    help = 'Export tickets with their followups and attachments as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+        parser.add_argument('--status', help='Only tickets with this status.')
+        parser.add_argument('--from', dest='created_from', help='Created on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='created_to', help='Created on or before this date (YYYY-MM-DD).')
+        parser.add_argument('--assignee', help='Only tickets assigned to this username.')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip.')
+        parser.add_argument('--output', '-o', help='Output file (default: stdout).')
+
+    def handle(self, *args, **options):
+        form = TicketExportForm({
+            'format': options['format'],
+            'status': options['status'],
+            'created_from': options['created_from'],
+            'created_to': options['created_to'],
+            'assigned_to': options['assignee'],
+            'gzip': options['gzip'],
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        filters = form.cleaned_data
+        content = export_tickets(
+            filters['format'],
+            compress=filters['gzip'],
+            status=filters['status'],
+            created_from=filters['created_from'],
+            created_to=filters['created_to'],
+            assigned_to=filters['assigned_to'],
+        )
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in content:
+                    f.write(chunk)
+        else:
+            for chunk in content:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
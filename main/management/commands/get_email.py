@@ -33,117 +33,265 @@ OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
-import email
+import asyncio
 import imaplib
 import mimetypes
 import re
 import os
+from contextlib import contextmanager
 from email.header import decode_header
 from email.utils import parseaddr, collapse_rfc2231_value
-from optparse import make_option
 from email_reply_parser import EmailReplyParser
-from django.core.files.base import ContentFile
-from django.core.management.base import BaseCommand
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
 
 from django.contrib.auth.models import User
 
-try:
-    from django.utils import timezone
-except ImportError:
-    from datetime import datetime as timezone
+from django.utils import timezone
 
-from main.models import Ticket, Attachment, FollowUp
+from main.archive import restore_ticket
+from main.assignment import choose_assignee, notify_assignees
+from main.attachments import process_after_commit
+from main.mail import CHUNK_SIZE, iter_parts, message_headers, message_key, spooled_file
+from main.models import ID_MAX_DIGITS, Ticket, Attachment, FollowUp, OutboundMessage, ProcessedMessage
+from main.notifications import notify, ticket_url
 
+import logging
+
+logger = logging.getLogger(__name__)
 
-class Command(BaseCommand):
-    def __init__(self):
-        BaseCommand.__init__(self)
-
-        self.option_list += (
-            make_option(
-                '--quiet', '-q',
-                default=False,
-                action='store_true',
-                help='Hide details about each message as they are processed.'),
-            )
 
-    help = 'Process email inbox and create tickets.'
+class Command(BaseCommand):
+    help = 'Process the email inboxes and create tickets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quiet', '-q',
+            default=False,
+            action='store_true',
+            help='Hide details about each message as they are processed.')
+        parser.add_argument(
+            '--mailbox',
+            action='append',
+            help='Only process the mailbox with this name; can be given several times.')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.TICKET_MAILBOX_CONCURRENCY,
+            help='Number of mailboxes processed at the same time.')
 
     def handle(self, *args, **options):
         quiet = options.get('quiet', False)
-        process_inbox(quiet=quiet)
+        mailboxes = settings.TICKET_MAILBOXES
+        if options['mailbox']:
+            unknown = set(options['mailbox']) - {mailbox['name'] for mailbox in mailboxes}
+            if unknown:
+                raise CommandError(f"Unknown mailbox: {', '.join(sorted(unknown))}")
+            mailboxes = [mailbox for mailbox in mailboxes if mailbox['name'] in options['mailbox']]
+        if not mailboxes:
+            raise CommandError('No mailboxes configured, see TICKET_MAILBOXES.')
+
+        results = asyncio.run(process_mailboxes(mailboxes, concurrency=options['concurrency'], quiet=quiet))
+        if not quiet:
+            for name, count in results:
+                self.stdout.write(f"{name}: {'failed' if count is None else f'{count} messages processed'}")
+
+
+async def process_mailboxes(mailboxes, concurrency=1, quiet=False):
+    """
+    Process all mailboxes in one event loop, at most `concurrency` at a
+    time, and return a list of (mailbox name, number of processed messages);
+    the number is None when the mailbox failed.
+
+    imaplib and the ORM are blocking, so every mailbox is serviced in a
+    worker thread and the event loop only bounds and schedules them.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(mailbox):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(process_inbox, mailbox, quiet)
+            except Exception:
+                logger.exception(f"Error processing mailbox {mailbox['name']}")
+                return None
+
+    counts = await asyncio.gather(*(run(mailbox) for mailbox in mailboxes))
+    return [(mailbox['name'], count) for mailbox, count in zip(mailboxes, counts)]
+
+
+def process_inbox(mailbox, quiet=False):
+    """
+    Process IMAP inbox and return the number of processed messages.
+
+    Messages are addressed by UID, so runs working on the same mailbox at
+    the same time do not act on each other's message numbers. A message is
+    flagged as deleted only after its ticket has been committed.
+    """
+    processed = 0
+    try:
+        server = imaplib.IMAP4_SSL(mailbox['server'], mailbox.get('port', 993))
+        server.login(mailbox['user'], mailbox['password'])
+        server.select(mailbox.get('folder', 'INBOX'))
+        status, data = server.uid('SEARCH', None, 'NOT', 'DELETED')
+        if data and data[0]:
+            for uid in data[0].split():
+                try:
+                    with fetch_message(server, uid) as message:
+                        if message is None:
+                            # Removed by a concurrent run in the meantime
+                            continue
+                        done = process_message(message, quiet=quiet, mailbox=mailbox)
+                except Exception:
+                    # Left in the mailbox and retried by the next run
+                    logger.exception(f"Error processing message {uid.decode()} in mailbox {mailbox['name']}")
+                    continue
+                if done:
+                    server.uid('STORE', uid, '+FLAGS', '\\Deleted')
+                    processed += 1
+        server.expunge()
+        server.close()
+        server.logout()
+    finally:
+        # Each worker thread has its own database connection
+        connection.close()
+    return processed
+
+
+@contextmanager
+def fetch_message(server, uid):
+    """
+    Download a message in pieces of CHUNK_SIZE into a spooled temporary
+    file, without marking it as seen. Yields None if the message is gone.
+    """
+    status, data = server.uid('FETCH', uid, '(RFC822.SIZE)')
+    size = re.search(rb'RFC822\.SIZE (\d+)', data[0]) if data and data[0] else None
+    if not size:
+        yield None
+        return
+
+    with spooled_file() as fp:
+        for offset in range(0, int(size.group(1)), CHUNK_SIZE):
+            status, data = server.uid('FETCH', uid, f'(BODY.PEEK[]<{offset}.{CHUNK_SIZE}>)')
+            if not data or not isinstance(data[0], tuple):
+                yield None
+                return
+            fp.write(data[0][1])
+        yield fp
+
+
+def process_message(fp, quiet=False, mailbox=None):
+    """
+    Create the ticket or followup for a message (a binary file object) unless it is already in
+    the ledger of processed messages. Return True when the message can be
+    removed from the mailbox.
+    """
+    message_id, body_hash = message_key(fp)
+    if ProcessedMessage.objects.filter(message_id=message_id, body_hash=body_hash).exists():
+        logger.info(f"Skipping already processed message {message_id or body_hash}")
+        return True
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                entry = ProcessedMessage.objects.create(message_id=message_id, body_hash=body_hash)
+        except IntegrityError:
+            # Claimed by a concurrent run
+            logger.info(f"Message {message_id or body_hash} is processed by another run")
+            return True
+
+        result = ticket_from_message(message=fp, quiet=quiet, mailbox=mailbox)
+        if result:
+            entry.ticket = result if isinstance(result, Ticket) else result.ticket
+            entry.save(update_fields=['ticket'])
+    return bool(result)
 
 
-def process_inbox(quiet=False):
+def ticket_for_reply(message, subject):
     """
-    Process IMAP inbox
+    Return the ticket a message replies to, or None.
+
+    The Message-IDs in In-Reply-To and References (most recent first) are
+    looked up among the notifications sent about tickets and the messages
+    that created tickets; the "[#<id>]" tag in the subject is the fallback.
+    A reply to an archived ticket moves it back out of the archive.
     """
-    server = imaplib.IMAP4_SSL(os.environ["DJANGO_TICKET_INBOX_SERVER"], 993)
-    server.login(os.environ["DJANGO_TICKET_INBOX_USER"], os.environ["DJANGO_TICKET_INBOX_PASSWORD"])
-    server.select("INBOX")
-    status, data = server.search(None, 'NOT', 'DELETED')
-    if data:
-        msgnums = data[0].split()
-        for num in msgnums:
-            status, data = server.fetch(num, '(RFC822)')
-            ticket = ticket_from_message(message=data[0][1], quiet=quiet)
+    message_ids = re.findall(r'<[^<>\s]+>', ' '.join(message.get_all('in-reply-to', [])))
+    message_ids += reversed(re.findall(r'<[^<>\s]+>', ' '.join(message.get_all('references', []))))
+    message_ids = message_ids[:50]
+    if message_ids:
+        tickets = dict(OutboundMessage.objects.filter(message_id__in=message_ids).values_list('message_id', 'ticket'))
+        tickets.update(ProcessedMessage.objects.filter(message_id__in=message_ids, ticket__isnull=False)
+                       .values_list('message_id', 'ticket'))
+        for message_id in message_ids:
+            ticket = _live_ticket(tickets[message_id]) if message_id in tickets else None
             if ticket:
-                server.store(num, '+FLAGS', '\\Deleted')
-    server.expunge()
-    server.close()
-    server.logout()
+                return ticket
+
+    subject_id = re.search(rf'\[#(\d{{1,{ID_MAX_DIGITS}}})\]', subject)
+    if subject_id:
+        return _live_ticket(int(subject_id.group(1)))
+    return None
+
+
+def _live_ticket(ticket_id):
+    """
+    Return the ticket, restored from the archive if it was archived, or None
+    if it was deleted.
+    """
+    return Ticket.objects.filter(id=ticket_id).first() or restore_ticket(ticket_id)
 
 
 def decodeUnknown(charset, string):
+    if isinstance(string, str):
+        return string
     if not charset:
         try:
-            return string.decode('utf-8', 'ignore')
-        except:
+            return string.decode('utf-8')
+        except UnicodeDecodeError:
             return string.decode('iso8859-1', 'ignore')
-    return unicode(string, charset)
+    try:
+        return str(string, charset, 'replace')
+    except LookupError:
+        return string.decode('utf-8', 'replace')
 
 
 def decode_mail_headers(string):
     decoded = decode_header(string)
-    return u' '.join([unicode(msg, charset or 'utf-8') for msg, charset in decoded])
+    return ' '.join([decodeUnknown(charset, msg) for msg, charset in decoded])
 
 
-def ticket_from_message(message, quiet):
+def ticket_from_message(message, quiet, mailbox=None):
     """
-    Create a ticket or a followup (if ticket id in subject)
+    Create a ticket or a followup (if ticket id in subject). New tickets are
+    routed according to the mailbox they came from.
     """
-    msg = message
-    message = email.message_from_string(msg)
+    fp = message
+    message = message_headers(fp)
     subject = message.get('subject', 'Created from e-mail')
     subject = decode_mail_headers(decodeUnknown(message.get_charset(), subject))
     sender = message.get('from', ('Unknown Sender'))
     sender = decode_mail_headers(decodeUnknown(message.get_charset(), sender))
     sender_email = parseaddr(sender)[1]
-    body_plain, body_html = '', ''
-
-    matchobj = re.match(r".*\["+"-(?P<id>\d+)\]", subject)
-    if matchobj:
-        # This is a reply or forward.
-        ticket = matchobj.group('id')
-    else:
-        ticket = None
+    body_plain, body_html = '', None
 
     counter = 0
     files = []
 
-    for part in message.walk():
-        if part.get_content_maintype() == 'multipart':
-            continue
-
-        name = part.get_param("name")
+    # the decoded parts are spooled files, written to the storage below
+    for part, content in iter_parts(fp):
+        name = part.get_filename() or part.get_param("name")
         if name:
             name = collapse_rfc2231_value(name)
 
         if part.get_content_maintype() == 'text' and name == None:
             if part.get_content_subtype() == 'plain':
-                body_plain = EmailReplyParser.parse_reply(decodeUnknown(part.get_content_charset(), part.get_payload(decode=True)))
+                with content:
+                    body_plain = EmailReplyParser.parse_reply(decodeUnknown(part.get_content_charset(), content.read()))
             else:
-                body_html = part.get_payload(decode=True)
+                body_html = content
         else:
             if not name:
                 ext = mimetypes.guess_extension(part.get_content_type())
@@ -151,7 +299,7 @@ def ticket_from_message(message, quiet):
 
             files.append({
                 'filename': name,
-                'content': part.get_payload(decode=True),
+                'content': content,
                 'type': part.get_content_type()},
             )
 
@@ -169,135 +317,79 @@ def ticket_from_message(message, quiet):
             'type': 'text/html',
         })
 
-    now = timezone.now()
+    try:
+        return _save_message(files, subject, body, sender_email, message, quiet, mailbox)
+    finally:
+        for file in files:
+            file['content'].close()
 
-    if ticket:
-        try:
-            t = Ticket.objects.get(id=ticket)
-            new = False
-        except Ticket.DoesNotExist:
-            ticket = None
-
-    if ticket == None:
-
-        # set owner depending on sender_email
-        # list of all email addresses from the user model
-        users = User.objects.all()
-        email_addresses = []
-        for user in users:
-            email_addresses.append(user.email)
-
-        ############################################################
-        # if ticket id in subject => new followup instead of new ticket
-        tickets = Ticket.objects.all()
-        ticket_ids = []
-        for ticket in tickets:
-            ticket_ids.append(ticket.id)
-
-        # extract id from subject
-        subject_id = re.search(r'\[#(\d*)\]\s.*', subject)
-        try:
-            subject_id = subject_id.group(1)
-        except:
-            subject_id = "0000"  # no valid id
-
-        # if there was an ID in the subject, create followup
-        if int(subject_id) in ticket_ids:
-
-            if sender_email in email_addresses:
-                f = FollowUp(
-                           title=subject,
-                           created=now,
-                           text=body,
-                           ticket=Ticket.objects.get(id=subject_id),
-                           user=User.objects.get(email=sender_email),
-                )
-            else:
-                f = FollowUp(
-                           title=subject,
-                           created=now,
-                           text=body,
-                           ticket=Ticket.objects.get(id=subject_id),
-                )
 
-            f.save()
+def _save_message(files, subject, body, sender_email, message, quiet, mailbox):
+    """
+    Create the followup or ticket for a parsed message, and its attachments.
+    """
+    now = timezone.now()
 
-        # if no ID in the subject, create ticket
-        else:
+    # set owner depending on sender_email
+    owner = User.objects.filter(email=sender_email).first() if sender_email else None
 
-            # if known sender, set also the field owner
-            if sender_email in email_addresses:
-                t = Ticket(
-                           title=subject,
-                           status="TODO",
-                           created=now,
-                           description=body,
-                           owner=User.objects.get(email=sender_email),
-                )
-            # if unknown sender, skip the field owner
-            else:
-                t = Ticket(
-                           title=subject,
-                           status="TODO",
-                           created=now,
-                           description=body,
-                )
+    # a reply to a ticket => new followup instead of new ticket
+    t = ticket_for_reply(message, subject)
 
+    if t:
+        if t.status == Ticket.CLOSED_STATUS:
+            t.status = Ticket.REOPENED_STATUS
             t.save()
 
-            from django.core.mail import send_mail
-            notification_subject = "[#" + str(t.id) + "] New ticket created"
-            notification_body = "Hi,\n\na new ticket was created: http://localhost:8000/ticket/" \
-                                + str(t.id) + "/"
-            send_mail(notification_subject, notification_body, os.environ["DJANGO_TICKET_EMAIL_NOTIFICATIONS_FROM"],
-                            [os.environ["DJANGO_TICKET_EMAIL_NOTIFICATIONS_TO"]], fail_silently=False)
+        result = FollowUp(
+                   title=subject,
+                   created=now,
+                   text=body,
+                   ticket=t,
+                   user=owner,
+        )
+        result.save()
 
-        ############################################################
-
-        new = True
-        update = ''
-
-    elif t.status == Ticket.CLOSED_STATUS:
-        t.status = Ticket.REOPENED_STATUS
+    # if not a reply, create ticket
+    else:
+        # if unknown sender, the field owner stays empty
+        result = t = Ticket(
+                   title=subject,
+                   status=Ticket.Status.TODO,
+                   created=now,
+                   description=body,
+                   owner=owner,
+                   assigned_to_id=choose_assignee(subject, sender_email, mailbox),
+        )
         t.save()
+        if t.assigned_to_id:
+            notify_assignees([t])
+
+        notify([settings.TICKET_EMAIL_NOTIFICATIONS_TO], "New ticket created",
+               f"a new ticket was created: {ticket_url(t.id)}", ticket_id=t.id)
 
     # files of followups should be assigned to the corresponding ticket
     for file in files:
 
-        if file['content']:
+        # skip empty parts
+        if file['content'].seek(0, os.SEEK_END):
+            file['content'].seek(0)
 
-            filename = file['filename'].encode('ascii', 'replace').replace(' ', '_')
+            filename = file['filename'].encode('ascii', 'replace').decode('ascii').replace(' ', '_')
             filename = re.sub('[^a-zA-Z0-9._-]+', '', filename)
 
-            # if followup
-            if int(subject_id) in ticket_ids:
-                a = Attachment(
-                           ticket=Ticket.objects.get(id=subject_id),
-                           filename=filename,
-                           #mime_type=file['type'],
-                           #size=len(file['content']),
-                )
+            a = Attachment(
+                       ticket=t,
+                       filename=filename,
+                       #mime_type=file['type'],
+                       #size=len(file['content']),
+            )
 
-            # if new ticket
-            else:
-                a = Attachment(
-                           ticket=t,
-                           filename=filename,
-                           #mime_type=file['type'],
-                           #size=len(file['content']),
-                )
-
-            a.file.save(filename, ContentFile(file['content']), save=False)
+            a.file.save(filename, File(file['content']), save=False)
             a.save()
+            process_after_commit(a)
 
             if not quiet:
-                print " - %s" % filename
-
-    if int(subject_id) in ticket_ids:
-        return f
-    else:
-        return t
-
+                logger.info(f"Saved attachment {filename} of ticket {t.id}")
 
-if __name__ == '__main__':
-    process_email()
+    return result
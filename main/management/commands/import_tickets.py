@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.importer import IMPORT_BATCH_SIZE, READERS, ImportFormatError, InvalidRecord, TicketImporter
+from main.models import Ticket
+
+
+class Command(BaseCommand):
+    help = 'Import tickets in batches from a CSV, JSON Lines or mbox file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Input format (default: derived from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--status', default='TODO', choices=Ticket.Status.labels,
+                            help='Status of records without a status (default: TODO).')
+        parser.add_argument('--checkpoint',
+                            help='File recording the progress; an interrupted import resumes from it.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File {path} does not exist')
+
+        import_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if import_format not in READERS:
+            raise CommandError(f'Unknown format "{import_format}", use --format')
+
+        checkpoint = options['checkpoint']
+        done = self.read_checkpoint(checkpoint, path)
+        if done:
+            self.stdout.write(f'Resuming after {done} records')
+
+        importer = TicketImporter(default_status=Ticket.status_from_label(options['status']),
+                                  batch_size=options['batch_size'])
+        records = READERS[import_format](path, skip=done)
+
+        imported = skipped = 0
+        start = time.monotonic()
+        try:
+            for batch in importer.batches(records):
+                invalid = [record for record in batch if isinstance(record, InvalidRecord)]
+                for error in invalid:
+                    self.stderr.write(f'Skipped: {error}')
+                skipped += len(invalid)
+                imported += importer.import_batch(batch)
+                self.write_checkpoint(checkpoint, path, done + imported + skipped)
+                self.stdout.write(f'{done + imported + skipped} records processed '
+                                  f'({self.rate(imported, start):.0f} rows/s)')
+        except ImportFormatError as e:
+            raise CommandError(f'Cannot import {path}: {e}')
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} tickets in {elapsed:.1f}s ({self.rate(imported, start):.0f} rows/s)'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {skipped} invalid records'))
+
+    def rate(self, records, start):
+        elapsed = time.monotonic() - start
+        return records / elapsed if elapsed else 0
+
+    def read_checkpoint(self, checkpoint, path):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            data = json.load(f)
+        if data.get('source') != os.path.abspath(path):
+            raise CommandError(f'Checkpoint {checkpoint} belongs to {data.get("source")}')
+        return data['records']
+
+    def write_checkpoint(self, checkpoint, path, records):
+        if not checkpoint:
+            return
+        # Write and rename, so a crash never leaves a truncated checkpoint
+        with open(checkpoint + '.tmp', 'w') as f:
+            json.dump({'source': os.path.abspath(path), 'records': records}, f)
+        os.replace(checkpoint + '.tmp', checkpoint)
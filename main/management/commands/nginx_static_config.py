@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+CONFIG_TEMPLATE = """\
+# Generated by "manage.py nginx_static_config".
+
+# --- http {{ }} context ---
+# Files with a content hash in their name (written by collectstatic) never
+# change and may be cached forever; everything else is revalidated.
+map $uri $static_cache_control {{
+    "~\\.[0-9a-f]{{12}}\\.[^./]+$"  "public, max-age=31536000, immutable";
+    default                      "public, max-age=60";
+}}
+
+# --- server {{ }} context ---
+location {static_url} {{
+    alias {static_root}/;
+    gzip_static on;
+{brotli}    add_header Cache-Control $static_cache_control;
+    access_log off;
+}}
+
+location {media_url} {{
+    alias {media_root}/;
+}}
+"""
+
+
+class Command(BaseCommand):
+    help = 'Print an nginx configuration snippet serving the collected static files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-brotli', action='store_true',
+                            help='Omit "brotli_static" for nginx builds without ngx_brotli.')
+
+    def handle(self, *args, **options):
+        brotli = '' if options['no_brotli'] else '    brotli_static on;  # requires ngx_brotli\n'
+        self.stdout.write(CONFIG_TEMPLATE.format(
+            static_url=settings.STATIC_URL,
+            static_root=str(settings.STATIC_ROOT).rstrip('/'),
+            media_url=settings.MEDIA_URL,
+            media_root=str(settings.MEDIA_ROOT).rstrip('/'),
+            brotli=brotli,
+        ), ending='')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from main.attachments import process_attachment
+from main.models import Attachment, ScanStatus
+
+
+class Command(BaseCommand):
+    help = 'Queue the scan, thumbnail and text extraction of attachments that have not been processed yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Queue at most this many attachments.')
+        parser.add_argument('--all', action='store_true', help='Process all attachments again, except quarantined ones.')
+
+    def handle(self, *args, **options):
+        # Infected files were moved to the quarantine directory
+        attachments = Attachment.objects.exclude(scan_status=ScanStatus.INFECTED).order_by('id')
+        if not options['all']:
+            attachments = attachments.filter(processed__isnull=True)
+        if options['limit']:
+            attachments = attachments[:options['limit']]
+
+        count = 0
+        for attachment_id in attachments.values_list('id', flat=True).iterator():
+            process_attachment.enqueue(attachment_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Queued {count} attachments, run_workers processes them'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount the cached navbar ticket counters from the database.'
+
+    def handle(self, *args, **options):
+        count = reconcile()
+        if not count:
+            self.stdout.write(self.style.WARNING('The cache is local to each process, nothing to reconcile'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {count} counters'))
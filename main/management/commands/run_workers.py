@@ -0,0 +1,48 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from main.tasks import work, work_in_process
+
+
+class Command(BaseCommand):
+    help = 'Run the tasks queued with main.tasks, until stopped with SIGTERM or Ctrl-C.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Number of workers.')
+        parser.add_argument('--processes', action='store_true',
+                            help='Run the workers in processes instead of threads, for CPU-bound tasks.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due.')
+
+    def handle(self, *args, **options):
+        count = options['concurrency']
+        burst = options['burst']
+
+        if options['processes']:
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            # Forked workers must not share the connections of this process
+            connections.close_all()
+            workers = [context.Process(target=work_in_process, args=(stop, burst), name=f'task-worker-{i}')
+                       for i in range(count)]
+        else:
+            stop = threading.Event()
+            workers = [threading.Thread(target=work, args=(stop, burst), name=f'task-worker-{i}')
+                       for i in range(count)]
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        for worker in workers:
+            worker.start()
+        kind = 'processes' if options['processes'] else 'threads'
+        self.stdout.write(f'Started {count} worker {kind}')
+
+        # Joined with a timeout, so the signal handlers get to run
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(1)
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
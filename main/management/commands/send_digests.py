@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from main.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Send the collected ticket notifications as one digest email per recipient.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int,
+                            help='Only send digests whose oldest notification is older than this many seconds '
+                                 '(default: TICKET_NOTIFICATION_DIGEST_WINDOW).')
+
+    def handle(self, *args, **options):
+        sent = send_digests(window=options['window'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digest emails'))
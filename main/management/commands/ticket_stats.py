@@ -0,0 +1,54 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main import analytics
+
+
+class Command(BaseCommand):
+    help = 'Compute ticket lifecycle metrics with NumPy and write them to an .npz file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='created_from', help='Created on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='created_to', help='Created before this date (YYYY-MM-DD).')
+        parser.add_argument('--output', '-o', default='ticket_stats.npz', help='Output file.')
+        parser.add_argument('--no-columns', action='store_true',
+                            help='Only store the metrics, not the raw ticket columns.')
+
+    def handle(self, *args, **options):
+        if analytics.np is None:
+            raise CommandError('ticket_stats requires NumPy ("pip install numpy")')
+        np = analytics.np
+
+        start = time.monotonic()
+        columns = analytics.load_columns(self.parse_date(options['created_from']),
+                                         self.parse_date(options['created_to']))
+        loaded = time.monotonic()
+        stats = analytics.compute_stats(columns)
+        computed = time.monotonic()
+
+        arrays = dict(stats)
+        if not options['no_columns']:
+            arrays.update({f'ticket_{name}': values for name, values in columns.items()})
+        np.savez_compressed(options['output'], **arrays)
+
+        self.stdout.write(f"{columns['id'].size} tickets loaded in {loaded - start:.2f}s, "
+                          f"metrics computed in {computed - loaded:.3f}s")
+        self.stdout.write('Resolution time (hours):')
+        for percentile, hours in zip(stats['resolution_percentiles'], stats['resolution_hours']):
+            self.stdout.write(f'  p{percentile}: {hours:.1f}')
+        self.stdout.write('Open tickets by age (days):')
+        bins = stats['age_bins_days']
+        for low, high, count in zip(bins[:-1], bins[1:], stats['age_counts']):
+            self.stdout.write(f'  {low:g}-{high:g}: {count}')
+        self.stdout.write(self.style.SUCCESS(f"Written to {options['output']}"))
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main.reports import update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Update the dashboard rollup tables with the tickets changed since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild the rollups from the whole ticket history.')
+
+    def handle(self, *args, **options):
+        days = update_rollups(full=options['full'])
+        self.stdout.write(f'{days} days recomputed')
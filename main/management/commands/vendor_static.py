@@ -0,0 +1,46 @@
+import os
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+DATATABLES_CDN = 'https://cdn.datatables.net/1.10.15/'
+
+# Third-party assets served from our own static files instead of a CDN,
+# as (source URL, target path below the first STATICFILES_DIRS entry).
+# They are committed; run the command with --force after changing a version.
+# The Bootstrap 3 integration draws the sort icons with Bootstrap's glyphicons.
+VENDORED_FILES = (
+    (DATATABLES_CDN + 'js/jquery.dataTables.min.js', 'datatables/js/jquery.dataTables.min.js'),
+    (DATATABLES_CDN + 'js/dataTables.bootstrap.min.js', 'datatables/js/dataTables.bootstrap.min.js'),
+    (DATATABLES_CDN + 'css/dataTables.bootstrap.min.css', 'datatables/css/dataTables.bootstrap.min.css'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Download the pinned third-party assets (DataTables) into the static directory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Download files even if they already exist.')
+
+    def handle(self, *args, **options):
+        static_dir = settings.STATICFILES_DIRS[0]
+
+        for url, target in VENDORED_FILES:
+            path = os.path.join(static_dir, target)
+            if os.path.exists(path) and not options['force']:
+                self.stdout.write(f' - {target} (exists)')
+                continue
+
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    content = response.read()
+            except OSError as e:
+                raise CommandError(f'Failed to download {url}: {e}')
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.stdout.write(f' - {target}')
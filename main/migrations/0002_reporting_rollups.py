@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-19 16:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Name')),
+                ('high_water_mark', models.DateTimeField(blank=True, null=True, verbose_name='High-water mark')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyTicketStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(db_index=True, verbose_name='Day')),
+                ('opened', models.PositiveIntegerField(default=0, verbose_name='Opened')),
+                ('closed', models.PositiveIntegerField(default=0, verbose_name='Closed')),
+                ('resolution_seconds', models.FloatField(default=0, verbose_name='Resolution time (s)')),
+                ('first_responses', models.PositiveIntegerField(default=0, verbose_name='First responses')),
+                ('first_response_seconds', models.FloatField(default=0, verbose_name='First response time (s)')),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Assigned to')),
+            ],
+            options={
+                'verbose_name': 'Daily ticket statistics',
+                'verbose_name_plural': 'Daily ticket statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='BacklogSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True, verbose_name='Hour')),
+                ('status', models.CharField(blank=True, max_length=255, null=True, verbose_name='Status')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'ordering': ['hour'],
+                'unique_together': {('hour', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+from django.db import migrations, models
+
+
+STATUS_VALUES = {
+    'TODO': 1,
+    'IN PROGRESS': 2,
+    'WAITING': 3,
+    'DONE': 4,
+}
+
+
+def status_to_integer(apps, schema_editor):
+    Ticket = apps.get_model('main', 'Ticket')
+    BacklogSnapshot = apps.get_model('main', 'BacklogSnapshot')
+    for label, value in STATUS_VALUES.items():
+        Ticket.objects.filter(status=label).update(status_code=value)
+        BacklogSnapshot.objects.filter(status=label).update(status_code=value)
+    # Tickets without status had the default TODO before, snapshots of
+    # tickets without status cannot be mapped
+    BacklogSnapshot.objects.filter(status_code__isnull=True).delete()
+
+
+def status_to_string(apps, schema_editor):
+    Ticket = apps.get_model('main', 'Ticket')
+    BacklogSnapshot = apps.get_model('main', 'BacklogSnapshot')
+    for label, value in STATUS_VALUES.items():
+        Ticket.objects.filter(status_code=value).update(status=label)
+        BacklogSnapshot.objects.filter(status_code=value).update(status=label)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_reporting_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='backlogsnapshot',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(status_to_integer, status_to_string),
+        migrations.AlterUniqueTogether(
+            name='backlogsnapshot',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='ticket',
+            name='status',
+        ),
+        migrations.RemoveField(
+            model_name='backlogsnapshot',
+            name='status',
+        ),
+        migrations.RenameField(
+            model_name='ticket',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.RenameField(
+            model_name='backlogsnapshot',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'TODO'), (2, 'IN PROGRESS'), (3, 'WAITING'), (4, 'DONE')], db_index=True, default=1, verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='backlogsnapshot',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'TODO'), (2, 'IN PROGRESS'), (3, 'WAITING'), (4, 'DONE')], verbose_name='Status'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='backlogsnapshot',
+            unique_together={('hour', 'status')},
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-19 16:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.CharField(db_index=True, max_length=255, verbose_name='Message-ID')),
+                ('body_hash', models.CharField(max_length=64, verbose_name='Body hash')),
+                ('processed', models.DateTimeField(auto_now_add=True)),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.ticket', verbose_name='Ticket')),
+            ],
+            options={
+                'unique_together': {('message_id', 'body_hash')},
+            },
+        ),
+    ]
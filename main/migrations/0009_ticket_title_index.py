@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_ticket_created_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='title',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Title'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+SUMMARY_LENGTH = 200
+BATCH_SIZE = 1000
+
+
+def summarize(text):
+    # Copy of main.models.summarize at the time of this migration
+    text = ' '.join((text or '').split(maxsplit=SUMMARY_LENGTH)[:SUMMARY_LENGTH])
+    if len(text) > SUMMARY_LENGTH:
+        text = text[:SUMMARY_LENGTH - 1].rstrip() + '…'
+    return text
+
+
+def fill_summaries(apps, schema_editor):
+    for model_name in ('Ticket', 'ArchivedTicket'):
+        model = apps.get_model('main', model_name)
+        batch = []
+        for ticket in model.objects.only('id', 'description').iterator(chunk_size=BATCH_SIZE):
+            ticket.summary = summarize(ticket.description)
+            batch.append(ticket)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, ['summary'])
+                batch = []
+        model.objects.bulk_update(batch, ['summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_ticket_title_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedticket',
+            name='summary',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Summary'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='summary',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='Summary'),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
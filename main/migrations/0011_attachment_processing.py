@@ -0,0 +1,63 @@
+# Generated by Django 4.2 on 2026-10-19 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_ticket_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedattachment',
+            name='processed',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Processed'),
+        ),
+        migrations.AddField(
+            model_name='archivedattachment',
+            name='scan_detail',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Scan detail'),
+        ),
+        migrations.AddField(
+            model_name='archivedattachment',
+            name='scan_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('clean', 'Clean'), ('infected', 'Infected'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Scan status'),
+        ),
+        migrations.AddField(
+            model_name='archivedattachment',
+            name='text',
+            field=models.TextField(blank=True, verbose_name='Text'),
+        ),
+        migrations.AddField(
+            model_name='archivedattachment',
+            name='thumbnail',
+            field=models.FileField(blank=True, max_length=1000, upload_to='', verbose_name='Thumbnail'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='processed',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Processed'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='scan_detail',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Scan detail'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='scan_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('clean', 'Clean'), ('infected', 'Infected'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Scan status'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='text',
+            field=models.TextField(blank=True, verbose_name='Text'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='thumbnail',
+            field=models.FileField(blank=True, max_length=1000, upload_to='', verbose_name='Thumbnail'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-19 16:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_attachment_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Name')),
+                ('args', models.JSONField(default=list, verbose_name='Arguments')),
+                ('kwargs', models.JSONField(default=dict, verbose_name='Keyword arguments')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Run at')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('max_attempts', models.PositiveSmallIntegerField(verbose_name='Max. attempts')),
+                ('last_error', models.TextField(blank=True, verbose_name='Last error')),
+                ('failed', models.DateTimeField(blank=True, null=True, verbose_name='Failed')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='queuedtask',
+            index=models.Index(condition=models.Q(('failed__isnull', True)), fields=['run_at'], name='queuedtask_due_idx'),
+        ),
+    ]
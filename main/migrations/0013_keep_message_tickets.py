@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-19 16:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_task_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboundmessage',
+            name='ticket',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='main.ticket', verbose_name='Ticket'),
+        ),
+        migrations.AlterField(
+            model_name='processedmessage',
+            name='ticket',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='main.ticket', verbose_name='Ticket'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_bigautofield_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyticketstats',
+            name='stale',
+            field=models.BooleanField(default=False, verbose_name='Stale'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 17:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_dailyticketstats_stale'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pendingnotification',
+            name='ticket',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='main.ticket', verbose_name='Ticket'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.conf import settings
 import os
@@ -25,15 +26,67 @@ def create_groups():
     user_group.permissions.clear()
 
 
+# Groups whose members work on tickets
+AGENT_GROUPS = ('Admin', 'Call Center')
+
+
+def assignable_users():
+    """
+    Return the users tickets can be assigned to: the active members of AGENT_GROUPS.
+    """
+    return User.objects.filter(is_active=True, groups__name__in=AGENT_GROUPS).distinct()
+
+
+# Characters of the description kept in Ticket.summary
+SUMMARY_LENGTH = 200
+
+# Digits of the longest ticket, followup or attachment id looked up from
+# user input; longer numbers do not fit a bigint id and make PostgreSQL raise
+ID_MAX_DIGITS = 18
+
+
+def summarize(text):
+    """
+    Return the beginning of text with whitespace collapsed, at most
+    SUMMARY_LENGTH characters long.
+    """
+    # SUMMARY_LENGTH words are always enough; the rest stays one unsplit string
+    text = ' '.join((text or '').split(maxsplit=SUMMARY_LENGTH)[:SUMMARY_LENGTH])
+    if len(text) > SUMMARY_LENGTH:
+        text = text[:SUMMARY_LENGTH - 1].rstrip() + '…'
+    return text
+
+
 class Ticket(models.Model):
-    STATUS_CHOICES = (
-        ('TODO', 'TODO'),
-        ('IN PROGRESS', 'IN PROGRESS'),
-        ('WAITING', 'WAITING'),
-        ('DONE', 'DONE'),
-    )
+    class Status(models.IntegerChoices):
+        TODO = 1, 'TODO'
+        IN_PROGRESS = 2, 'IN PROGRESS'
+        WAITING = 3, 'WAITING'
+        DONE = 4, 'DONE'
 
-    title = models.CharField('Title', max_length=255)
+    # Allowed status changes: TODO -> IN PROGRESS -> WAITING -> DONE, and back
+    # to IN PROGRESS when the wait is over. Any open ticket may be closed
+    # (e.g. duplicates, the bulk "Close" action); a closed ticket can only be
+    # reopened.
+    TRANSITIONS = {
+        Status.TODO: {Status.IN_PROGRESS, Status.DONE},
+        Status.IN_PROGRESS: {Status.WAITING, Status.DONE},
+        Status.WAITING: {Status.IN_PROGRESS, Status.DONE},
+        Status.DONE: {Status.TODO},
+    }
+    CLOSED_STATUS = Status.DONE
+    REOPENED_STATUS = Status.TODO
+
+    # Bootstrap label class per status
+    STATUS_LABELS = {
+        Status.TODO: 'danger',
+        Status.IN_PROGRESS: 'default',
+        Status.WAITING: 'warning',
+        Status.DONE: 'success',
+    }
+
+    # Indexed for the prefix search of the ticket autocomplete
+    title = models.CharField('Title', max_length=255, db_index=True)
     owner = models.ForeignKey(
         User,
         related_name='owned_tickets',
@@ -43,12 +96,13 @@ class Ticket(models.Model):
         on_delete=models.SET_NULL
     )
     description = models.TextField('Description', blank=True, null=True)
-    status = models.CharField(
+    # Beginning of the description shown in the ticket lists, see summarize()
+    summary = models.CharField('Summary', max_length=SUMMARY_LENGTH, blank=True, editable=False)
+    status = models.PositiveSmallIntegerField(
         'Status',
-        choices=STATUS_CHOICES,
-        max_length=255,
-        blank=True,
-        null=True
+        choices=Status.choices,
+        default=Status.TODO,
+        db_index=True
     )
     waiting_for = models.ForeignKey(
         User,
@@ -58,7 +112,8 @@ class Ticket(models.Model):
         verbose_name='Waiting For',
         on_delete=models.SET_NULL
     )
-    # Automatically set to now when status changes to "DONE"
+    # Automatically set to now when the ticket is closed and cleared when it
+    # is reopened, see save()
     closed_date = models.DateTimeField(blank=True, null=True)
     assigned_to = models.ForeignKey(
         User,
@@ -68,12 +123,78 @@ class Ticket(models.Model):
         verbose_name='Assigned to',
         on_delete=models.SET_NULL
     )
-    created = models.DateTimeField(auto_now_add=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
     updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f'Ticket #{self.id}: {self.title}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as stored in the database, to validate transitions
+        instance._loaded_status = instance.__dict__.get('status')
+        # Assignment as stored in the database, for the counters in main.counters
+        instance._loaded_assignment = tuple(
+            instance.__dict__.get(name, models.DEFERRED) for name in ('assigned_to_id', 'waiting_for_id')
+        )
+        return instance
+
+    @classmethod
+    def statuses_allowing(cls, status):
+        """
+        Return the statuses from which a ticket may change to the given status.
+        Used to enforce the transitions in bulk updates.
+        """
+        return [source for source, targets in cls.TRANSITIONS.items() if source == status or status in targets]
+
+    @classmethod
+    def status_from_label(cls, label):
+        """
+        Return the status with the given label, e.g. "IN PROGRESS".
+        """
+        for status in cls.Status:
+            if status.label == label:
+                return status
+        raise ValueError(f"Unknown status: {label}")
+
+    @property
+    def status_label(self):
+        return self.STATUS_LABELS.get(self.status, 'default')
+
+    def can_change_status_to(self, status):
+        loaded_status = getattr(self, '_loaded_status', None)
+        return loaded_status is None or loaded_status == status or status in self.TRANSITIONS[loaded_status]
+
+    def validate_status(self):
+        if not self.can_change_status_to(self.status):
+            raise ValidationError({'status': (
+                f"A ticket cannot change from {self.Status(self._loaded_status).label} "
+                f"to {self.Status(self.status).label}."
+            )})
+
+    def clean(self):
+        super().clean()
+        self.validate_status()
+
+    def save(self, *args, **kwargs):
+        self.validate_status()
+        loaded_status = getattr(self, '_loaded_status', None)
+        if self.status == self.CLOSED_STATUS and loaded_status != self.CLOSED_STATUS:
+            self.closed_date = timezone.now()
+        elif self.status != self.CLOSED_STATUS and loaded_status == self.CLOSED_STATUS:
+            self.closed_date = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            update_fields = kwargs['update_fields'] = {*update_fields, 'closed_date'}
+        if update_fields is None or 'description' in update_fields:
+            self.summary = summarize(self.description)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'summary'}
+        super().save(*args, **kwargs)
+        self._loaded_status = self.status
+        self._loaded_assignment = (self.assigned_to_id, self.waiting_for_id)
+
 class FollowUp(models.Model):
     """
     A FollowUp is a comment or update related to a specific ticket.
@@ -102,7 +223,7 @@ class FollowUp(models.Model):
         ordering = ['-modified']
 
     def __str__(self):
-        return f'FollowUp #{self.id} for Ticket #{self.ticket.id}'
+        return f'FollowUp #{self.id} for Ticket #{self.ticket_id}'
 
 
 def attachment_path(instance, filename):
@@ -113,6 +234,13 @@ def attachment_path(instance, filename):
     return os.path.join('tickets', str(instance.ticket.id), filename)
 
 
+class ScanStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    CLEAN = 'clean', 'Clean'
+    INFECTED = 'infected', 'Infected'
+    FAILED = 'failed', 'Failed'
+
+
 class Attachment(models.Model):
     """
     An Attachment is a file associated with a specific ticket.
@@ -138,6 +266,13 @@ class Attachment(models.Model):
         on_delete=models.SET_NULL
     )
     created = models.DateTimeField(auto_now_add=True)
+    # Results of the post-processing in main.attachments
+    thumbnail = models.FileField('Thumbnail', max_length=1000, blank=True)
+    text = models.TextField('Text', blank=True)
+    scan_status = models.CharField('Scan status', max_length=10, choices=ScanStatus.choices,
+                                   default=ScanStatus.PENDING)
+    scan_detail = models.CharField('Scan detail', max_length=255, blank=True)
+    processed = models.DateTimeField('Processed', blank=True, null=True, db_index=True)
 
     class Meta:
         verbose_name = 'Attachment'
@@ -145,3 +280,301 @@ class Attachment(models.Model):
 
     def __str__(self):
         return self.filename
+
+
+class ArchivedTicket(models.Model):
+    """
+    A closed ticket moved out of the ticket table by the management command
+    "archive_tickets". It keeps the id of the original ticket.
+    """
+    STATUS_LABELS = Ticket.STATUS_LABELS
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField('Title', max_length=255)
+    owner = models.ForeignKey(
+        User,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='Owner',
+        on_delete=models.SET_NULL
+    )
+    description = models.TextField('Description', blank=True, null=True)
+    summary = models.CharField('Summary', max_length=SUMMARY_LENGTH, blank=True, editable=False)
+    status = models.PositiveSmallIntegerField('Status', choices=Ticket.Status.choices)
+    waiting_for = models.ForeignKey(
+        User,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='Waiting For',
+        on_delete=models.SET_NULL
+    )
+    closed_date = models.DateTimeField(blank=True, null=True, db_index=True)
+    assigned_to = models.ForeignKey(
+        User,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='Assigned to',
+        on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    status_label = Ticket.status_label
+
+    def __str__(self):
+        return f'Ticket #{self.id}: {self.title} (archived)'
+
+
+class ArchivedFollowUp(models.Model):
+    """
+    A followup of an archived ticket.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    ticket = models.ForeignKey(
+        ArchivedTicket,
+        related_name='followups',
+        verbose_name='Ticket',
+        on_delete=models.CASCADE
+    )
+    date = models.DateTimeField('Date')
+    title = models.CharField('Title', max_length=200)
+    text = models.TextField('Text', blank=True, null=True)
+    user = models.ForeignKey(
+        User,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='User',
+        on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField()
+    modified = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-modified']
+
+    def __str__(self):
+        return f'FollowUp #{self.id} for Ticket #{self.ticket_id} (archived)'
+
+
+class ArchivedAttachment(models.Model):
+    """
+    The metadata of an attachment of an archived ticket. The file itself
+    stays where it is.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    ticket = models.ForeignKey(
+        ArchivedTicket,
+        related_name='attachments',
+        verbose_name='Ticket',
+        on_delete=models.CASCADE
+    )
+    file = models.FileField(
+        'File',
+        upload_to=attachment_path,
+        max_length=1000
+    )
+    filename = models.CharField('Filename', max_length=1000)
+    user = models.ForeignKey(
+        User,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='User',
+        on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField()
+    thumbnail = models.FileField('Thumbnail', max_length=1000, blank=True)
+    text = models.TextField('Text', blank=True)
+    scan_status = models.CharField('Scan status', max_length=10, choices=ScanStatus.choices,
+                                   default=ScanStatus.PENDING)
+    scan_detail = models.CharField('Scan detail', max_length=255, blank=True)
+    processed = models.DateTimeField('Processed', blank=True, null=True)
+
+    def __str__(self):
+        return self.filename
+
+
+class ProcessedMessage(models.Model):
+    """
+    An inbound e-mail that has already been turned into a ticket or followup.
+    Checked by the management command "get_email" before creating anything,
+    so restarted or overlapping runs do not create duplicates.
+    """
+    message_id = models.CharField('Message-ID', max_length=255, db_index=True)
+    # SHA-256 of the message body, for messages without (unique) Message-ID
+    body_hash = models.CharField('Body hash', max_length=64)
+    # Kept when the ticket is archived, so replies to it are still threaded
+    ticket = models.ForeignKey(
+        Ticket,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='Ticket',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+    processed = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('message_id', 'body_hash')
+
+    def __str__(self):
+        return self.message_id or self.body_hash
+
+
+class OutboundMessage(models.Model):
+    """
+    The Message-ID of a notification email about a ticket. Replies are
+    matched to their ticket through In-Reply-To and References.
+    """
+    message_id = models.CharField('Message-ID', max_length=255, unique=True)
+    # Kept when the ticket is archived, so replies to it are still threaded
+    ticket = models.ForeignKey(
+        Ticket,
+        related_name='+',
+        verbose_name='Ticket',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+    sent = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.message_id
+
+
+class NotificationPreference(models.Model):
+    """
+    How a user wants to receive ticket notifications.
+    """
+    class Delivery(models.TextChoices):
+        DIGEST = 'digest', 'Collected into one email every few minutes'
+        IMMEDIATE = 'immediate', 'One email per event'
+        NONE = 'none', 'No emails'
+
+    user = models.OneToOneField(
+        User,
+        related_name='notification_preference',
+        verbose_name='User',
+        on_delete=models.CASCADE
+    )
+    delivery = models.CharField('Notifications', max_length=10, choices=Delivery.choices, default=Delivery.DIGEST)
+
+    def __str__(self):
+        return f'{self.user}: {self.delivery}'
+
+
+class PendingNotification(models.Model):
+    """
+    A notification waiting to be sent with the next digest email to its
+    recipient, see main.notifications.send_digests.
+    """
+    recipient = models.EmailField('Recipient', db_index=True)
+    # Kept when the ticket is archived, so the notification is still sent
+    ticket = models.ForeignKey(
+        Ticket,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='Ticket',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False
+    )
+    subject = models.CharField('Subject', max_length=255)
+    body = models.TextField('Body')
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
+
+
+class RollupState(models.Model):
+    """
+    High-water mark of an incremental rollup: everything changed up to this
+    point in time has been aggregated.
+    """
+    name = models.CharField('Name', max_length=100, unique=True)
+    high_water_mark = models.DateTimeField('High-water mark', blank=True, null=True)
+
+    def __str__(self):
+        return f'{self.name}: {self.high_water_mark}'
+
+
+class DailyTicketStats(models.Model):
+    """
+    Tickets opened, closed and first responded to per day and assignee.
+    Maintained by main.reports.update_rollups.
+    """
+    day = models.DateField('Day', db_index=True)
+    assigned_to = models.ForeignKey(
+        User,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name='Assigned to',
+        on_delete=models.CASCADE
+    )
+    opened = models.PositiveIntegerField('Opened', default=0)
+    closed = models.PositiveIntegerField('Closed', default=0)
+    # Sum of (closed_date - created) of the tickets closed on this day
+    resolution_seconds = models.FloatField('Resolution time (s)', default=0)
+    # Tickets opened on this day that got a followup, and the sum of the
+    # time between creation and the first followup
+    first_responses = models.PositiveIntegerField('First responses', default=0)
+    first_response_seconds = models.FloatField('First response time (s)', default=0)
+    # Set when a ticket counted on this day was deleted
+    stale = models.BooleanField('Stale', default=False)
+
+    class Meta:
+        verbose_name = 'Daily ticket statistics'
+        verbose_name_plural = 'Daily ticket statistics'
+
+    def __str__(self):
+        return f'{self.day} {self.assigned_to}'
+
+
+class BacklogSnapshot(models.Model):
+    """
+    Number of tickets per status at the start of an hour.
+    """
+    hour = models.DateTimeField('Hour', db_index=True)
+    status = models.PositiveSmallIntegerField('Status', choices=Ticket.Status.choices)
+    count = models.PositiveIntegerField('Count', default=0)
+
+    class Meta:
+        ordering = ['hour']
+        unique_together = ('hour', 'status')
+
+    def __str__(self):
+        return f'{self.hour}: {self.status} {self.count}'
+
+
+class QueuedTask(models.Model):
+    """
+    A call of a function decorated with main.tasks.task, waiting for the
+    management command "run_workers". While a worker runs it, run_at is its
+    lease: if the worker dies, the task is due again once it expires.
+    """
+    name = models.CharField('Name', max_length=255)
+    args = models.JSONField('Arguments', default=list)
+    kwargs = models.JSONField('Keyword arguments', default=dict)
+    run_at = models.DateTimeField('Run at', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Attempts', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Max. attempts')
+    last_error = models.TextField('Last error', blank=True)
+    # Set when the last attempt failed; failed tasks are kept for inspection
+    failed = models.DateTimeField('Failed', blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The queue: tasks that have not failed, by due time
+            models.Index(fields=['run_at'], condition=models.Q(failed__isnull=True), name='queuedtask_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'Task #{self.id}: {self.name}'
@@ -0,0 +1,196 @@
+"""
+Ticket notification emails.
+
+notify() delivers a notification according to the recipient's
+NotificationPreference: sent by the task queue right after the commit, not
+at all, or - the default - queued as a PendingNotification. send_digests() then coalesces
+everything queued for a recipient within TICKET_NOTIFICATION_DIGEST_WINDOW
+seconds into one email, so the number of emails grows with the number of
+recipients rather than with the number of events.
+"""
+
+from datetime import timedelta
+from email.utils import make_msgid
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.utils import DNS_NAME
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import OutboundMessage, NotificationPreference, PendingNotification
+from .tasks import task
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def ticket_url(ticket_id):
+    return f"{settings.TICKET_BASE_URL}/ticket/{ticket_id}/"
+
+
+def notification_message(subject, body, recipients, ticket_id=None):
+    """
+    Build a notification email. An email about a single ticket gets an
+    explicit Message-ID, which deliver() records for matching replies to the
+    ticket.
+    """
+    message = EmailMessage(subject, f"Hi,\n\n{body}", settings.TICKET_EMAIL_NOTIFICATIONS_FROM, recipients)
+    message.ticket_id = ticket_id
+    if ticket_id:
+        message.extra_headers['Message-ID'] = make_msgid(domain=DNS_NAME)
+    return message
+
+
+def ticket_notification(ticket_id, subject, body, recipients):
+    """
+    Build a notification email about one ticket, tagged with "[#<id>]" in the subject.
+    """
+    return notification_message(f"[#{ticket_id}] {subject}", body, recipients, ticket_id=ticket_id)
+
+
+def deliver(messages, connection=None):
+    """
+    Record the Message-IDs of the emails about a single ticket and send the
+    emails over a single SMTP connection. The records are written first and
+    rolled back if sending fails, so no email goes out unrecorded.
+    """
+    with transaction.atomic():
+        OutboundMessage.objects.bulk_create([
+            OutboundMessage(message_id=message.extra_headers['Message-ID'], ticket_id=message.ticket_id)
+            for message in messages if message.ticket_id
+        ], ignore_conflicts=True)
+        (connection or get_connection(fail_silently=False)).send_messages(messages)
+    logger.info(f"Sent {len(messages)} notification emails: {messages[0].subject}")
+
+
+@task
+def send_notifications(notifications):
+    """
+    Send one email for each (recipient, subject, body, ticket_id)
+    notification. Runs in the task queue, which retries it if sending fails.
+    """
+    messages = []
+    for recipient, subject, body, ticket_id in notifications:
+        if ticket_id:
+            messages.append(ticket_notification(ticket_id, subject, body, [recipient]))
+        else:
+            messages.append(notification_message(subject, body, [recipient]))
+    deliver(messages)
+
+
+def delivery_preferences(recipients):
+    """
+    Return the delivery preference for each of the email addresses.
+    Addresses without a preference get the default delivery.
+    """
+    default = (NotificationPreference.Delivery.DIGEST if settings.TICKET_NOTIFICATION_DIGEST_WINDOW
+               else NotificationPreference.Delivery.IMMEDIATE)
+    preferences = dict.fromkeys(recipients, default)
+    preferences.update(NotificationPreference.objects.filter(user__email__in=recipients)
+                       .values_list('user__email', 'delivery'))
+    return preferences
+
+
+def notify(recipients, subject, body, ticket_id=None):
+    """
+    Notify each recipient about the same event, see notify_each().
+    """
+    notify_each([(recipient, subject, body, ticket_id) for recipient in recipients])
+
+
+def notify_each(notifications):
+    """
+    Deliver (recipient, subject, body, ticket_id) notifications according to
+    the recipients' delivery preferences. Must be called in the transaction
+    that made the change; immediate emails are queued as a task, which runs
+    once it commits.
+    """
+    notifications = [notification for notification in notifications if notification[0]]
+    preferences = delivery_preferences({notification[0] for notification in notifications})
+
+    immediate, pending = [], []
+    for recipient, subject, body, ticket_id in notifications:
+        delivery = preferences[recipient]
+        if delivery == NotificationPreference.Delivery.IMMEDIATE:
+            immediate.append((recipient, subject, body, ticket_id))
+        elif delivery == NotificationPreference.Delivery.DIGEST:
+            pending.append(PendingNotification(recipient=recipient, ticket_id=ticket_id, subject=subject, body=body))
+
+    PendingNotification.objects.bulk_create(pending)
+    if immediate:
+        send_notifications.enqueue(immediate)
+
+
+def notify_batched(tickets_by_recipient, subject, intro):
+    """
+    Notify every recipient once about all of its tickets.
+
+    tickets_by_recipient maps an email address to a list of (id, title) tuples.
+    """
+    notifications = []
+    for recipient, tickets in tickets_by_recipient.items():
+        lines = "\n".join(f"#{ticket_id} {title}: {ticket_url(ticket_id)}" for ticket_id, title in tickets)
+        # A reply can only be matched to a ticket if the email is about one
+        ticket_id = tickets[0][0] if len(tickets) == 1 else None
+        notifications.append((recipient, subject, f"{intro}\n\n{lines}", ticket_id))
+    notify_each(notifications)
+
+
+def digest_message(recipient, notifications):
+    """
+    Build the email for the pending notifications of one recipient.
+    """
+    if len(notifications) == 1:
+        notification = notifications[0]
+        if notification.ticket_id:
+            return ticket_notification(notification.ticket_id, notification.subject, notification.body, [recipient])
+        return notification_message(notification.subject, notification.body, [recipient])
+
+    ticket_ids = {notification.ticket_id for notification in notifications}
+    ticket_id = ticket_ids.pop() if len(ticket_ids) == 1 else None
+    sections = "\n\n".join(
+        f"--- {f'[#{n.ticket_id}] ' if n.ticket_id else ''}{n.subject} ---\n{n.body}" for n in notifications
+    )
+    subject = f"{len(notifications)} ticket notifications"
+    body = f"there were {len(notifications)} notifications for you:\n\n{sections}"
+    if ticket_id:
+        return ticket_notification(ticket_id, subject, body, [recipient])
+    return notification_message(subject, body, [recipient])
+
+
+def send_digests(window=None, now=None):
+    """
+    Send one email to every recipient whose oldest pending notification is
+    older than the digest window, and return the number of emails sent.
+    """
+    window = settings.TICKET_NOTIFICATION_DIGEST_WINDOW if window is None else window
+    now = now or timezone.now()
+    due = list(PendingNotification.objects.values('recipient').annotate(oldest=Min('created'))
+               .filter(oldest__lte=now - timedelta(seconds=window)).values_list('recipient', flat=True))
+
+    sent = 0
+    if not due:
+        return sent
+
+    with get_connection(fail_silently=False) as connection:
+        for recipient in due:
+            # The rows are deleted and the email is recorded before it is sent,
+            # in one transaction that a failed send rolls back. Only the commit
+            # follows the send, so a sent digest is not left queued to be sent
+            # again. A concurrent run skips the locked rows.
+            try:
+                with transaction.atomic():
+                    notifications = list(PendingNotification.objects.select_for_update(skip_locked=True)
+                                         .filter(recipient=recipient).order_by('created', 'id'))
+                    if not notifications:
+                        continue
+                    PendingNotification.objects.filter(id__in=[n.id for n in notifications]).delete()
+                    deliver([digest_message(recipient, notifications)], connection=connection)
+            except Exception as e:
+                logger.error(f"Failed to send digest to {recipient}: {e}")
+                continue
+            sent += 1
+    return sent
@@ -0,0 +1,144 @@
+"""
+Incremental rollups for the dashboard.
+
+update_rollups() only looks at tickets and followups changed since the last
+run (Ticket.updated / FollowUp.modified) and recomputes the days they
+affect. Deleting a ticket marks the days it was counted on as stale, so
+they are recomputed too. The dashboard then reads the small rollup tables instead of
+aggregating over the whole ticket history.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Ticket, FollowUp, ArchivedTicket, ArchivedFollowUp, RollupState, DailyTicketStats, BacklogSnapshot
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'daily_ticket_stats'
+
+# Rows changed shortly before the previous run may have been committed after
+# it; days are recomputed from scratch, so looking back a little is harmless.
+ROLLUP_OVERLAP = timedelta(minutes=5)
+
+# Archived tickets still count for the days they were opened and closed
+TICKET_SOURCES = (
+    (Ticket, FollowUp),
+    (ArchivedTicket, ArchivedFollowUp),
+)
+
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _seconds(duration):
+    return duration.total_seconds() if duration else 0
+
+
+def _duration(end, start):
+    return Sum(ExpressionWrapper(F(end) - F(start), output_field=DurationField()))
+
+
+def affected_days(since):
+    """
+    Return the days whose statistics may have changed since the given time.
+    """
+    tickets = Ticket.objects.all()
+    followups = FollowUp.objects.all()
+    if since:
+        tickets = tickets.filter(updated__gt=since)
+        followups = followups.filter(modified__gt=since)
+
+    days = set(tickets.annotate(day=TruncDate('created')).values_list('day', flat=True).distinct())
+    days |= set(tickets.filter(closed_date__isnull=False)
+                .annotate(day=TruncDate('closed_date')).values_list('day', flat=True).distinct())
+    # A new followup can be the first response of its ticket
+    days |= set(followups.annotate(day=TruncDate('ticket__created')).values_list('day', flat=True).distinct())
+    days |= set(DailyTicketStats.objects.filter(stale=True).values_list('day', flat=True).distinct())
+    return days
+
+
+def compute_day(day):
+    """
+    Aggregate the statistics of one day per assignee.
+    """
+    start, end = _day_range(day)
+    stats = defaultdict(lambda: DailyTicketStats(day=day))
+
+    for ticket_model, followup_model in TICKET_SOURCES:
+        opened = ticket_model.objects.filter(created__gte=start, created__lt=end)
+        for assigned_to, count in opened.values_list('assigned_to').annotate(count=Count('id')).order_by():
+            stats[assigned_to].opened += count
+
+        closed = ticket_model.objects.filter(closed_date__gte=start, closed_date__lt=end)
+        for assigned_to, count, resolution in closed.values_list('assigned_to').annotate(
+                count=Count('id'), resolution=_duration('closed_date', 'created')).order_by():
+            stats[assigned_to].closed += count
+            stats[assigned_to].resolution_seconds += _seconds(resolution)
+
+        first_followup = followup_model.objects.filter(ticket=OuterRef('pk')).order_by('date').values('date')[:1]
+        responded = opened.annotate(first_response=Subquery(first_followup)).filter(first_response__isnull=False)
+        for assigned_to, count, response in responded.values_list('assigned_to').annotate(
+                count=Count('id'), response=_duration('first_response', 'created')).order_by():
+            stats[assigned_to].first_responses += count
+            stats[assigned_to].first_response_seconds += _seconds(response)
+
+    for assigned_to, row in stats.items():
+        row.assigned_to_id = assigned_to
+    return list(stats.values())
+
+
+@receiver(post_delete, sender=Ticket, dispatch_uid='ticket_rollups_delete')
+def ticket_deleted(sender, instance, **kwargs):
+    # Archived tickets are still counted, recomputing their days changes nothing
+    days = {timezone.localdate(date) for date in (instance.created, instance.closed_date) if date}
+    DailyTicketStats.objects.filter(day__in=days, stale=False).update(stale=True)
+
+
+def snapshot_backlog(now):
+    """
+    Record the number of open tickets per status for the current hour.
+    """
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    counts = (Ticket.objects.exclude(status=Ticket.Status.DONE)
+              .values_list('status').annotate(count=Count('id')).order_by())
+    BacklogSnapshot.objects.filter(hour=hour).delete()
+    BacklogSnapshot.objects.bulk_create(
+        BacklogSnapshot(hour=hour, status=status, count=count) for status, count in counts
+    )
+
+
+@transaction.atomic
+def update_rollups(full=False):
+    """
+    Bring the rollup tables up to date and return the number of recomputed days.
+    """
+    now = timezone.now()
+    state, _ = RollupState.objects.select_for_update().get_or_create(name=ROLLUP_NAME)
+    since = None if full or not state.high_water_mark else state.high_water_mark - ROLLUP_OVERLAP
+
+    if full:
+        DailyTicketStats.objects.all().delete()
+
+    days = affected_days(since)
+    for day in sorted(days):
+        DailyTicketStats.objects.filter(day=day).delete()
+        DailyTicketStats.objects.bulk_create(compute_day(day))
+
+    snapshot_backlog(now)
+
+    state.high_water_mark = now
+    state.save()
+    logger.info(f"Rollups updated: {len(days)} days recomputed")
+    return len(days)
@@ -0,0 +1,91 @@
+"""
+Routing of read-only pages to the database replicas.
+
+Views decorated with @replica_reads read from one of the aliases in
+settings.DATABASE_REPLICAS; everything else, and all writes, use the
+primary ("default"). After a user changed something in a view decorated
+with @pins_primary, a cookie keeps their reads on the primary for
+DATABASE_REPLICA_STICKY_SECONDS, so they see their own change even if the
+replicas lag behind.
+"""
+
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY_COOKIE = 'use_primary_db'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db == 'default'
+
+
+def _on_replica(iterator):
+    """
+    Iterate over the content of a streaming response with reads on the replicas.
+    """
+    iterator = iter(iterator)
+    while True:
+        token = _use_replica.set(True)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _use_replica.reset(token)
+        yield item
+
+
+def replica_reads(view):
+    """
+    Let a read-only view read from the replicas, unless the user recently
+    changed something.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS or request.COOKIES.get(PRIMARY_COOKIE):
+            return view(request, *args, **kwargs)
+
+        token = _use_replica.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+        if response.streaming:
+            response.streaming_content = _on_replica(response.streaming_content)
+        return response
+    return wrapper
+
+
+def pins_primary(view):
+    """
+    Keep the reads of the user on the primary for a while after a POST to
+    the view, for read-your-writes consistency.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'POST' and settings.DATABASE_REPLICAS:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+    return wrapper
@@ -0,0 +1,46 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+# Brotli is optional: without it only the gzip variants are written.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that additionally writes precompressed
+    ".gz" (and ".br", if brotli is installed) variants of the hashed files
+    during collectstatic, so the web server never compresses on the fly.
+    """
+    compress_extensions = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.html', '.txt')
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+        if dry_run:
+            return
+
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.endswith(self.compress_extensions):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+
+        for extension, compressed in variants:
+            # Only keep the variant if it is actually smaller
+            if len(compressed) < len(content):
+                with open(path + extension, 'wb') as f:
+                    f.write(compressed)
+            elif os.path.exists(path + extension):
+                os.remove(path + extension)
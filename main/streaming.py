@@ -0,0 +1,56 @@
+"""
+Streaming render of the large list pages.
+
+render_streaming() renders the page template with a placeholder where the
+table rows go and sends everything before it (head, navbar, table header)
+right away. The rows follow, rendered chunk by chunk from an iterator over
+the queryset, and then the rest of the page. Time to first byte and memory
+use therefore do not grow with the number of rows.
+"""
+
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Number of rows fetched from the database and rendered at a time
+STREAM_CHUNK_SIZE = 500
+
+ROWS_PLACEHOLDER = '<!-- streamed rows -->'
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def render_streaming(request, template_name, context, rows, rows_template_name, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Return a StreamingHttpResponse with the page template_name, whose
+    {{ rows }} is replaced by rows_template_name rendered for every chunk of
+    rows (as "tickets"). rows should be lazy, e.g. QuerySet.iterator().
+    """
+    page = render_to_string(template_name, dict(context, rows=mark_safe(ROWS_PLACEHOLDER)), request)
+    head, tail = page.split(ROWS_PLACEHOLDER, 1)
+    rows_template = get_template(rows_template_name)
+
+    def content():
+        yield head
+        try:
+            for chunk in _chunks(rows, chunk_size):
+                yield rows_template.render({'tickets': chunk})
+        except Exception as e:
+            # The status line is already sent; end the page instead of breaking it off
+            logger.error(f"Error streaming rows of {template_name}: {e}")
+        yield tail
+
+    response = StreamingHttpResponse(content())
+    # Let nginx pass the chunks on instead of buffering the whole page
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,148 @@
+"""
+A small task queue in the database.
+
+Functions decorated with @task get an enqueue() method, which stores the
+call as a QueuedTask row. The row is written in the caller's transaction,
+so a task only runs if, and after, the change that caused it commits. The
+management command "run_workers" claims due tasks (with SELECT ... FOR
+UPDATE SKIP LOCKED where the database supports it) and runs them in a pool
+of threads or processes. A task that raises is retried with exponential
+backoff until it has failed max_attempts times; then its on_failure
+callback, if any, is called with the exception and the task's arguments.
+
+Arguments must be JSON serializable, e.g. ids instead of model instances.
+"""
+
+import signal
+from datetime import timedelta
+from functools import wraps
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import QueuedTask
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TASK_MAX_ATTEMPTS = 5
+
+# Delay before the first retry, doubled for every further attempt
+TASK_RETRY_DELAY = 30
+
+# Seconds a worker may run a task before it is considered dead and the task
+# is handed to another worker
+TASK_LEASE = 10 * 60
+
+# Seconds an idle worker waits before looking for tasks again
+POLL_INTERVAL = 1
+
+
+def task(func=None, *, max_attempts=TASK_MAX_ATTEMPTS, on_failure=None):
+    """
+    Decorator making func runnable by the workers with func.enqueue(*args, **kwargs).
+    Calling func directly still runs it right away.
+    """
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def enqueue(*args, **kwargs):
+            return QueuedTask.objects.create(name=name, args=list(args), kwargs=kwargs, max_attempts=max_attempts)
+
+        func.task_name = name
+        func.enqueue = enqueue
+        func.on_failure = on_failure
+        return func
+
+    return decorator(func) if func else decorator
+
+
+def claim():
+    """
+    Take the next due task for this worker and return it, or None if there
+    is none. The claim moves run_at to the end of the lease.
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            queued = (QueuedTask.objects.select_for_update(skip_locked=True)
+                      .filter(failed__isnull=True, run_at__lte=now).order_by('run_at', 'id').first())
+            if queued is None:
+                return None
+            # Without row locks (SQLite) another worker may have taken it meanwhile
+            claimed = QueuedTask.objects.filter(id=queued.id, run_at=queued.run_at).update(
+                run_at=now + timedelta(seconds=TASK_LEASE), attempts=queued.attempts + 1)
+        if claimed:
+            queued.attempts += 1
+            return queued
+
+
+def execute(queued):
+    """
+    Run a claimed task, then delete it or schedule its retry.
+    """
+    try:
+        func = import_string(queued.name)
+        with transaction.atomic():
+            func(*queued.args, **queued.kwargs)
+    except Exception as e:
+        logger.exception(f"Task #{queued.id} {queued.name} failed (attempt {queued.attempts})")
+        changes = {'last_error': f'{type(e).__name__}: {e}'}
+        if queued.attempts >= queued.max_attempts:
+            changes['failed'] = timezone.now()
+            _failed(queued, e)
+        else:
+            changes['run_at'] = timezone.now() + timedelta(seconds=TASK_RETRY_DELAY * 2 ** (queued.attempts - 1))
+        QueuedTask.objects.filter(id=queued.id).update(**changes)
+        return False
+
+    QueuedTask.objects.filter(id=queued.id).delete()
+    return True
+
+
+def _failed(queued, error):
+    """
+    Call the on_failure callback of a task that failed for the last time.
+    """
+    try:
+        on_failure = getattr(import_string(queued.name), 'on_failure', None)
+        if on_failure:
+            on_failure(error, *queued.args, **queued.kwargs)
+    except Exception:
+        logger.exception(f"on_failure of task #{queued.id} {queued.name} failed")
+
+
+def work(stop, burst=False):
+    """
+    Claim and run tasks until stop (a threading or multiprocessing Event) is
+    set, or, with burst, until no task is due.
+    """
+    try:
+        while not stop.is_set():
+            try:
+                queued = claim()
+            except DatabaseError as e:
+                # E.g. a lost connection, or a locked SQLite database
+                logger.error(f"Failed to claim a task: {e}")
+                connection.close()
+                stop.wait(POLL_INTERVAL)
+                continue
+            if queued is not None:
+                execute(queued)
+            elif burst:
+                break
+            else:
+                stop.wait(POLL_INTERVAL)
+    finally:
+        connection.close()
+
+
+def work_in_process(stop, burst=False):
+    """
+    Entry point of a forked worker process. The parent stops it through stop.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(stop, burst)
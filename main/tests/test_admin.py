@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from main.admin import EstimatedCountPaginator
+from main.models import Ticket, FollowUp
+
+from .utils import client_for, make_user
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def fake_connections(self, reltuples):
+        connection = mock.MagicMock(vendor='postgresql')
+        connection.cursor.return_value.__enter__.return_value.fetchone.return_value = (reltuples,)
+        return mock.patch('main.admin.connections', {'default': connection})
+
+    def test_unfiltered_postgresql_table_is_estimated(self):
+        Ticket.objects.create(title='Printer')
+        with self.fake_connections(12345.0):
+            self.assertEqual(EstimatedCountPaginator(Ticket.objects.order_by('id'), 100).count, 12345)
+
+    def test_table_without_statistics_is_counted(self):
+        Ticket.objects.create(title='Printer')
+        with self.fake_connections(-1.0):
+            self.assertEqual(EstimatedCountPaginator(Ticket.objects.order_by('id'), 100).count, 1)
+
+    def test_filtered_queryset_is_counted(self):
+        Ticket.objects.create(title='Printer')
+        Ticket.objects.create(title='Scanner', status=Ticket.CLOSED_STATUS)
+        closed = Ticket.objects.filter(status=Ticket.CLOSED_STATUS).order_by('id')
+        with self.fake_connections(12345.0):
+            self.assertEqual(EstimatedCountPaginator(closed, 100).count, 1)
+
+    def test_other_databases_are_counted(self):
+        Ticket.objects.create(title='Printer')
+        self.assertEqual(EstimatedCountPaginator(Ticket.objects.order_by('id'), 100).count, 1)
+
+
+class AdminSearchTests(TestCase):
+
+    def setUp(self):
+        self.client = client_for(make_user('admin', is_staff=True, is_superuser=True))
+        self.jane = make_user('jane')
+        self.printer = Ticket.objects.create(title='Printer', owner=self.jane)
+        self.scanner = Ticket.objects.create(title='Scanner')
+        self.followup = FollowUp.objects.create(ticket=self.scanner, title='Ordered', user=self.jane)
+
+    def search(self, model, term):
+        response = self.client.get(reverse(f'admin:main_{model}_changelist'), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list)
+
+    def test_ticket_id(self):
+        self.assertEqual(self.search('ticket', str(self.scanner.id)), [self.scanner])
+        self.assertEqual(self.search('ticket', f'#{self.printer.id}'), [self.printer])
+
+    def test_number_too_long_for_an_id(self):
+        self.assertEqual(self.search('ticket', '9' * 30), [])
+
+    def test_username_prefix(self):
+        self.assertEqual(self.search('ticket', 'ja'), [self.printer])
+        self.assertEqual(self.search('followup', 'ja'), [self.followup])
+
+    def test_followups_by_ticket_id(self):
+        self.assertEqual(self.search('followup', str(self.scanner.id)), [self.followup])
+        self.assertEqual(self.search('followup', str(self.printer.id)), [])
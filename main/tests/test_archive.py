@@ -0,0 +1,91 @@
+from datetime import timedelta
+from email.message import EmailMessage
+
+from django.core import mail
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main.archive import archive_batch
+from main.management.commands.get_email import ticket_for_reply
+from main.models import (
+    Ticket, FollowUp, Attachment, ArchivedTicket, ArchivedFollowUp, ArchivedAttachment, OutboundMessage,
+    PendingNotification,
+)
+from main.notifications import send_digests
+
+from .utils import TemporaryMediaMixin, client_for, make_user
+
+
+class ArchiveTests(TemporaryMediaMixin, TestCase):
+
+    def closed_ticket(self, title='Printer', days=400):
+        ticket = Ticket.objects.create(title=title, status=Ticket.CLOSED_STATUS)
+        Ticket.objects.filter(id=ticket.id).update(closed_date=timezone.now() - timedelta(days=days))
+        return ticket
+
+    def archive(self):
+        return archive_batch(timezone.now() - timedelta(days=365))
+
+    def test_archive_and_reply(self):
+        ticket = self.closed_ticket()
+        followup = FollowUp.objects.create(ticket=ticket, title='Fixed')
+        attachment = Attachment.objects.create(ticket=ticket, filename='a.txt', file='tickets/1/a.txt')
+        OutboundMessage.objects.create(message_id='<notification-1@example.com>', ticket=ticket)
+        open_ticket = Ticket.objects.create(title='Scanner')
+
+        self.assertEqual(self.archive(), 1)
+        self.assertEqual(list(Ticket.objects.values_list('id', flat=True)), [open_ticket.id])
+        self.assertEqual(ArchivedTicket.objects.get().id, ticket.id)
+        self.assertEqual(ArchivedFollowUp.objects.get().id, followup.id)
+        self.assertEqual(ArchivedAttachment.objects.get().id, attachment.id)
+        self.assertTrue(OutboundMessage.objects.filter(ticket_id=ticket.id).exists())
+
+        reply = EmailMessage()
+        reply['In-Reply-To'] = '<notification-1@example.com>'
+        restored = ticket_for_reply(reply, 'Re: Printer')
+
+        self.assertEqual(restored.id, ticket.id)
+        self.assertEqual(list(restored.followups.values_list('id', flat=True)), [followup.id])
+        self.assertEqual(list(restored.attachments.values_list('id', flat=True)), [attachment.id])
+        self.assertFalse(ArchivedTicket.objects.exists())
+
+    def test_reply_by_subject(self):
+        ticket = Ticket.objects.create(title='Printer')
+        self.assertEqual(ticket_for_reply(EmailMessage(), f'Re: [#{ticket.id}] Printer'), ticket)
+        self.assertIsNone(ticket_for_reply(EmailMessage(), f'Re: [#{"9" * 30}] Printer'))
+        self.assertIsNone(ticket_for_reply(EmailMessage(), 'Printer'))
+
+    def test_batch_size_and_cutoff(self):
+        old = [self.closed_ticket() for _ in range(3)]
+        recent = self.closed_ticket(days=30)
+
+        self.assertEqual(archive_batch(timezone.now() - timedelta(days=365), batch_size=2), 2)
+        self.assertEqual(self.archive(), 1)
+        self.assertEqual(self.archive(), 0)
+
+        self.assertEqual(set(ArchivedTicket.objects.values_list('id', flat=True)), {ticket.id for ticket in old})
+        self.assertEqual(list(Ticket.objects.values_list('id', flat=True)), [recent.id])
+
+    def test_pending_notifications_are_kept(self):
+        ticket = self.closed_ticket()
+        PendingNotification.objects.create(recipient='agent@example.com', ticket=ticket, subject='Ticket closed',
+                                           body='Printer')
+
+        self.archive()
+
+        self.assertEqual(PendingNotification.objects.get().ticket_id, ticket.id)
+        self.assertEqual(send_digests(window=0), 1)
+        self.assertEqual(mail.outbox[0].subject, f'[#{ticket.id}] Ticket closed')
+        self.assertTrue(OutboundMessage.objects.filter(ticket_id=ticket.id).exists())
+
+    def test_archived_ticket_detail(self):
+        ticket = self.closed_ticket()
+        FollowUp.objects.create(ticket=ticket, title='Fixed')
+        self.archive()
+
+        response = client_for(make_user('agent')).get(reverse('ticket_detail', kwargs={'pk': ticket.id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_archived'])
+        self.assertEqual(len(response.context['followups']), 1)
@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.assignment import assign_unassigned, choose_assignee, target
+from main.models import Ticket, PendingNotification
+
+from .utils import client_for, make_user
+
+RULES = [
+    {'title': '^invoice', 'group': 'Billing'},
+    {'sender': r'@bigcustomer\.com$', 'assign_to': 'vip'},
+    {'mailbox': 'hr', 'assign_to': 'hr'},
+]
+
+
+@override_settings(TICKET_AUTO_ASSIGNMENT=True, TICKET_ASSIGNMENT_GROUP='Call Center', TICKET_ASSIGNMENT_RULES=RULES,
+                   TICKET_NOTIFICATION_DIGEST_WINDOW=120)
+class AssignmentTests(TestCase):
+
+    def setUp(self):
+        # Created first, so it would win every tie if inactive users counted
+        make_user('gone', is_active=False)
+        self.first = make_user('first')
+        self.second = make_user('second')
+
+    def test_target(self):
+        self.assertEqual(target('Invoice March'), ('group', 'Billing'))
+        self.assertEqual(target('Printer', 'ceo@bigcustomer.com'), ('user', 'vip'))
+        self.assertEqual(target('Printer', mailbox={'name': 'hr'}), ('user', 'hr'))
+        self.assertEqual(target('Printer', mailbox={'name': 'it', 'group': 'IT'}), ('group', 'IT'))
+        self.assertEqual(target('Printer'), ('group', 'Call Center'))
+        with self.settings(TICKET_AUTO_ASSIGNMENT=False):
+            self.assertIsNone(target('Invoice March'))
+            self.assertEqual(target('Printer', mailbox={'name': 'it', 'group': 'IT'}), ('group', 'IT'))
+
+    def test_least_loaded_active_member(self):
+        Ticket.objects.create(title='Printer', assigned_to=self.first)
+        Ticket.objects.create(title='Closed', assigned_to=self.second, status=Ticket.CLOSED_STATUS)
+
+        self.assertEqual(choose_assignee('Printer'), self.second.id)
+        Ticket.objects.create(title='Scanner', assigned_to=self.second)
+        # Ties go to the lowest id
+        self.assertEqual(choose_assignee('Printer'), self.first.id)
+
+    def test_unknown_target(self):
+        self.assertIsNone(choose_assignee('Printer', 'ceo@bigcustomer.com'))
+        self.assertIsNone(choose_assignee('Invoice March'))
+
+    def test_sweep_balances_within_a_batch(self):
+        Ticket.objects.create(title='Printer', assigned_to=self.first)
+        for i in range(5):
+            Ticket.objects.create(title=f'Ticket {i}')
+        closed = Ticket.objects.create(title='Closed', status=Ticket.CLOSED_STATUS)
+
+        assigned, last_id = assign_unassigned(batch_size=10)
+
+        self.assertEqual(assigned, 5)
+        self.assertEqual(last_id, closed.id - 1)
+        loads = {user.username: Ticket.objects.filter(assigned_to=user).count() for user in (self.first, self.second)}
+        self.assertEqual(loads, {'first': 3, 'second': 3})
+        self.assertIsNone(Ticket.objects.get(id=closed.id).assigned_to)
+        self.assertEqual(PendingNotification.objects.count(), 2)
+        self.assertEqual(assign_unassigned(batch_size=10, after_id=last_id), (0, None))
+
+    def test_command_runs_all_batches(self):
+        for i in range(5):
+            Ticket.objects.create(title=f'Ticket {i}')
+        Ticket.objects.create(title='Invoice March')
+
+        stdout = StringIO()
+        call_command('assign_tickets', batch_size=2, stdout=stdout)
+
+        self.assertIn('Assigned 5 tickets', stdout.getvalue())
+        self.assertEqual(Ticket.objects.filter(assigned_to__isnull=True).get().title, 'Invoice March')
+
+    def test_new_ticket_on_the_web(self):
+        Ticket.objects.create(title='Printer', assigned_to=self.first)
+
+        response = client_for(self.first).post(reverse('ticket_new'), {'title': 'Scanner', 'description': ''})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Ticket.objects.get(title='Scanner').assigned_to, self.second)
+        self.assertTrue(PendingNotification.objects.filter(recipient=self.second.email).exists())
@@ -0,0 +1,124 @@
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.attachments import process_after_commit, process_attachment
+from main.models import Ticket, Attachment, QueuedTask, ScanStatus
+from main.tasks import claim, execute
+
+from .utils import TemporaryMediaMixin, client_for, make_user
+
+
+def reject_all(fp, filename):
+    return False, 'Eicar-Test-Signature'
+
+
+def scanner_timeout(fp, filename):
+    raise TimeoutError('Scanner did not answer')
+
+
+class AttachmentProcessingTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.ticket = Ticket.objects.create(title='Printer')
+
+    def attach(self, filename='notes.txt', content=b'Toner cartridge 4711'):
+        attachment = Attachment(ticket=self.ticket, filename=filename, user=self.agent)
+        attachment.file.save(filename, ContentFile(content), save=False)
+        attachment.save()
+        return attachment
+
+    def processed(self, attachment):
+        process_attachment(attachment.id)
+        return Attachment.objects.get(id=attachment.id)
+
+    def test_clean_text_file(self):
+        attachment = self.processed(self.attach())
+
+        self.assertEqual(attachment.scan_status, ScanStatus.CLEAN)
+        self.assertEqual(attachment.text, 'Toner cartridge 4711')
+        self.assertIsNotNone(attachment.processed)
+
+    def test_text_without_nul_characters(self):
+        attachment = self.processed(self.attach(content=b'a\x00b'))
+        self.assertEqual(attachment.text, 'ab')
+
+    @override_settings(TICKET_ATTACHMENT_SCANNER='main.tests.test_attachments.reject_all')
+    def test_infected_file_is_quarantined(self):
+        attachment = self.attach()
+        name = attachment.file.name
+
+        with self.assertLogs('main.attachments', 'WARNING'):
+            attachment = self.processed(attachment)
+
+        self.assertEqual(attachment.scan_status, ScanStatus.INFECTED)
+        self.assertEqual(attachment.scan_detail, 'Eicar-Test-Signature')
+        self.assertEqual(attachment.text, '')
+        self.assertFalse(default_storage.exists(name))
+        self.assertTrue(os.path.exists(os.path.join(settings.TICKET_ATTACHMENT_QUARANTINE_ROOT, name)))
+
+    @override_settings(TICKET_ATTACHMENT_SCANNER='main.tests.test_attachments.scanner_timeout')
+    def test_failing_scan_is_retried_and_marked_failed(self):
+        attachment = self.attach()
+        with self.captureOnCommitCallbacks(execute=True):
+            process_after_commit(attachment)
+        QueuedTask.objects.update(max_attempts=1)
+
+        with self.assertLogs('main', 'ERROR'):
+            self.assertFalse(execute(claim()))
+
+        attachment = Attachment.objects.get(id=attachment.id)
+        self.assertEqual(attachment.scan_status, ScanStatus.FAILED)
+        self.assertIn('Scanner did not answer', attachment.scan_detail)
+        self.assertTrue(default_storage.exists(attachment.file.name))
+
+    def test_deleted_attachment(self):
+        attachment = self.attach()
+        Attachment.objects.filter(id=attachment.id).delete()
+        process_attachment(attachment.id)
+
+    def test_links_only_for_clean_attachments(self):
+        pending = self.attach('pending.txt')
+        clean = self.processed(self.attach('clean.txt'))
+        failed = self.attach('failed.txt')
+        Attachment.objects.filter(id=failed.id).update(scan_status=ScanStatus.FAILED)
+
+        response = client_for(self.agent).get(reverse('ticket_detail', kwargs={'pk': self.ticket.id}))
+
+        self.assertContains(response, f'/media/tickets/{self.ticket.id}/{clean.filename}"')
+        for attachment in (pending, failed):
+            self.assertContains(response, attachment.filename)
+            self.assertNotContains(response, f'/media/tickets/{self.ticket.id}/{attachment.filename}"')
+        self.assertContains(response, 'Waiting for the virus scan')
+        self.assertContains(response, 'Virus scan failed')
+
+
+class AttachmentTextSearchTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        self.client = client_for(make_user('admin', is_staff=True, is_superuser=True))
+        self.printer = Ticket.objects.create(title='Printer')
+        self.scanner = Ticket.objects.create(title='Scanner')
+        for text in ('Invoice 4711 for toner', 'Second invoice 4711'):
+            Attachment.objects.create(ticket=self.printer, filename='invoice.pdf', text=text)
+        Attachment.objects.create(ticket=self.scanner, filename='manual.pdf', text='Paper jam')
+
+    def search(self, model, term):
+        response = self.client.get(reverse(f'admin:main_{model}_changelist'), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list)
+
+    def test_tickets_by_attachment_text(self):
+        self.assertEqual(self.search('ticket', 'text: invoice 4711'), [self.printer])
+        self.assertEqual(self.search('ticket', 'text:paper'), [self.scanner])
+
+    def test_attachments_by_text(self):
+        self.assertEqual(len(self.search('attachment', 'text:4711')), 2)
+
+    def test_other_terms_do_not_read_the_text(self):
+        self.assertEqual(self.search('ticket', 'invoice'), [])
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from main.forms import TicketBulkActionForm, TicketEditForm
+from main.models import Ticket
+
+from .utils import client_for, make_user
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.admin = make_user('admin', group='Admin')
+        self.customer = make_user('alice', group='Users')
+        self.former = make_user('agnes', is_active=False)
+        self.client = client_for(self.agent)
+
+    def results(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return [result['text'] for result in response.json()['results']]
+
+    def test_users(self):
+        self.assertEqual(self.results('autocomplete_users', q='a'), ['admin', 'agent', 'alice'])
+        self.assertEqual(self.results('autocomplete_users', q='ag'), ['agent'])
+
+    def test_agents(self):
+        self.assertEqual(self.results('autocomplete_users', q='a', role='agents'), ['admin', 'agent'])
+
+    @mock.patch('main.views.AUTOCOMPLETE_RESULTS', 2)
+    def test_limit(self):
+        self.assertEqual(len(self.results('autocomplete_users')), 2)
+
+    def test_tickets(self):
+        printer = Ticket.objects.create(title='Printer')
+        Ticket.objects.create(title='Printer on floor 2', status=Ticket.CLOSED_STATUS)
+        scanner = Ticket.objects.create(title='Scanner')
+
+        self.assertEqual(self.results('autocomplete_tickets', q='Print'), [str(printer)])
+        self.assertEqual(self.results('autocomplete_tickets', q=str(scanner.id)), [str(scanner)])
+        self.assertEqual(self.results('autocomplete_tickets', q=f'#{printer.id}'), [str(printer)])
+        self.assertEqual(self.results('autocomplete_tickets', q='9' * 30), [])
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('autocomplete_users')).status_code, 302)
+
+
+class AssigneeFormTests(TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.customer = make_user('alice', group='Users')
+        self.ticket = Ticket.objects.create(title='Printer')
+
+    def edit_form(self, assigned_to):
+        return TicketEditForm({'title': 'Printer', 'description': '', 'status': Ticket.Status.TODO,
+                               'assigned_to': assigned_to.id}, instance=self.ticket)
+
+    def test_edit_form_accepts_agents_only(self):
+        self.assertTrue(self.edit_form(self.agent).is_valid())
+        self.assertIn('assigned_to', self.edit_form(self.customer).errors)
+
+    def test_edit_form_keeps_the_current_assignee(self):
+        former = make_user('agnes', is_active=False)
+        Ticket.objects.filter(id=self.ticket.id).update(assigned_to=former)
+        self.ticket.refresh_from_db()
+
+        self.assertTrue(self.edit_form(former).is_valid())
+
+    def test_bulk_form_accepts_agents_only(self):
+        data = {'tickets': [self.ticket.id], 'action': 'assign'}
+
+        self.assertTrue(TicketBulkActionForm(dict(data, assigned_to=self.agent.id)).is_valid())
+        self.assertIn('assigned_to', TicketBulkActionForm(dict(data, assigned_to=self.customer.id)).errors)
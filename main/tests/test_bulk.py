@@ -0,0 +1,65 @@
+from django.contrib.messages import get_messages
+from django.test import TestCase
+from django.urls import reverse
+
+from main.models import Ticket, PendingNotification
+
+from .utils import client_for, make_user
+
+
+class TicketBulkViewTests(TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.colleague = make_user('colleague')
+        self.client = client_for(self.agent)
+
+    def post(self, tickets, **data):
+        data = {'tickets': [ticket.id for ticket in tickets], 'next': reverse('all-tickets'), **data}
+        response = self.client.post(reverse('ticket_bulk'), data)
+        self.assertRedirects(response, reverse('all-tickets'), fetch_redirect_response=False)
+        return [(message.level_tag, str(message)) for message in get_messages(response.wsgi_request)]
+
+    def test_assign(self):
+        tickets = [Ticket.objects.create(title=f'Ticket {i}') for i in range(3)]
+
+        messages = self.post(tickets[:2], action='assign', assigned_to=self.colleague.id)
+
+        self.assertEqual(messages, [('success', '2 tickets updated.')])
+        self.assertEqual([ticket.assigned_to_id for ticket in Ticket.objects.order_by('id')],
+                         [self.colleague.id, self.colleague.id, None])
+        # One notification for both tickets
+        self.assertEqual(PendingNotification.objects.get().recipient, 'colleague@example.com')
+
+    def test_close(self):
+        tickets = [Ticket.objects.create(title='Open', status=status)
+                   for status in (Ticket.Status.TODO, Ticket.Status.WAITING)]
+
+        messages = self.post(tickets, action='close')
+
+        self.assertEqual(messages, [('success', '2 tickets updated.')])
+        for ticket in Ticket.objects.all():
+            self.assertEqual(ticket.status, Ticket.CLOSED_STATUS)
+            self.assertIsNotNone(ticket.closed_date)
+
+    def test_status_change_skips_forbidden_transitions(self):
+        in_progress = Ticket.objects.create(title='In progress', status=Ticket.Status.IN_PROGRESS)
+        todo = Ticket.objects.create(title='Todo', status=Ticket.Status.TODO)
+
+        messages = self.post([in_progress, todo], action='status', status=Ticket.Status.WAITING)
+
+        self.assertEqual(messages, [
+            ('success', '1 tickets updated.'),
+            ('warning', '1 tickets were skipped because their status cannot change to WAITING.'),
+        ])
+        self.assertEqual(Ticket.objects.get(id=in_progress.id).status, Ticket.Status.WAITING)
+        self.assertEqual(Ticket.objects.get(id=todo.id).status, Ticket.Status.TODO)
+
+    def test_invalid_action(self):
+        ticket = Ticket.objects.create(title='Ticket')
+
+        messages = self.post([], action='assign')
+
+        self.assertEqual(messages, [('error', 'The bulk action was not applied: '
+                                              'Please select at least one ticket. Please select a user.')])
+        self.assertIsNone(Ticket.objects.get(id=ticket.id).assigned_to)
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from main import counters
+from main.models import Ticket
+
+from .utils import make_user
+
+
+@mock.patch('main.counters.cache_is_shared', return_value=True)
+@override_settings(DEBUG=False)
+class CounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.agent = make_user('agent')
+        self.other = make_user('other')
+
+    def counters(self, user=None):
+        return counters.get_counters(user or self.agent)
+
+    def change(self, ticket, **changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.get(id=ticket.id)
+            for name, value in changes.items():
+                setattr(ticket, name, value)
+            ticket.save()
+        return ticket
+
+    def create(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Ticket.objects.create(title='Printer', **kwargs)
+
+    def test_counted_once_then_cached(self, shared):
+        Ticket.objects.create(title='Printer', assigned_to=self.agent)
+        Ticket.objects.create(title='Scanner')
+
+        self.assertEqual(self.counters(), {'open': 1, 'waiting': 0, 'unassigned': 1})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counters(), {'open': 1, 'waiting': 0, 'unassigned': 1})
+
+    def test_deltas(self, shared):
+        self.counters(), self.counters(self.other)
+        ticket = self.create()
+        self.assertEqual(self.counters()['unassigned'], 1)
+
+        ticket = self.change(ticket, assigned_to=self.agent, status=Ticket.Status.IN_PROGRESS)
+        self.assertEqual(self.counters(), {'open': 1, 'waiting': 0, 'unassigned': 0})
+
+        ticket = self.change(ticket, status=Ticket.Status.WAITING, waiting_for=self.other)
+        self.assertEqual(self.counters(self.other)['waiting'], 1)
+
+        ticket = self.change(ticket, assigned_to=self.other, status=Ticket.CLOSED_STATUS)
+        self.assertEqual(self.counters(), {'open': 0, 'waiting': 0, 'unassigned': 0})
+        self.assertEqual(self.counters(self.other), {'open': 0, 'waiting': 0, 'unassigned': 0})
+
+        ticket = self.create(assigned_to=self.agent)
+        self.assertEqual(self.counters()['open'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.delete()
+        self.assertEqual(self.counters()['open'], 0)
+
+        with self.assertNumQueries(0):
+            self.counters()
+
+    def test_rolled_back_change_keeps_the_counters(self, shared):
+        ticket = Ticket.objects.create(title='Printer')
+        self.counters()
+
+        with self.captureOnCommitCallbacks(execute=False):
+            ticket.assigned_to = self.agent
+            ticket.save()
+        # The transaction did not commit, so the callbacks never ran
+        self.assertEqual(self.counters(), {'open': 0, 'waiting': 0, 'unassigned': 1})
+
+    def test_invalidate_after_update(self, shared):
+        ticket = Ticket.objects.create(title='Printer')
+        self.counters()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ticket.objects.filter(id=ticket.id).update(assigned_to=self.agent)
+            counters.invalidate([self.agent.id])
+
+        self.assertEqual(self.counters(), {'open': 1, 'waiting': 0, 'unassigned': 0})
+
+    def test_open_counts(self, shared):
+        Ticket.objects.create(title='Printer', assigned_to=self.agent)
+        Ticket.objects.create(title='Scanner', assigned_to=self.agent, status=Ticket.CLOSED_STATUS)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.open_counts([self.agent.id, self.other.id]), {self.agent.id: 1, self.other.id: 0})
+        with self.assertNumQueries(0):
+            counters.open_counts([self.agent.id, self.other.id])
+
+    def test_reconcile_repairs_drift(self, shared):
+        Ticket.objects.create(title='Printer', assigned_to=self.agent)
+        self.counters()
+        cache.set(counters.open_key(self.agent.id), 5)
+        cache.set(counters.UNASSIGNED_KEY, -1)
+
+        self.assertEqual(counters.reconcile(), 5)
+
+        self.assertEqual(self.counters(), {'open': 1, 'waiting': 0, 'unassigned': 0})
+
+    def test_local_cache_is_not_used(self, shared):
+        shared.return_value = False
+        Ticket.objects.create(title='Printer', assigned_to=self.agent)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(self.counters(), {'open': 1, 'waiting': 0, 'unassigned': 0})
+        with self.assertNumQueries(3):
+            self.counters()
+        self.assertIsNone(cache.get(counters.open_key(self.agent.id)))
+        with self.assertLogs('main.counters', 'WARNING'):
+            self.assertEqual(counters.reconcile(), 0)
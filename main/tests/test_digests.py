@@ -0,0 +1,77 @@
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from main.models import Ticket, NotificationPreference, OutboundMessage, PendingNotification, QueuedTask
+from main.notifications import notify, send_digests
+
+from .utils import make_user
+
+SEND_MESSAGES = 'django.core.mail.backends.locmem.EmailBackend.send_messages'
+
+
+@override_settings(TICKET_NOTIFICATION_DIGEST_WINDOW=120)
+class DigestTests(TestCase):
+
+    def setUp(self):
+        self.ticket = Ticket.objects.create(title='Printer')
+        self.later = timezone.now() + timedelta(minutes=5)
+
+    def test_notifications_are_coalesced(self):
+        notify(['jane@example.com', 'joe@example.com'], 'Ticket changed', 'Printer', ticket_id=self.ticket.id)
+        notify(['jane@example.com'], 'Ticket closed', 'Scanner')
+
+        self.assertEqual(send_digests(now=timezone.now()), 0)
+        self.assertEqual(send_digests(now=self.later), 2)
+
+        jane, = [message for message in mail.outbox if message.to == ['jane@example.com']]
+        self.assertEqual(jane.subject, '2 ticket notifications')
+        self.assertIn(f'[#{self.ticket.id}] Ticket changed', jane.body)
+        joe, = [message for message in mail.outbox if message.to == ['joe@example.com']]
+        self.assertEqual(joe.subject, f'[#{self.ticket.id}] Ticket changed')
+        self.assertFalse(PendingNotification.objects.exists())
+        self.assertEqual(list(OutboundMessage.objects.values_list('message_id', flat=True)),
+                         [joe.extra_headers['Message-ID']])
+
+    def test_failed_send_keeps_the_notifications(self):
+        notify(['jane@example.com'], 'Ticket changed', 'Printer', ticket_id=self.ticket.id)
+
+        with mock.patch(SEND_MESSAGES, side_effect=SMTPException('Service unavailable')), \
+                self.assertLogs('main.notifications', 'ERROR'):
+            self.assertEqual(send_digests(now=self.later), 0)
+
+        self.assertEqual(PendingNotification.objects.count(), 1)
+        self.assertFalse(OutboundMessage.objects.exists())
+        self.assertEqual(send_digests(now=self.later), 1)
+
+    def test_failed_record_sends_nothing(self):
+        notify(['jane@example.com'], 'Ticket changed', 'Printer', ticket_id=self.ticket.id)
+
+        with mock.patch.object(OutboundMessage.objects, 'bulk_create', side_effect=RuntimeError('Disk full')), \
+                self.assertLogs('main.notifications', 'ERROR'):
+            self.assertEqual(send_digests(now=self.later), 0)
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(PendingNotification.objects.count(), 1)
+
+    def test_delivery_preferences(self):
+        NotificationPreference.objects.create(user=make_user('jane'), delivery=NotificationPreference.Delivery.IMMEDIATE)
+        NotificationPreference.objects.create(user=make_user('joe'), delivery=NotificationPreference.Delivery.NONE)
+
+        with self.captureOnCommitCallbacks():
+            notify(['jane@example.com', 'joe@example.com', 'ann@example.com'], 'Ticket changed', 'Printer')
+
+        self.assertEqual(list(PendingNotification.objects.values_list('recipient', flat=True)), ['ann@example.com'])
+        self.assertEqual(QueuedTask.objects.get().args, [[['jane@example.com', 'Ticket changed', 'Printer', None]]])
+
+    @override_settings(TICKET_NOTIFICATION_DIGEST_WINDOW=0)
+    def test_no_digest_window(self):
+        with self.captureOnCommitCallbacks():
+            notify(['jane@example.com'], 'Ticket changed', 'Printer')
+
+        self.assertFalse(PendingNotification.objects.exists())
+        self.assertTrue(QueuedTask.objects.exists())
@@ -0,0 +1,75 @@
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main.export import export_tickets
+from main.models import Ticket, FollowUp, Attachment
+
+from .utils import client_for, make_user
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.ticket = Ticket.objects.create(title='Printer', description='Out of toner', owner=self.agent,
+                                            assigned_to=self.agent)
+        FollowUp.objects.create(ticket=self.ticket, title='Ordered', text='Toner ordered', user=self.agent)
+        Attachment.objects.create(ticket=self.ticket, filename='invoice.pdf', file='tickets/1/invoice.pdf')
+        self.closed = Ticket.objects.create(title='Scanner', status=Ticket.CLOSED_STATUS)
+
+    def jsonl(self, **filters):
+        content = b''.join(export_tickets('jsonl', **filters))
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_csv(self):
+        content = b''.join(export_tickets('csv')).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+
+        self.assertEqual(rows[0][:3], ['record', 'ticket_id', 'id'])
+        self.assertEqual([(row[0], row[1], row[3]) for row in rows[1:]], [
+            ('ticket', str(self.ticket.id), 'Printer'),
+            ('followup', str(self.ticket.id), 'Ordered'),
+            ('attachment', str(self.ticket.id), 'invoice.pdf'),
+            ('ticket', str(self.closed.id), 'Scanner'),
+        ])
+
+    def test_jsonl(self):
+        records = self.jsonl()
+
+        self.assertEqual([record['id'] for record in records], [self.ticket.id, self.closed.id])
+        self.assertEqual(records[0]['assigned_to'], 'agent')
+        self.assertEqual([followup['text'] for followup in records[0]['followups']], ['Toner ordered'])
+        self.assertEqual([attachment['file'] for attachment in records[0]['attachments']],
+                         ['tickets/1/invoice.pdf'])
+        self.assertEqual(records[1]['status'], 'DONE')
+
+    def test_filters(self):
+        self.assertEqual([record['id'] for record in self.jsonl(status=Ticket.CLOSED_STATUS)], [self.closed.id])
+        self.assertEqual([record['id'] for record in self.jsonl(assigned_to=self.agent)], [self.ticket.id])
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.assertEqual(self.jsonl(created_from=tomorrow), [])
+        self.assertEqual(len(self.jsonl(created_to=timezone.localdate())), 2)
+
+    def test_gzip(self):
+        compressed = b''.join(export_tickets('jsonl', compress=True))
+        self.assertEqual(gzip.decompress(compressed), b''.join(export_tickets('jsonl')))
+
+    def test_view(self):
+        response = client_for(self.agent).get(reverse('export'), {'format': 'jsonl', 'status': 'DONE', 'gzip': '1'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tickets.jsonl.gz"')
+        records = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(record)['id'] for record in records], [self.closed.id])
+
+    def test_view_rejects_invalid_filters(self):
+        response = client_for(self.agent).get(reverse('export'), {'status': 'BROKEN'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,137 @@
+import io
+import json
+import mailbox
+import os
+import shutil
+import tempfile
+from email.message import EmailMessage
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from main.importer import InvalidRecord, TicketImporter, read_csv, read_jsonl, read_mbox
+from main.models import Ticket, FollowUp, Attachment
+
+from .utils import TemporaryMediaMixin, make_user
+
+
+class ImportTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.agent = make_user('agent')
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_tickets', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv(self):
+        path = self.write('tickets.csv', 'title,status,assigned_to_email,created,closed_date\n'
+                                         'Printer,done,agent@example.com,2024-01-02T10:00:00,\n'
+                                         'Scanner,,,,\n')
+
+        self.run_import(path)
+
+        printer = Ticket.objects.get(title='Printer')
+        self.assertEqual(printer.status, Ticket.CLOSED_STATUS)
+        self.assertEqual(printer.assigned_to, self.agent)
+        self.assertEqual(printer.created.year, 2024)
+        self.assertEqual(printer.closed_date, printer.created)
+        self.assertEqual(Ticket.objects.get(title='Scanner').status, Ticket.Status.TODO)
+
+    def test_csv_missing_column(self):
+        path = self.write('tickets.csv', 'subject,status\nPrinter,TODO\n')
+
+        with self.assertRaisesMessage(CommandError, 'Missing columns: title'):
+            self.run_import(path)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_invalid_rows_are_skipped(self):
+        path = self.write('tickets.csv', 'title,status,created\n'
+                                         'Printer,TODO,\n'
+                                         'Scanner,LOST,\n'
+                                         'Monitor,TODO,yesterday\n'
+                                         ',TODO,\n'
+                                         'Keyboard,IN PROGRESS,\n')
+
+        stdout, stderr = self.run_import(path)
+
+        self.assertEqual(sorted(Ticket.objects.values_list('title', flat=True)), ['Keyboard', 'Printer'])
+        self.assertIn('Skipped 3 invalid records', stdout)
+        self.assertIn('Line 3: Unknown status: LOST', stderr)
+        self.assertIn('Line 4: Invalid date: yesterday', stderr)
+        self.assertIn('Line 5: Missing title', stderr)
+
+    def test_jsonl_with_followups(self):
+        path = self.write('tickets.jsonl', '\n'.join([
+            json.dumps({'title': 'Printer', 'followups': [
+                {'title': 'Ordered', 'text': 'Toner ordered', 'user_email': 'AGENT@example.com',
+                 'date': '2024-01-03T09:00:00+00:00'},
+            ]}),
+            '{not json',
+            json.dumps(['Scanner']),
+        ]))
+
+        stdout, stderr = self.run_import(path)
+
+        followup = FollowUp.objects.get(ticket=Ticket.objects.get())
+        self.assertEqual(followup.user, self.agent)
+        self.assertEqual(followup.date.year, 2024)
+        self.assertIn('Skipped 2 invalid records', stdout)
+        self.assertIn('Line 2:', stderr)
+        self.assertIn('Line 3: Not an object', stderr)
+
+    def test_checkpoint_counts_skipped_records(self):
+        path = self.write('tickets.jsonl', '\n'.join(json.dumps({'title': title, 'status': status})
+                                                     for title, status in [('A', 'TODO'), ('B', 'LOST'),
+                                                                           ('C', 'TODO')]))
+        checkpoint = os.path.join(self.directory, 'import.checkpoint')
+
+        self.run_import(path, batch_size=2, checkpoint=checkpoint)
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f)['records'], 3)
+
+        stdout, _ = self.run_import(path, checkpoint=checkpoint)
+        self.assertIn('Resuming after 3 records', stdout)
+        self.assertEqual(Ticket.objects.count(), 2)
+
+    def test_readers_skip(self):
+        csv_path = self.write('tickets.csv', 'title\nA\nB\nC\n')
+        jsonl_path = self.write('tickets.jsonl', '{"title": "A"}\n\n{"title": "B"}\n{"title": "C"}\n')
+
+        self.assertEqual([record['title'] for record in read_csv(csv_path, skip=2)], ['C'])
+        self.assertEqual([record['title'] for record in read_jsonl(jsonl_path, skip=1)], ['B', 'C'])
+
+    def test_mbox(self):
+        path = os.path.join(self.directory, 'tickets.mbox')
+        archive = mailbox.mbox(path)
+        message = EmailMessage()
+        message['From'] = 'Agent <agent@example.com>'
+        message['Subject'] = 'Printer'
+        # -0000 means an unknown time zone and parses to a naive datetime
+        message['Date'] = 'Tue, 02 Jan 2024 10:00:00 -0000'
+        message.set_content('Out of toner')
+        message.add_attachment(b'%PDF', maintype='application', subtype='pdf', filename='invoice.pdf')
+        archive.add(message)
+        archive.close()
+
+        record, = read_mbox(path)
+        self.assertTrue(timezone.is_aware(record['created']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TicketImporter().import_batch([record, InvalidRecord('Line 1: Missing title')])
+
+        ticket = Ticket.objects.get()
+        self.assertEqual((ticket.title, ticket.owner), ('Printer', self.agent))
+        self.assertEqual(ticket.description.strip(), 'Out of toner')
+        attachment = Attachment.objects.get(ticket=ticket)
+        self.assertEqual(attachment.file.read(), b'%PDF')
@@ -0,0 +1,93 @@
+from email.message import EmailMessage
+from io import BytesIO
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from main.management.commands.get_email import process_message
+from main.models import Ticket, Attachment, FollowUp, PendingNotification, ProcessedMessage
+
+from .utils import TemporaryMediaMixin
+
+
+def raw_message(message_id='<1@example.com>', subject='Printer', body='Out of toner', attachment=None):
+    message = EmailMessage()
+    message['From'] = 'customer@example.com'
+    message['Subject'] = subject
+    if message_id:
+        message['Message-ID'] = message_id
+    message.set_content(body)
+    if attachment:
+        message.add_attachment(attachment, maintype='application', subtype='octet-stream', filename='log.txt')
+    return message.as_bytes()
+
+
+@override_settings(TICKET_NOTIFICATION_DIGEST_WINDOW=120, TICKET_EMAIL_NOTIFICATIONS_TO='helpdesk@example.com')
+class LedgerTests(TemporaryMediaMixin, TestCase):
+
+    def test_same_message_twice(self):
+        raw = raw_message(attachment=b'error 42')
+
+        self.assertTrue(process_message(BytesIO(raw), quiet=True))
+        self.assertTrue(process_message(BytesIO(raw), quiet=True))
+
+        ticket = Ticket.objects.get()
+        self.assertEqual(Attachment.objects.filter(ticket=ticket).count(), 1)
+        entry = ProcessedMessage.objects.get()
+        self.assertEqual((entry.message_id, entry.ticket_id), ('<1@example.com>', ticket.id))
+
+    def test_same_message_id_with_another_body(self):
+        process_message(BytesIO(raw_message()), quiet=True)
+        process_message(BytesIO(raw_message(body='Still out of toner')), quiet=True)
+
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(ProcessedMessage.objects.count(), 2)
+
+    def test_message_without_message_id(self):
+        raw = raw_message(message_id=None)
+
+        process_message(BytesIO(raw), quiet=True)
+        process_message(BytesIO(raw), quiet=True)
+
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(ProcessedMessage.objects.get().message_id, '')
+
+    def test_reply_by_message_id(self):
+        process_message(BytesIO(raw_message()), quiet=True)
+        reply = EmailMessage()
+        reply['Subject'] = 'Re: Printer'
+        reply['Message-ID'] = '<2@example.com>'
+        reply['In-Reply-To'] = '<1@example.com>'
+        reply.set_content('Toner arrived')
+
+        process_message(BytesIO(reply.as_bytes()), quiet=True)
+
+        ticket = Ticket.objects.get()
+        self.assertEqual(FollowUp.objects.get().ticket, ticket)
+        self.assertEqual(ProcessedMessage.objects.get(message_id='<2@example.com>').ticket, ticket)
+
+    def test_failed_message_is_not_recorded(self):
+        raw = raw_message()
+        with mock.patch('main.management.commands.get_email.notify', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            process_message(BytesIO(raw), quiet=True)
+
+        self.assertFalse(ProcessedMessage.objects.exists())
+        self.assertFalse(Ticket.objects.exists())
+
+        # Retried by the next run
+        self.assertTrue(process_message(BytesIO(raw), quiet=True))
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_new_ticket_notification(self):
+        process_message(BytesIO(raw_message()), quiet=True)
+
+        notification = PendingNotification.objects.get(recipient='helpdesk@example.com')
+        self.assertEqual(notification.ticket_id, Ticket.objects.get().id)
+
+    @override_settings(TICKET_EMAIL_NOTIFICATIONS_TO='')
+    def test_no_notification_address(self):
+        self.assertTrue(process_message(BytesIO(raw_message()), quiet=True))
+
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertFalse(PendingNotification.objects.filter(recipient='').exists())
@@ -0,0 +1,97 @@
+import email
+import hashlib
+from email import policy
+from email.message import EmailMessage
+from io import BytesIO
+
+from django.test import SimpleTestCase
+
+from main.mail import CHUNK_SIZE, iter_parts, message_key
+
+
+def stdlib_parts(raw):
+    """
+    The non-multipart parts of a message as parsed by the email package.
+    """
+    message = email.message_from_bytes(raw, policy=policy.compat32)
+    return [(part.get_content_type(), part.get_filename(), part.get_payload(decode=True))
+            for part in message.walk() if not part.is_multipart()]
+
+
+def walker_parts(raw):
+    parts = []
+    for headers, body in iter_parts(BytesIO(raw)):
+        with body:
+            parts.append((headers.get_content_type(), headers.get_filename(), body.read()))
+    return parts
+
+
+class MailTests(SimpleTestCase):
+
+    def message(self):
+        message = EmailMessage()
+        message['From'] = 'Jane <jane@example.com>'
+        message['Subject'] = 'Printer'
+        message['Message-ID'] = '<printer-1@example.com>'
+        message.set_content('Text with a long line ' + 'x' * 200 + '\nand umlauts: äöü\n', cte='quoted-printable')
+        message.add_alternative('<p>Text</p>', subtype='html')
+        message.add_attachment(bytes(range(256)) * 1000, maintype='application', subtype='octet-stream',
+                               filename='data.bin')
+        message.add_attachment('plain\n' * 10, filename='notes.txt')
+        return message
+
+    def test_parts_match_stdlib(self):
+        raw = self.message().as_bytes()
+        self.assertGreater(len(raw), 2 * CHUNK_SIZE)
+        parts = walker_parts(raw)
+
+        self.assertEqual([content_type for content_type, _, _ in parts],
+                         ['text/plain', 'text/html', 'application/octet-stream', 'text/plain'])
+        self.assertEqual(parts, stdlib_parts(raw))
+
+    def test_crlf_line_endings(self):
+        raw = self.message().as_bytes(policy=policy.SMTP)
+        self.assertIn(b'\r\n', raw)
+        self.assertEqual(walker_parts(raw), stdlib_parts(raw))
+
+    def test_preamble_and_epilogue_are_skipped(self):
+        raw = (b'Content-Type: multipart/mixed; boundary="outer"\n\n'
+               b'This is a preamble.\n'
+               b'--outer\n'
+               b'Content-Type: text/plain\n\n'
+               b'Body\n'
+               b'--outer--\n'
+               b'This is an epilogue.\n')
+        self.assertEqual(walker_parts(raw), [('text/plain', None, b'Body')])
+        self.assertEqual(walker_parts(raw), stdlib_parts(raw))
+
+    def test_single_part_message(self):
+        raw = b'Subject: Hi\nContent-Transfer-Encoding: base64\n\nSGVsbG8gV29y\nbGQ=\n'
+        self.assertEqual(walker_parts(raw), [('text/plain', None, b'Hello World')])
+        self.assertEqual(walker_parts(raw), stdlib_parts(raw))
+
+    def test_attached_message_is_one_part(self):
+        # Unlike Message.walk(), the walker does not descend into attached messages
+        inner = self.message()
+        outer = EmailMessage()
+        outer.set_content('See the attached message.')
+        outer.add_attachment(inner)
+
+        parts = walker_parts(outer.as_bytes())
+        self.assertEqual([content_type for content_type, _, _ in parts], ['text/plain', 'message/rfc822'])
+        self.assertIn(b'<printer-1@example.com>', parts[1][2])
+
+    def test_message_key(self):
+        raw = self.message().as_bytes()
+        message_id, body_hash = message_key(BytesIO(raw))
+
+        self.assertEqual(message_id, email.message_from_bytes(raw)['Message-ID'])
+        self.assertEqual(body_hash, hashlib.sha256(raw.split(b'\n\n', 1)[1]).hexdigest())
+
+    def test_message_key_ignores_headers(self):
+        message = self.message()
+        del message['Message-ID']
+        raw = message.as_bytes()
+        relayed = b'Received: from relay.example.com\n' + raw
+
+        self.assertEqual(message_key(BytesIO(raw)), ('', message_key(BytesIO(relayed))[1]))
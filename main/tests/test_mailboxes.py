@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+from unittest import mock
+
+from django.core.management import call_command, CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from main.management.commands.get_email import process_mailboxes, process_message
+from main.models import Ticket
+
+from .test_ledger import raw_message
+from .utils import TemporaryMediaMixin, make_user
+
+MAILBOXES = [
+    {'name': 'it', 'server': 'imap.example.com', 'user': 'it', 'password': 'secret'},
+    {'name': 'billing', 'server': 'imap.example.com', 'user': 'billing', 'password': 'secret', 'group': 'Billing'},
+]
+
+
+@override_settings(TICKET_AUTO_ASSIGNMENT=True, TICKET_ASSIGNMENT_GROUP='Call Center', TICKET_ASSIGNMENT_RULES=[])
+class MailboxRoutingTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.accountant = make_user('accountant', group='Billing')
+        self.busy_accountant = make_user('busy', group='Billing')
+        Ticket.objects.create(title='Invoice', assigned_to=self.busy_accountant)
+
+    def receive(self, mailbox, message_id='<1@example.com>'):
+        process_message(BytesIO(raw_message(message_id=message_id)), quiet=True, mailbox=mailbox)
+        return Ticket.objects.latest('id')
+
+    def test_group_of_the_mailbox(self):
+        self.assertEqual(self.receive(MAILBOXES[1]).assigned_to, self.accountant)
+        # The next ticket goes to the member with fewer open tickets
+        Ticket.objects.create(title='Invoice', assigned_to=self.accountant)
+        Ticket.objects.create(title='Invoice', assigned_to=self.accountant)
+        self.assertEqual(self.receive(MAILBOXES[1], '<2@example.com>').assigned_to, self.busy_accountant)
+
+    def test_user_of_the_mailbox(self):
+        mailbox = dict(MAILBOXES[0], assign_to='accountant')
+        self.assertEqual(self.receive(mailbox).assigned_to, self.accountant)
+
+    def test_mailbox_without_routing(self):
+        self.assertEqual(self.receive(MAILBOXES[0]).assigned_to, self.agent)
+
+    def test_rules_before_the_mailbox(self):
+        rules = [{'mailbox': 'billing', 'title': '^printer', 'assign_to': 'agent'}]
+        with self.settings(TICKET_ASSIGNMENT_RULES=rules):
+            self.assertEqual(self.receive(MAILBOXES[1]).assigned_to, self.agent)
+
+
+class ProcessMailboxesTests(SimpleTestCase):
+
+    def test_concurrency_and_failures(self):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def process_inbox(mailbox, quiet):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            if mailbox['name'] == 'broken':
+                raise OSError('Connection refused')
+            return len(mailbox['name'])
+
+        mailboxes = [{'name': name} for name in ('it', 'billing', 'broken', 'hr')]
+        with mock.patch('main.management.commands.get_email.process_inbox', process_inbox), \
+                self.assertLogs('main.management.commands.get_email', 'ERROR'):
+            results = asyncio.run(process_mailboxes(mailboxes, concurrency=2))
+
+        self.assertEqual(results, [('it', 2), ('billing', 7), ('broken', None), ('hr', 2)])
+        self.assertEqual(peak[0], 2)
+
+    @override_settings(TICKET_MAILBOXES=MAILBOXES)
+    def test_command_selects_mailboxes(self):
+        with mock.patch('main.management.commands.get_email.process_inbox', return_value=3) as process_inbox:
+            call_command('get_email', mailbox=['billing'], quiet=True)
+
+        self.assertEqual([call.args[0]['name'] for call in process_inbox.call_args_list], ['billing'])
+
+        with self.assertRaisesMessage(CommandError, 'Unknown mailbox: sales'):
+            call_command('get_email', mailbox=['sales'])
+
+    @override_settings(TICKET_MAILBOXES=[])
+    def test_command_without_mailboxes(self):
+        with self.assertRaisesMessage(CommandError, 'No mailboxes configured'):
+            call_command('get_email')
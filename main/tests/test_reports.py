@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main.archive import archive_batch
+from main.models import Ticket, FollowUp, DailyTicketStats, BacklogSnapshot
+from main.reports import update_rollups
+
+from .utils import client_for, make_user
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.now = timezone.now()
+        self.days_ago = lambda days: self.now - timedelta(days=days)
+
+    def ticket(self, created, closed=None, **kwargs):
+        ticket = Ticket.objects.create(title='Ticket', assigned_to=self.agent, **kwargs)
+        Ticket.objects.filter(id=ticket.id).update(
+            created=created, updated=closed or created, closed_date=closed,
+            status=Ticket.CLOSED_STATUS if closed else Ticket.Status.TODO,
+        )
+        return Ticket.objects.get(id=ticket.id)
+
+    def stats(self, day):
+        return DailyTicketStats.objects.filter(day=timezone.localdate(day)).aggregate(
+            opened=Sum('opened'), closed=Sum('closed'), first_responses=Sum('first_responses'),
+            resolution_seconds=Sum('resolution_seconds'),
+        )
+
+    def test_opened_closed_and_first_response(self):
+        ticket = self.ticket(self.days_ago(3), closed=self.days_ago(1))
+        FollowUp.objects.create(ticket=ticket, title='Reply', user=self.agent, date=self.days_ago(3) + timedelta(hours=2))
+        self.ticket(self.days_ago(3))
+
+        update_rollups()
+
+        self.assertEqual(self.stats(self.days_ago(3))['opened'], 2)
+        self.assertEqual(self.stats(self.days_ago(3))['first_responses'], 1)
+        self.assertEqual(self.stats(self.days_ago(1))['closed'], 1)
+        self.assertEqual(self.stats(self.days_ago(1))['resolution_seconds'], timedelta(days=2).total_seconds())
+        self.assertEqual(BacklogSnapshot.objects.get().count, 1)
+
+    def test_incremental_run_only_recomputes_changed_days(self):
+        self.ticket(self.days_ago(5))
+        self.assertEqual(update_rollups(), 1)
+        self.assertEqual(update_rollups(), 0)
+
+        self.ticket(self.now)
+        self.assertEqual(update_rollups(), 1)
+        self.assertEqual(self.stats(self.days_ago(5))['opened'], 1)
+        self.assertEqual(self.stats(self.now)['opened'], 1)
+
+    def test_deleted_ticket_leaves_the_rollups(self):
+        kept = self.ticket(self.days_ago(4))
+        deleted = self.ticket(self.days_ago(4), closed=self.days_ago(2))
+        update_rollups()
+
+        deleted.delete()
+        self.assertTrue(DailyTicketStats.objects.filter(stale=True).exists())
+        update_rollups()
+
+        self.assertEqual(self.stats(self.days_ago(4))['opened'], 1)
+        self.assertIsNone(self.stats(self.days_ago(2))['closed'])
+        self.assertFalse(DailyTicketStats.objects.filter(stale=True).exists())
+        self.assertTrue(Ticket.objects.filter(id=kept.id).exists())
+
+    def test_archived_tickets_stay_counted(self):
+        self.ticket(self.days_ago(40), closed=self.days_ago(35))
+        update_rollups()
+
+        self.assertEqual(archive_batch(self.days_ago(30)), 1)
+        update_rollups()
+
+        self.assertEqual(self.stats(self.days_ago(40))['opened'], 1)
+        self.assertEqual(self.stats(self.days_ago(35))['closed'], 1)
+
+    def test_full_rebuild(self):
+        self.ticket(self.days_ago(2))
+        update_rollups()
+        DailyTicketStats.objects.update(opened=10)
+
+        update_rollups(full=True)
+
+        self.assertEqual(self.stats(self.days_ago(2))['opened'], 1)
+
+    def test_dashboard(self):
+        self.ticket(self.days_ago(1), closed=self.now)
+        update_rollups()
+
+        response = client_for(self.agent).get(reverse('dashboard'))
+
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,71 @@
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from main.models import Ticket
+from main.routers import PRIMARY_COOKIE, ReplicaRouter, pins_primary, replica_reads
+
+router = ReplicaRouter()
+
+
+def read_database():
+    return router.db_for_read(Ticket)
+
+
+@replica_reads
+def read_view(request):
+    return HttpResponse(read_database())
+
+
+@replica_reads
+def streaming_view(request):
+    return StreamingHttpResponse(read_database() for _ in range(2))
+
+
+@pins_primary
+def write_view(request):
+    return HttpResponse(read_database())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], DATABASE_REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_reads_outside_replica_views_use_the_primary(self):
+        self.assertEqual(read_database(), 'default')
+        self.assertEqual(router.db_for_write(Ticket), 'default')
+
+    def test_replica_view(self):
+        self.assertEqual(read_view(self.factory.get('/')).content, b'replica1')
+        # The context is reset after the view
+        self.assertEqual(read_database(), 'default')
+
+    def test_streaming_content_reads_from_the_replica(self):
+        response = streaming_view(self.factory.get('/'))
+        self.assertEqual(b''.join(response.streaming_content), b'replica1replica1')
+        self.assertEqual(read_database(), 'default')
+
+    def test_post_pins_the_user_to_the_primary(self):
+        response = write_view(self.factory.post('/'))
+
+        self.assertEqual(response.content, b'default')
+        cookie = response.cookies[PRIMARY_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertTrue(cookie['httponly'])
+
+        request = self.factory.get('/')
+        request.COOKIES[PRIMARY_COOKIE] = cookie.value
+        self.assertEqual(read_view(request).content, b'default')
+
+    def test_get_does_not_pin(self):
+        self.assertNotIn(PRIMARY_COOKIE, write_view(self.factory.get('/')).cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertEqual(read_view(self.factory.get('/')).content, b'default')
+        self.assertNotIn(PRIMARY_COOKIE, write_view(self.factory.post('/')).cookies)
+
+    def test_migrations_only_on_the_primary(self):
+        self.assertTrue(router.allow_migrate('default', 'main'))
+        self.assertFalse(router.allow_migrate('replica1', 'main'))
@@ -0,0 +1,48 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+
+class ReapSessionsTests(TestCase):
+
+    def reap(self, **options):
+        stdout = StringIO()
+        call_command('reap_sessions', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def create_sessions(self, count, expire_date):
+        start = Session.objects.count()
+        Session.objects.bulk_create(Session(session_key=f'session-{start + i}', session_data='',
+                                            expire_date=expire_date) for i in range(count))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_expired_sessions_are_deleted_in_batches(self):
+        now = timezone.now()
+        self.create_sessions(5, now - timedelta(days=1))
+        self.create_sessions(2, now + timedelta(days=1))
+
+        # Three batches of a SELECT and a DELETE, and the SELECT finding none left
+        with self.assertNumQueries(2 * 3 + 1):
+            output = self.reap(batch_size=2)
+
+        self.assertIn('Deleted 5 expired sessions', output)
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertFalse(Session.objects.filter(expire_date__lt=now).exists())
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_nothing_expired(self):
+        self.create_sessions(1, timezone.now() + timedelta(days=1))
+
+        self.assertIn('Deleted 0 expired sessions', self.reap())
+        self.assertEqual(Session.objects.count(), 1)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_engine_without_database(self):
+        self.create_sessions(1, timezone.now() - timedelta(days=1))
+
+        self.assertIn('nothing to do', self.reap())
+        self.assertEqual(Session.objects.count(), 1)
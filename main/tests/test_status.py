@@ -0,0 +1,67 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from main.models import Ticket
+
+
+class TicketStatusTests(TestCase):
+
+    def change(self, ticket, status, **kwargs):
+        ticket = Ticket.objects.get(id=ticket.id)
+        ticket.status = status
+        ticket.save(**kwargs)
+        return Ticket.objects.get(id=ticket.id)
+
+    def test_allowed_transitions(self):
+        ticket = Ticket.objects.create(title='Printer')
+        for status in (Ticket.Status.IN_PROGRESS, Ticket.Status.WAITING, Ticket.Status.IN_PROGRESS,
+                       Ticket.Status.DONE, Ticket.Status.TODO):
+            ticket = self.change(ticket, status)
+            self.assertEqual(ticket.status, status)
+
+    def test_forbidden_transitions(self):
+        for source, target in ((Ticket.Status.TODO, Ticket.Status.WAITING),
+                               (Ticket.Status.IN_PROGRESS, Ticket.Status.TODO),
+                               (Ticket.Status.DONE, Ticket.Status.IN_PROGRESS),
+                               (Ticket.Status.DONE, Ticket.Status.WAITING)):
+            with self.subTest(source=source, target=target):
+                ticket = Ticket.objects.create(title='Printer', status=source)
+                with self.assertRaises(ValidationError):
+                    self.change(ticket, target)
+                self.assertEqual(Ticket.objects.get(id=ticket.id).status, source)
+
+    def test_any_open_ticket_can_be_closed(self):
+        for status in (Ticket.Status.TODO, Ticket.Status.IN_PROGRESS, Ticket.Status.WAITING):
+            ticket = Ticket.objects.create(title='Printer', status=status)
+            self.assertEqual(self.change(ticket, Ticket.CLOSED_STATUS).status, Ticket.CLOSED_STATUS)
+
+    def test_new_tickets_take_any_status(self):
+        ticket = Ticket.objects.create(title='Imported', status=Ticket.Status.WAITING)
+        self.assertEqual(ticket.status, Ticket.Status.WAITING)
+
+    def test_closed_date(self):
+        ticket = Ticket.objects.create(title='Printer')
+        self.assertIsNone(ticket.closed_date)
+
+        ticket = self.change(ticket, Ticket.CLOSED_STATUS)
+        closed_date = ticket.closed_date
+        self.assertIsNotNone(closed_date)
+
+        ticket.title = 'Printer on floor 2'
+        ticket.save()
+        self.assertEqual(Ticket.objects.get(id=ticket.id).closed_date, closed_date)
+
+        ticket = self.change(ticket, Ticket.REOPENED_STATUS)
+        self.assertIsNone(ticket.closed_date)
+
+    def test_closed_date_with_update_fields(self):
+        ticket = Ticket.objects.create(title='Printer')
+        ticket = self.change(ticket, Ticket.CLOSED_STATUS, update_fields=['status'])
+        self.assertIsNotNone(ticket.closed_date)
+        ticket = self.change(ticket, Ticket.REOPENED_STATUS, update_fields=['status'])
+        self.assertIsNone(ticket.closed_date)
+
+    def test_statuses_allowing(self):
+        self.assertEqual(set(Ticket.statuses_allowing(Ticket.CLOSED_STATUS)), set(Ticket.Status))
+        self.assertEqual(set(Ticket.statuses_allowing(Ticket.Status.WAITING)),
+                         {Ticket.Status.IN_PROGRESS, Ticket.Status.WAITING})
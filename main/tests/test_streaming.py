@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from main.archive import archive_batch
+from main.models import Ticket
+from main.streaming import render_streaming
+
+from .utils import client_for, make_user
+
+
+class StreamingTests(TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.client = client_for(self.agent)
+
+    def stream(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        return b''.join(response.streaming_content).decode()
+
+    def test_all_tickets(self):
+        Ticket.objects.create(title='Printer')
+        Ticket.objects.create(title='Scanner', status=Ticket.CLOSED_STATUS)
+
+        content = self.stream(reverse('all-tickets'))
+
+        self.assertIn('Printer', content)
+        self.assertNotIn('Scanner', content)
+        self.assertTrue(content.rstrip().endswith('</html>'))
+
+    def test_archive_includes_archived_tickets(self):
+        printer = Ticket.objects.create(title='Printer', status=Ticket.CLOSED_STATUS)
+        Ticket.objects.filter(id=printer.id).update(closed_date=timezone.now() - timedelta(days=400))
+        Ticket.objects.create(title='Scanner', status=Ticket.CLOSED_STATUS)
+        Ticket.objects.create(title='Monitor')
+        self.assertEqual(archive_batch(timezone.now() - timedelta(days=365)), 1)
+
+        content = self.stream(reverse('archive'))
+
+        self.assertIn('Printer', content)
+        self.assertIn('Scanner', content)
+        self.assertNotIn('Monitor', content)
+
+    def render(self, rows, chunk_size=2):
+        request = RequestFactory().get('/')
+        request.user = self.agent
+        response = render_streaming(request, 'main/archive.html', {}, rows, 'main/includes/archive_rows.html',
+                                    chunk_size=chunk_size)
+        return list(response.streaming_content)
+
+    def test_rows_are_rendered_in_chunks(self):
+        for title in 'ABCDE':
+            Ticket.objects.create(title=f'Ticket {title}', status=Ticket.CLOSED_STATUS)
+
+        parts = self.render(Ticket.objects.order_by('id').iterator())
+
+        # Head, three chunks of rows and the tail
+        self.assertEqual(len(parts), 5)
+        self.assertIn(b'<table', parts[0])
+        self.assertEqual([part.count(b'<tr>') for part in parts[1:4]], [2, 2, 1])
+        self.assertIn(b'</html>', parts[-1])
+
+    def test_error_while_streaming_ends_the_page(self):
+        def rows():
+            yield Ticket.objects.create(title='Printer', status=Ticket.CLOSED_STATUS)
+            raise RuntimeError('Connection lost')
+
+        with self.assertLogs('main.streaming', 'ERROR'):
+            parts = self.render(rows(), chunk_size=1)
+
+        self.assertIn(b'Printer', parts[1])
+        self.assertIn(b'</html>', parts[-1])
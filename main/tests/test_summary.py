@@ -0,0 +1,67 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main.importer import TicketImporter
+from main.models import SUMMARY_LENGTH, Ticket, summarize
+
+from .utils import client_for, make_user
+
+
+class SummaryTests(TestCase):
+
+    def test_summarize(self):
+        self.assertEqual(summarize('  Printer\n\n out of\ttoner '), 'Printer out of toner')
+        self.assertEqual(summarize(None), '')
+
+        summary = summarize('word ' * 100)
+        self.assertEqual(len(summary), SUMMARY_LENGTH)
+        self.assertTrue(summary.endswith('…'))
+        self.assertEqual(len(summarize('x' * 10000)), SUMMARY_LENGTH)
+
+    def test_save_keeps_the_summary_up_to_date(self):
+        ticket = Ticket.objects.create(title='Printer', description='Out of toner')
+        self.assertEqual(Ticket.objects.get(id=ticket.id).summary, 'Out of toner')
+
+        ticket.description = 'Out of paper'
+        ticket.save(update_fields=['description'])
+        self.assertEqual(Ticket.objects.get(id=ticket.id).summary, 'Out of paper')
+
+        ticket.title = 'Printer on floor 2'
+        ticket.save(update_fields=['title'])
+        self.assertEqual(Ticket.objects.get(id=ticket.id).summary, 'Out of paper')
+
+    def test_imported_tickets_get_a_summary(self):
+        TicketImporter().import_batch([{
+            'title': 'Printer', 'description': 'Out\nof toner', 'status': None, 'owner': None,
+            'assigned_to': None, 'created': None, 'closed_date': None, 'followups': [], 'attachments': [],
+        }])
+        self.assertEqual(Ticket.objects.get().summary, 'Out of toner')
+
+    def test_migration_fills_existing_tickets(self):
+        ticket = Ticket.objects.create(title='Printer', description='Out of toner')
+        Ticket.objects.filter(id=ticket.id).update(summary='')
+
+        migration = import_module('main.migrations.0010_ticket_summary')
+        migration.fill_summaries(apps, None)
+
+        self.assertEqual(Ticket.objects.get(id=ticket.id).summary, 'Out of toner')
+
+    def test_lists_do_not_load_the_description(self):
+        agent = make_user('agent')
+        Ticket.objects.create(title='Printer', description='Out of toner', assigned_to=agent)
+        Ticket.objects.create(title='Scanner', description='Paper jam')
+        client = client_for(agent)
+
+        for name, summary in (('inbox', b'Paper jam'), ('my-tickets', b'Out of toner'), ('all-tickets', b'Paper jam')):
+            with self.subTest(page=name), CaptureQueriesContext(connection) as queries:
+                response = client.get(reverse(name))
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+            self.assertIn(summary, content)
+            ticket_queries = [query['sql'] for query in queries if 'FROM "main_ticket"' in query['sql']]
+            self.assertTrue(ticket_queries)
+            self.assertFalse([sql for sql in ticket_queries if '"main_ticket"."description"' in sql])
@@ -0,0 +1,135 @@
+import threading
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from main.models import QueuedTask
+from main.tasks import TASK_LEASE, TASK_RETRY_DELAY, claim, execute, task
+
+# Calls of the test tasks below, as (task, args)
+CALLS = []
+
+
+def record_failure(error, value):
+    CALLS.append(('on_failure', (str(error), value)))
+
+
+@task
+def noop_task(value):
+    CALLS.append(('noop_task', (value,)))
+
+
+@task(max_attempts=3, on_failure=record_failure)
+def failing_task(value):
+    CALLS.append(('failing_task', (value,)))
+    raise RuntimeError(f'failed with {value}')
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+
+    def make_due(self, queued):
+        QueuedTask.objects.filter(id=queued.id).update(run_at=timezone.now() - timedelta(seconds=1))
+
+    def assertRunsIn(self, queued, seconds):
+        queued.refresh_from_db()
+        self.assertAlmostEqual((queued.run_at - timezone.now()).total_seconds(), seconds, delta=5)
+
+    def test_enqueue_and_execute(self):
+        queued = noop_task.enqueue(1)
+        self.assertEqual(queued.name, 'main.tests.test_tasks.noop_task')
+
+        claimed = claim()
+        self.assertEqual(claimed.id, queued.id)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertTrue(execute(claimed))
+        self.assertEqual(CALLS, [('noop_task', (1,))])
+        self.assertFalse(QueuedTask.objects.exists())
+
+    def test_claim_takes_due_tasks_in_order(self):
+        later = noop_task.enqueue(1)
+        QueuedTask.objects.filter(id=later.id).update(run_at=timezone.now() + timedelta(hours=1))
+        first = noop_task.enqueue(2)
+        second = noop_task.enqueue(3)
+
+        self.assertEqual(claim().id, first.id)
+        self.assertEqual(claim().id, second.id)
+        self.assertIsNone(claim())
+
+    def test_claim_leases_the_task(self):
+        queued = noop_task.enqueue(1)
+        claim()
+
+        self.assertRunsIn(queued, TASK_LEASE)
+        self.assertIsNone(claim())
+
+    def test_expired_lease_is_claimed_again(self):
+        queued = noop_task.enqueue(1)
+        claim()
+        # The worker died without finishing the task
+        self.make_due(queued)
+
+        claimed = claim()
+        self.assertEqual(claimed.id, queued.id)
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_failed_attempts_back_off_exponentially(self):
+        queued = failing_task.enqueue(7)
+
+        self.assertFalse(execute(claim()))
+        self.assertRunsIn(queued, TASK_RETRY_DELAY)
+        self.assertEqual(queued.last_error, 'RuntimeError: failed with 7')
+        self.assertIsNone(queued.failed)
+        self.assertIsNone(claim())
+
+        self.make_due(queued)
+        self.assertFalse(execute(claim()))
+        self.assertRunsIn(queued, 2 * TASK_RETRY_DELAY)
+        self.assertEqual(queued.attempts, 2)
+        self.assertNotIn('on_failure', [name for name, _ in CALLS])
+
+    def test_last_failed_attempt_is_terminal(self):
+        queued = failing_task.enqueue(7)
+        for _ in range(3):
+            self.make_due(queued)
+            self.assertFalse(execute(claim()))
+
+        queued.refresh_from_db()
+        self.assertIsNotNone(queued.failed)
+        self.assertEqual(queued.attempts, 3)
+        self.assertEqual(CALLS[-1], ('on_failure', ('failed with 7', 7)))
+        # Failed tasks are kept, but never claimed again
+        self.make_due(queued)
+        self.assertIsNone(claim())
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ClaimSkipLockedTests(TransactionTestCase):
+
+    def test_locked_task_is_skipped(self):
+        first = noop_task.enqueue(1)
+        second = noop_task.enqueue(2)
+        locked, release = threading.Event(), threading.Event()
+
+        def hold_lock():
+            # Another worker holds the row lock of the first task
+            try:
+                with transaction.atomic():
+                    QueuedTask.objects.select_for_update().get(id=first.id)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            self.assertEqual(claim().id, second.id)
+        finally:
+            release.set()
+            thread.join()
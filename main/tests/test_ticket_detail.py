@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main.models import Ticket, FollowUp
+from main.views import _followup_cursor, _parse_followup_cursor
+
+from .utils import client_for, make_user
+
+
+@mock.patch('main.views.FOLLOWUPS_PAGE_SIZE', 5)
+class TicketDetailTests(TestCase):
+
+    def setUp(self):
+        self.agent = make_user('agent')
+        self.client = client_for(self.agent)
+        self.ticket = Ticket.objects.create(title='Printer', owner=self.agent, assigned_to=self.agent)
+        # Created in one go, so most followups share their modified timestamp
+        self.followups = [FollowUp.objects.create(ticket=self.ticket, title=f'Followup {i}', user=self.agent)
+                          for i in range(12)]
+
+    def page(self, before=None):
+        url = reverse('ticket_detail', kwargs={'pk': self.ticket.id})
+        response = self.client.get(url, {'before': before} if before else {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_pages_cover_every_followup_once(self):
+        seen = []
+        response = self.page()
+        self.assertTrue(response.context['is_first_page'])
+        while True:
+            seen.extend(followup.id for followup in response.context['followups'])
+            if not response.context['older_cursor']:
+                break
+            response = self.page(response.context['older_cursor'])
+            self.assertFalse(response.context['is_first_page'])
+
+        self.assertEqual(seen, [followup.id for followup in reversed(self.followups)])
+
+    def test_last_page_has_no_cursor(self):
+        response = self.page(_followup_cursor(self.followups[5]))
+
+        self.assertEqual([followup.id for followup in response.context['followups']],
+                         [followup.id for followup in reversed(self.followups[:5])])
+        self.assertIsNone(response.context['older_cursor'])
+        self.assertNotContains(response, 'Load older followups')
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.page('not-a-cursor')
+
+        self.assertTrue(response.context['is_first_page'])
+        self.assertEqual(response.context['followups'][0].id, self.followups[-1].id)
+
+    def test_cursor_roundtrip(self):
+        followup = self.followups[3]
+        self.assertEqual(_parse_followup_cursor(_followup_cursor(followup)), (followup.modified, followup.id))
+        self.assertIsNone(_parse_followup_cursor('12-34-56'))
+        self.assertIsNone(_parse_followup_cursor(None))
+
+    def test_query_count_does_not_grow_with_followups(self):
+        with CaptureQueriesContext(connection) as few:
+            self.page(_followup_cursor(self.followups[3]))
+        with CaptureQueriesContext(connection) as many:
+            self.page()
+
+        self.assertEqual(len(many), len(few))
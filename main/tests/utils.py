@@ -0,0 +1,41 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.test import Client, override_settings
+
+
+class TemporaryMediaMixin:
+    """
+    Store the files written by the tests of a TestCase in a temporary
+    MEDIA_ROOT and quarantine directory, removed afterwards.
+    """
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, directory, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=f'{directory}/media',
+                                           TICKET_ATTACHMENT_QUARANTINE_ROOT=f'{directory}/quarantine')
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        super().setUpClass()
+
+
+def make_user(username, group='Call Center', **kwargs):
+    """
+    Create a user with the e-mail <username>@example.com in the given group.
+    """
+    user = User.objects.create_user(username, f'{username}@example.com', 'password', **kwargs)
+    if group:
+        user.groups.add(Group.objects.get_or_create(name=group)[0])
+    return user
+
+
+def client_for(user):
+    """
+    Return a test client logged in as user.
+    """
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    client.force_login(user)
+    return client
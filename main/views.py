@@ -1,22 +1,50 @@
+from collections import defaultdict
+from itertools import chain
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.core.mail import send_mail
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.urls import reverse
 from django.conf import settings
 from django.db import transaction
+from django.db.models import Case, F, Prefetch, Q, Sum, Value, When
+from django.views.decorators.http import require_POST
 
 from django.contrib.auth import get_user_model  # Preferred method for custom User models
-
-from .models import Ticket, Attachment, FollowUp
+from django.contrib import messages
+
+from .models import (
+    ID_MAX_DIGITS,
+    Ticket,
+    Attachment,
+    FollowUp,
+    ArchivedTicket,
+    ArchivedFollowUp,
+    ArchivedAttachment,
+    NotificationPreference,
+    DailyTicketStats,
+    BacklogSnapshot,
+    assignable_users,
+)
 from .forms import (
     UserSettingsForm,
+    NotificationPreferenceForm,
     TicketCreateForm,
     TicketEditForm,
     FollowupForm,
-    AttachmentForm
+    AttachmentForm,
+    TicketBulkActionForm,
+    TicketExportForm
 )
+from . import assignment, counters
+from .attachments import process_after_commit
+from .export import CONTENT_TYPES, export_tickets
+from .notifications import notify, notify_batched, ticket_url
+from .routers import pins_primary, replica_reads
+from .streaming import STREAM_CHUNK_SIZE, render_streaming
 
 import logging
 
@@ -25,6 +53,18 @@ logger = logging.getLogger(__name__)
 # Get the User model
 User = get_user_model()
 
+# Number of followups shown per page on the ticket detail page
+FOLLOWUPS_PAGE_SIZE = 50
+
+# Period shown on the dashboard
+DASHBOARD_DAYS = 30
+BACKLOG_HOURS = 48
+
+# Maximum number of suggestions returned by the autocomplete endpoints
+AUTOCOMPLETE_RESULTS = 20
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
 
 def is_admin_or_call_center(user):
     return user.groups.filter(name__in=["Admin", "Call Center"]).exists()
@@ -41,8 +81,9 @@ def inbox_view(request):
     """
     try:
         # Optimize by querying tickets directly without fetching all users
-        tickets_unassigned = Ticket.objects.exclude(assigned_to__isnull=False)
-        tickets_assigned = Ticket.objects.filter(assigned_to__isnull=False)
+        # Lists show the summary; the description is only read on the detail page
+        tickets_unassigned = Ticket.objects.exclude(assigned_to__isnull=False).defer('description')
+        tickets_assigned = Ticket.objects.filter(assigned_to__isnull=False).defer('description')
     except Exception as e:
         logger.error(f"Error fetching tickets in inbox_view: {e}")
         tickets_unassigned = []
@@ -51,6 +92,7 @@ def inbox_view(request):
     context = {
         "tickets_assigned": tickets_assigned,
         "tickets_unassigned": tickets_unassigned,
+        "bulk_form": TicketBulkActionForm(),
     }
     return render(request, 'main/inbox.html', context)
 
@@ -63,12 +105,12 @@ def my_tickets_view(request):
     try:
         tickets = Ticket.objects.filter(
             assigned_to=request.user
-        ).exclude(status__exact="DONE")
+        ).exclude(status=Ticket.Status.DONE).defer('description')
 
         tickets_waiting = Ticket.objects.filter(
             waiting_for=request.user,
-            status__exact="WAITING"
-        )
+            status=Ticket.Status.WAITING
+        ).defer('description')
     except Exception as e:
         logger.error(f"Error fetching tickets in my_tickets_view: {e}")
         tickets = []
@@ -83,37 +125,114 @@ def my_tickets_view(request):
 
 @login_required
 @user_passes_test(is_admin_or_call_center, login_url="forbidden", redirect_field_name=None)
+@replica_reads
 def all_tickets_view(request):
     """
-    Display all open tickets excluding those with status "DONE".
+    Display all open tickets excluding those with status "DONE". The rows
+    are streamed, see main/streaming.py.
     """
     try:
-        tickets_open = Ticket.objects.exclude(status__exact="DONE")
+        tickets_open = (Ticket.objects.exclude(status=Ticket.Status.DONE).select_related('owner', 'assigned_to')
+                        .defer('description').iterator(chunk_size=STREAM_CHUNK_SIZE))
     except Exception as e:
         logger.error(f"Error fetching tickets in all_tickets_view: {e}")
         tickets_open = []
 
     context = {
-        "tickets": tickets_open,
+        "bulk_form": TicketBulkActionForm(),
     }
-    return render(request, 'main/all-tickets.html', context)
+    return render_streaming(request, 'main/all-tickets.html', context, tickets_open,
+                            'main/includes/all_tickets_rows.html')
 
 
 @login_required
+@replica_reads
 def archive_view(request):
     """
-    Display all closed tickets with status "DONE".
+    Display all closed tickets with status "DONE", followed by the tickets
+    already moved to the archive tables. The rows are streamed.
     """
     try:
-        tickets_closed = Ticket.objects.filter(status__exact="DONE")
+        tickets_closed = chain(
+            Ticket.objects.filter(status=Ticket.Status.DONE).select_related('owner', 'assigned_to')
+            .defer('description').iterator(chunk_size=STREAM_CHUNK_SIZE),
+            ArchivedTicket.objects.select_related('owner', 'assigned_to').order_by('-closed_date')
+            .defer('description').iterator(chunk_size=STREAM_CHUNK_SIZE),
+        )
     except Exception as e:
         logger.error(f"Error fetching tickets in archive_view: {e}")
         tickets_closed = []
 
+    return render_streaming(request, 'main/archive.html', {}, tickets_closed, 'main/includes/archive_rows.html')
+
+
+@login_required
+@user_passes_test(is_admin_or_call_center, login_url="forbidden", redirect_field_name=None)
+@replica_reads
+def ticket_export_view(request):
+    """
+    Stream tickets with their followups and attachments as CSV or JSON Lines.
+    """
+    form = TicketExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+
+    options = form.cleaned_data
+    export_format = options['format']
+    filename = f"tickets.{export_format}"
+    content = export_tickets(
+        export_format,
+        compress=options['gzip'],
+        status=options['status'],
+        created_from=options['created_from'],
+        created_to=options['created_to'],
+        assigned_to=options['assigned_to'],
+    )
+
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[export_format])
+    if options['gzip']:
+        filename += '.gz'
+        response['Content-Type'] = 'application/gzip'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin_or_call_center, login_url="forbidden", redirect_field_name=None)
+@replica_reads
+def dashboard_view(request):
+    """
+    SLA and throughput figures, read from the rollup tables maintained by
+    the management command "update_rollups".
+    """
+    stats = DailyTicketStats.objects.filter(day__gt=timezone.localdate() - timedelta(days=DASHBOARD_DAYS))
+
+    per_day = stats.values('day').annotate(opened=Sum('opened'), closed=Sum('closed')).order_by('-day')
+
+    per_assignee = []
+    for row in stats.values('assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name').annotate(
+            opened=Sum('opened'), closed=Sum('closed'), resolution_seconds=Sum('resolution_seconds'),
+            first_responses=Sum('first_responses'), first_response_seconds=Sum('first_response_seconds'),
+    ).order_by('assigned_to__username'):
+        row['hours_to_close'] = row['resolution_seconds'] / row['closed'] / 3600 if row['closed'] else None
+        row['hours_to_first_response'] = (row['first_response_seconds'] / row['first_responses'] / 3600
+                                          if row['first_responses'] else None)
+        per_assignee.append(row)
+
+    backlog = defaultdict(dict)
+    for snapshot in BacklogSnapshot.objects.filter(hour__gte=timezone.now() - timedelta(hours=BACKLOG_HOURS)):
+        backlog[snapshot.hour][snapshot.status] = snapshot.count
+    statuses = [status for status in Ticket.Status if status != Ticket.Status.DONE]
+
     context = {
-        "tickets": tickets_closed,
+        'days': DASHBOARD_DAYS,
+        'per_day': per_day,
+        'per_assignee': per_assignee,
+        'statuses': statuses,
+        'backlog': [(hour, [counts.get(status, 0) for status in statuses])
+                    for hour, counts in sorted(backlog.items(), reverse=True)],
     }
-    return render(request, 'main/archive.html', context)
+    return render(request, 'main/dashboard.html', context)
 
 
 @login_required
@@ -122,25 +241,31 @@ def usersettings_update_view(request):
     Update user settings.
     """
     user = request.user
+    preference = NotificationPreference.objects.filter(user=user).first() or NotificationPreference(user=user)
 
     if request.method == 'POST':
         form_user = UserSettingsForm(request.POST, instance=user)
+        form_notifications = NotificationPreferenceForm(request.POST, instance=preference)
 
-        if form_user.is_valid():
+        if form_user.is_valid() and form_notifications.is_valid():
             form_user.save()
+            form_notifications.save()
             next_url = request.GET.get('next', reverse('inbox'))
             return HttpResponseRedirect(next_url)
     else:
         form_user = UserSettingsForm(instance=user)
+        form_notifications = NotificationPreferenceForm(instance=preference)
 
     context = {
         'form_user': form_user,
+        'form_notifications': form_notifications,
     }
     return render(request, 'main/settings.html', context)
 
 
 @login_required
 @user_passes_test(is_admin_or_call_center, login_url="forbidden", redirect_field_name=None)
+@pins_primary
 @transaction.atomic
 def ticket_create_view(request):
     """
@@ -151,8 +276,11 @@ def ticket_create_view(request):
         if form.is_valid():
             ticket = form.save(commit=False)
             ticket.owner = request.user
-            ticket.status = "TODO"
+            ticket.status = Ticket.Status.TODO
+            ticket.assigned_to_id = assignment.choose_assignee(ticket.title, request.user.email)
             ticket.save()
+            if ticket.assigned_to_id:
+                assignment.notify_assignees([ticket])
             return redirect('inbox')
     else:
         form = TicketCreateForm()
@@ -165,6 +293,7 @@ def ticket_create_view(request):
 
 @login_required
 @user_passes_test(is_admin_or_call_center, login_url="forbidden", redirect_field_name=None)
+@pins_primary
 @transaction.atomic
 def ticket_edit_view(request, pk):
     """
@@ -175,10 +304,7 @@ def ticket_edit_view(request, pk):
     if request.method == 'POST':
         form = TicketEditForm(request.POST, instance=ticket)
         if form.is_valid():
-            updated_ticket = form.save(commit=False)
-            if updated_ticket.status == "DONE" and ticket.status != "DONE":
-                updated_ticket.closed_date = timezone.now()
-            updated_ticket.save()
+            form.save()
             return redirect('inbox')
     else:
         form = TicketEditForm(instance=ticket)
@@ -189,24 +315,143 @@ def ticket_edit_view(request, pk):
     return render(request, 'main/ticket_edit.html', context)
 
 
+@login_required
+@user_passes_test(is_admin_or_call_center, login_url="forbidden", redirect_field_name=None)
+@pins_primary
+@require_POST
+@transaction.atomic
+def ticket_bulk_view(request):
+    """
+    Assign, change the status of or close many tickets with a single UPDATE.
+    """
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = reverse('inbox')
+
+    form = TicketBulkActionForm(request.POST)
+    if not form.is_valid():
+        logger.warning(f"Invalid bulk action by {request.user}: {form.errors.as_json()}")
+        errors = ' '.join(error for field_errors in form.errors.values() for error in field_errors)
+        messages.error(request, f"The bulk action was not applied: {errors}")
+        return HttpResponseRedirect(next_url)
+
+    action = form.cleaned_data['action']
+    tickets = Ticket.objects.filter(id__in=form.cleaned_data['tickets'])
+    changes = {'updated': timezone.now()}
+
+    if action == 'assign':
+        changes['assigned_to'] = form.cleaned_data['assigned_to']
+    else:
+        status = Ticket.CLOSED_STATUS if action == 'close' else form.cleaned_data['status']
+        # Tickets that must not change to the new status are left untouched
+        tickets = tickets.filter(status__in=Ticket.statuses_allowing(status))
+        changes['status'] = status
+        if status == Ticket.CLOSED_STATUS:
+            # Keep the closed date of tickets that are already closed
+            changes['closed_date'] = Case(
+                When(status=Ticket.CLOSED_STATUS, then=F('closed_date')),
+                default=Value(changes['updated']),
+            )
+        else:
+            changes['closed_date'] = None
+
+    # Collect the recipients before the update, one query for all tickets
+    tickets_by_recipient = defaultdict(list)
+    if action == 'assign':
+        recipient = form.cleaned_data['assigned_to'].email
+        if recipient:
+            tickets_by_recipient[recipient] = list(tickets.values_list('id', 'title'))
+    else:
+        for ticket_id, title, owner_email in tickets.values_list('id', 'title', 'owner__email'):
+            if owner_email:
+                tickets_by_recipient[owner_email].append((ticket_id, title))
+
+    # The update bypasses the signals that maintain the navbar counters
+    affected_users = {changes['assigned_to'].id} if action == 'assign' else set()
+    for assigned_to, waiting_for in tickets.values_list('assigned_to', 'waiting_for'):
+        affected_users.update((assigned_to, waiting_for))
+    count = tickets.update(**changes)
+    counters.invalidate(affected_users)
+    logger.info(f"Bulk action '{action}' by {request.user} updated {count} tickets")
+
+    messages.success(request, f"{count} tickets updated.")
+    skipped = len(form.cleaned_data['tickets']) - count
+    if skipped and action == 'assign':
+        messages.warning(request, f"{skipped} tickets were skipped because they no longer exist.")
+    elif skipped:
+        messages.warning(request, f"{skipped} tickets were skipped because their status cannot change "
+                                  f"to {changes['status'].label}.")
+
+    if action == 'assign':
+        subject, intro = "Tickets assigned to you", "the following tickets were assigned to you:"
+    elif changes['status'] == Ticket.CLOSED_STATUS:
+        subject, intro = "Tickets closed", "the following tickets were closed:"
+    else:
+        subject, intro = "Ticket status changed", f"the status of the following tickets changed to {changes['status'].label}:"
+    notify_batched(tickets_by_recipient, subject, intro)
+
+    return HttpResponseRedirect(next_url)
+
+
+def _followup_cursor(followup):
+    """
+    Encode the position of a followup in the timeline as "<microseconds>-<id>".
+    """
+    return f"{(followup.modified - _EPOCH) // timedelta(microseconds=1)}-{followup.id}"
+
+
+def _parse_followup_cursor(value):
+    try:
+        microseconds, followup_id = value.split('-')
+        return _EPOCH + timedelta(microseconds=int(microseconds)), int(followup_id)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
 @login_required
 def ticket_detail_view(request, pk):
     """
     View details of a specific ticket, including attachments and follow-ups.
+
+    Followups are shown newest first, FOLLOWUPS_PAGE_SIZE at a time; the
+    "before" parameter is the cursor of the last followup already shown.
     """
-    ticket = get_object_or_404(Ticket, id=pk)
-    attachments = Attachment.objects.filter(ticket=ticket)
-    followups = FollowUp.objects.filter(ticket=ticket).order_by('-modified')
+    cursor = _parse_followup_cursor(request.GET.get('before'))
+
+    # Archived tickets are looked up only when the ticket is not in the operational table
+    for ticket_model, followup_model, attachment_model in ((Ticket, FollowUp, Attachment),
+                                                           (ArchivedTicket, ArchivedFollowUp, ArchivedAttachment)):
+        followups = followup_model.objects.select_related('user').order_by('-modified', '-id')
+        if cursor:
+            modified, followup_id = cursor
+            followups = followups.filter(Q(modified__lt=modified) | Q(modified=modified, id__lt=followup_id))
+
+        ticket = ticket_model.objects.select_related('owner', 'assigned_to').prefetch_related(
+            Prefetch('attachments', queryset=attachment_model.objects.defer('text')),
+            # One more than shown, to know whether there are older followups
+            Prefetch('followups', queryset=followups[:FOLLOWUPS_PAGE_SIZE + 1], to_attr='followup_page'),
+        ).filter(id=pk).first()
+        if ticket:
+            break
+    else:
+        raise Http404("No ticket matches the given query.")
+
+    followups = ticket.followup_page[:FOLLOWUPS_PAGE_SIZE]
+    has_older = len(ticket.followup_page) > FOLLOWUPS_PAGE_SIZE
 
     context = {
         'ticket': ticket,
-        'attachments': attachments,
+        'attachments': ticket.attachments.all(),
         'followups': followups,
+        'is_first_page': cursor is None,
+        'older_cursor': _followup_cursor(followups[-1]) if has_older else None,
+        'is_archived': isinstance(ticket, ArchivedTicket),
     }
     return render(request, 'main/ticket_detail.html', context)
 
 
 @login_required
+@pins_primary
 @transaction.atomic
 def followup_create_view(request):
     """
@@ -220,25 +465,14 @@ def followup_create_view(request):
             followup.save()
 
             ticket = followup.ticket
-            notification_subject = f"[#{ticket.id}] New follow-up"
             notification_body = (
-                f"Hi,\n\nNew follow-up created for ticket #{ticket.id} "
-                f"(http://localhost:8000/ticket/{ticket.id}/)\n\n"
+                f"New follow-up created for ticket #{ticket.id} "
+                f"({ticket_url(ticket.id)})\n\n"
                 f"Title: {form.cleaned_data['title']}\n\n"
                 f"{form.cleaned_data['text']}"
             )
-
-            try:
-                send_mail(
-                    notification_subject,
-                    notification_body,
-                    'test@test.tld',
-                    [ticket.owner.email],
-                    fail_silently=False
-                )
-                logger.info(f"Follow-up email sent to {ticket.owner.email} for ticket #{ticket.id}")
-            except Exception as e:
-                logger.error(f"Failed to send follow-up email: {e}")
+            if ticket.owner:
+                notify([ticket.owner.email], "New follow-up", notification_body, ticket_id=ticket.id)
 
             return redirect('inbox')
     else:
@@ -253,6 +487,7 @@ def followup_create_view(request):
 
 
 @login_required
+@pins_primary
 @transaction.atomic
 def followup_edit_view(request, pk):
     """
@@ -275,6 +510,7 @@ def followup_edit_view(request, pk):
 
 
 @login_required
+@pins_primary
 @transaction.atomic
 def attachment_create_view(request):
     """
@@ -290,6 +526,7 @@ def attachment_create_view(request):
             attachment.filename = request.FILES['file'].name
             attachment.user = request.user
             attachment.save()
+            process_after_commit(attachment)
             return redirect('inbox')
     else:
         form = AttachmentForm()
@@ -297,4 +534,31 @@ def attachment_create_view(request):
     context = {
         'form': form,
     }
-    return render(request, 'main/attachment_add.html', context)
\ No newline at end of file
+    return render(request, 'main/attachment_add.html', context)
+
+@login_required
+def user_autocomplete_view(request):
+    """
+    Return active users whose username starts with "q" as JSON; with
+    role=agents only the users tickets can be assigned to.
+    """
+    users = assignable_users() if request.GET.get('role') == 'agents' else User.objects.filter(is_active=True)
+    users = users.filter(username__startswith=request.GET.get('q', '').strip())
+    users = users.only('id', 'username').order_by('username')[:AUTOCOMPLETE_RESULTS]
+    return JsonResponse({'results': [{'id': user.id, 'text': str(user)} for user in users]})
+
+
+@login_required
+def ticket_autocomplete_view(request):
+    """
+    Return open tickets as JSON: the ticket with the id "q", or the tickets
+    whose title starts with "q".
+    """
+    term = request.GET.get('q', '').strip().lstrip('#')
+    tickets = Ticket.objects.exclude(status=Ticket.CLOSED_STATUS)
+    if term.isascii() and term.isdigit():
+        tickets = tickets.filter(id=int(term)) if len(term) <= ID_MAX_DIGITS else tickets.none()
+    else:
+        tickets = tickets.filter(title__startswith=term)
+    tickets = tickets.only('id', 'title').order_by('-id')[:AUTOCOMPLETE_RESULTS]
+    return JsonResponse({'results': [{'id': ticket.id, 'text': str(ticket)} for ticket in tickets]})
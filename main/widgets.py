@@ -0,0 +1,39 @@
+from urllib.parse import urlencode
+
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select for a ModelChoiceField that only renders the selected option
+    instead of one option per row of the queryset. Other options are
+    fetched from a JSON autocomplete endpoint while typing, see
+    static/js/autocomplete.js.
+    """
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, url_name, query=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        # Extra parameters for the endpoint, e.g. {'role': 'agents'}
+        self.query = query or {}
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        url = reverse(self.url_name)
+        if self.query:
+            url += '?' + urlencode(self.query)
+        context['widget']['attrs']['data-autocomplete-url'] = url
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if pk]
+        options = [self.create_option(name, '', '---------', not selected, 0)]
+        if selected:
+            field = self.choices.field
+            for index, obj in enumerate(self.choices.queryset.filter(pk__in=selected), start=1):
+                options.append(self.create_option(name, obj.pk, field.label_from_instance(obj), True, index))
+        return [(None, options, 0)]
@@ -0,0 +1,29 @@
+/*
+ * Autocomplete for <select data-autocomplete-url="...">: the select only
+ * contains the current value, matching options are fetched while typing.
+ * The endpoint returns {"results": [{"id": ..., "text": ...}]}.
+ */
+$(function() {
+    $('select[data-autocomplete-url]').each(function() {
+        var select = $(this);
+        var url = select.data('autocomplete-url');
+        var input = $('<input type="text" class="form-control" placeholder="Type to search...">');
+        var timer = null;
+
+        input.insertBefore(select);
+        input.on('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                var separator = url.indexOf('?') === -1 ? '?' : '&';
+                $.getJSON(url + separator + 'q=' + encodeURIComponent(input.val()), function(data) {
+                    select.find('option').not(':selected').not('[value=""]').remove();
+                    $.each(data.results, function(i, item) {
+                        if (String(item.id) !== select.val()) {
+                            select.append($('<option>').val(item.id).text(item.text));
+                        }
+                    });
+                });
+            }, 250);
+        });
+    });
+});
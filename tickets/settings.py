@@ -26,10 +26,10 @@ SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', ')tbz@z2px&&9@+l6$8o$*z8m2&%az1
 PRODUCTION_DOMAIN = os.environ.get("DJANGO_PRODUCTION_DOMAIN", "mysite.local")
 
 
-    # Development-specific settings
-DEBUG = True
-TEMPLATE_DEBUG = True  # Deprecated in newer Django versions; consider removing if using Django >= 1.8
-ALLOWED_HOSTS = ['mysite.local', 'localhost', '127.0.0.1']
+# Development defaults to DEBUG; set DJANGO_DEBUG=False for the production profile
+# (cached template loader, no template debug tracing).
+DEBUG = env.bool('DJANGO_DEBUG', default=True)
+ALLOWED_HOSTS = [PRODUCTION_DOMAIN, 'localhost', '127.0.0.1']
 
 # Application definition
 
@@ -47,8 +47,27 @@ INSTALLED_APPS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache, e.g. DJANGO_CACHE_URL=redis://127.0.0.1:6379/1. It holds the navbar
+# ticket counters, which are only cached with a cache shared by all processes
+# (Redis, Memcached). Without DEBUG the default local-memory cache is not used
+# for them, so every page counts them in the database (system check main.W001).
+CACHES = {
+    'default': env.cache('DJANGO_CACHE_URL', default='locmemcache://'),
+}
+
+# Sessions: "cached_db" reads them from the cache and falls back to the
+# database, "signed_cookies" keeps them in the browser, "cache" only in the
+# cache (needs a shared, persistent cache) and "db" always in the database.
+# Expired database sessions are removed by the management command
+# "reap_sessions"; "benchmark_sessions" compares the engines.
+SESSION_ENGINE = env('DJANGO_SESSION_ENGINE', default='cached_db')
+if '.' not in SESSION_ENGINE:
+    SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_ENGINE}'
+
 # Template configuration
-# Updated to use the TEMPLATES setting instead of TEMPLATE_CONTEXT_PROCESSORS
+# Without an explicit "loaders" option Django wraps the loaders in the cached
+# loader, so every template is compiled once per process, with DEBUG as well.
+# "debug" follows DEBUG, so production renders without template debug tracing.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -60,6 +79,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',  # Required for admin
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main.context_processors.ticket_counters',
             ],
         },
     },
@@ -106,6 +126,20 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DATABASE_REPLICA_HOSTS=replica1.example.com,replica2.example.com
+# with the same name and credentials as the primary. The overview, export and
+# dashboard pages read from them (see main/routers.py); a user who just
+# changed something keeps reading from the primary for
+# DATABASE_REPLICA_STICKY_SECONDS.
+DATABASE_REPLICAS = []
+for index, host in enumerate(env.list('DATABASE_REPLICA_HOSTS', default=[]), start=1):
+    DATABASES[f'replica{index}'] = dict(DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['main.routers.ReplicaRouter']
+
+DATABASE_REPLICA_STICKY_SECONDS = env.int('DATABASE_REPLICA_STICKY_SECONDS', default=10)
+
 
 
 # Internationalization
@@ -127,6 +161,19 @@ STATIC_ROOT = os.environ.get("DJANGO_STATIC_ROOT", os.path.join(BASE_DIR, 'stati
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# In production collectstatic writes content-hashed file names plus gzip/brotli
+# variants, so the web server can serve them precompressed with far-future
+# cache headers (see the management command "nginx_static_config").
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': ('django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+                    else 'main.storage.CompressedManifestStaticFilesStorage'),
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.environ.get("DJANGO_MEDIA_ROOT", os.path.join(BASE_DIR, 'media'))
 
@@ -156,6 +203,55 @@ EMAIL_HOST = os.environ.get("DJANGO_EMAIL_HOST", "localhost")
 EMAIL_HOST_USER = os.environ.get("DJANGO_EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.environ.get("DJANGO_EMAIL_HOST_PASSWORD", "")
 
+# Ticket notifications: sender address, the address told about every ticket
+# created by email (none if empty) and the base URL used for links
+TICKET_EMAIL_NOTIFICATIONS_FROM = os.environ.get("DJANGO_TICKET_EMAIL_NOTIFICATIONS_FROM", "test@test.tld")
+TICKET_EMAIL_NOTIFICATIONS_TO = os.environ.get("DJANGO_TICKET_EMAIL_NOTIFICATIONS_TO", "")
+TICKET_BASE_URL = os.environ.get("DJANGO_TICKET_BASE_URL", "http://localhost:8000")
+
+# Mailboxes polled by the management command "get_email", as a JSON list in
+# DJANGO_TICKET_MAILBOXES. Each mailbox needs "name", "server", "user" and
+# "password"; optional are "port" (993), "folder" ("INBOX") and the routing of
+# new tickets: "assign_to" (a username) or "group" (a group name, whose
+# member with the fewest open tickets gets the ticket).
+# Without it, the single mailbox from DJANGO_TICKET_INBOX_* is used.
+TICKET_MAILBOXES = env.json('DJANGO_TICKET_MAILBOXES', default=[
+    {
+        'name': 'default',
+        'server': os.environ["DJANGO_TICKET_INBOX_SERVER"],
+        'user': os.environ.get("DJANGO_TICKET_INBOX_USER", ""),
+        'password': os.environ.get("DJANGO_TICKET_INBOX_PASSWORD", ""),
+    },
+] if "DJANGO_TICKET_INBOX_SERVER" in os.environ else [])
+
+# Number of mailboxes processed at the same time
+TICKET_MAILBOX_CONCURRENCY = env.int('DJANGO_TICKET_MAILBOX_CONCURRENCY', default=4)
+
+# Automatic assignment of new tickets and of the unassigned tickets found by
+# the management command "assign_tickets", see main/assignment.py. Rules are a
+# JSON list, the first matching rule wins; a rule matches on "title" and/or
+# "sender" (regular expressions) and "mailbox" (name), and assigns to
+# "assign_to" (a username) or "group" (a group name). Tickets no rule matches
+# go to the least loaded member of TICKET_ASSIGNMENT_GROUP.
+TICKET_AUTO_ASSIGNMENT = env.bool('DJANGO_TICKET_AUTO_ASSIGNMENT', default=True)
+TICKET_ASSIGNMENT_GROUP = env('DJANGO_TICKET_ASSIGNMENT_GROUP', default='Call Center')
+TICKET_ASSIGNMENT_RULES = env.json('DJANGO_TICKET_ASSIGNMENT_RULES', default=[])
+
+# Notifications to one recipient within this many seconds are collected into
+# a single email by the management command "send_digests" (users can opt for
+# immediate emails in their settings). With 0, notifications are sent at once
+# unless a user asked for digests.
+TICKET_NOTIFICATION_DIGEST_WINDOW = env.int('DJANGO_TICKET_NOTIFICATION_DIGEST_WINDOW', default=120)
+
+# Attachment post-processing (thumbnails, text extraction, scan), see
+# main/attachments.py. The scanner is the dotted path of a callable
+# scanner(file, filename) returning (clean, detail); the default accepts
+# every file.
+TICKET_ATTACHMENT_SCANNER = env('DJANGO_TICKET_ATTACHMENT_SCANNER', default='main.attachments.accept_all')
+# Files that fail the scan are moved here, outside MEDIA_ROOT
+TICKET_ATTACHMENT_QUARANTINE_ROOT = env('DJANGO_TICKET_ATTACHMENT_QUARANTINE_ROOT',
+                                        default=os.path.join(BASE_DIR, 'quarantine'))
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Local setup with a read replica on two SQLite files, for trying out the
+replica routing without a PostgreSQL cluster:
+
+    export DJANGO_SETTINGS_MODULE=tickets.settings_replica
+    python manage.py migrate
+    cp db.sqlite3 db-replica.sqlite3
+
+Copying the file again "replicates" the primary; until then the replica
+lags behind, which shows what the read-only pages see under replication lag.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_REPLICAS = ['replica1']
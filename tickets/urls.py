@@ -22,6 +22,7 @@ urlpatterns = [
     path('ticket/new/', login_required(main.views.ticket_create_view), name='ticket_new'),
     path('ticket/edit/<int:pk>/', login_required(main.views.ticket_edit_view), name='ticket_edit'),
     path('ticket/<int:pk>/', login_required(main.views.ticket_detail_view), name='ticket_detail'),
+    path('ticket/bulk/', login_required(main.views.ticket_bulk_view), name='ticket_bulk'),
 
     # FollowUp URLs
     path('followup/new/', login_required(main.views.followup_create_view), name='followup_new'),
@@ -35,6 +36,14 @@ urlpatterns = [
     path('my-tickets/', login_required(main.views.my_tickets_view), name='my-tickets'),
     path('all-tickets/', login_required(main.views.all_tickets_view), name='all-tickets'),
     path('archive/', login_required(main.views.archive_view), name='archive'),
+
+    # Autocomplete endpoints for the ticket and followup forms
+    path('autocomplete/users/', login_required(main.views.user_autocomplete_view), name='autocomplete_users'),
+    path('autocomplete/tickets/', login_required(main.views.ticket_autocomplete_view), name='autocomplete_tickets'),
+
+    # Reporting
+    path('dashboard/', login_required(main.views.dashboard_view), name='dashboard'),
+    path('export/', login_required(main.views.ticket_export_view), name='export'),
 ]
 
 # Serve media files during development